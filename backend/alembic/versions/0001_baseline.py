@@ -0,0 +1,103 @@
+"""基线表结构
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('username', sa.String(50), nullable=False),
+        sa.Column('email', sa.String(100), nullable=False),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('daily_energy_budget', sa.Integer()),
+        sa.Column('max_daily_tasks', sa.Integer()),
+        sa.Column('settings', sa.JSON()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('color', sa.String(7)),
+        sa.Column('order', sa.Integer()),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_index('ix_categories_id', 'categories', ['id'])
+    op.create_index('ix_categories_user_id', 'categories', ['user_id'])
+    op.create_index('ix_categories_name', 'categories', ['name'])
+
+    op.create_table(
+        'tasks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('energy_cost', sa.Integer()),
+        sa.Column('expected_interval', sa.Integer()),
+        sa.Column('importance', sa.Integer()),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id'), nullable=True),
+        sa.Column('color', sa.String(7)),
+        sa.Column('icon', sa.String(50)),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'])
+    op.create_index('ix_tasks_name', 'tasks', ['name'])
+    op.create_index('ix_tasks_category_id', 'tasks', ['category_id'])
+
+    op.create_table(
+        'completions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('task_id', sa.Integer(), sa.ForeignKey('tasks.id'), nullable=False),
+        sa.Column('completed_at', sa.DateTime()),
+        sa.Column('note', sa.Text()),
+        sa.Column('mood', sa.Integer()),
+    )
+    op.create_index('ix_completions_id', 'completions', ['id'])
+    op.create_index('ix_completions_task_id', 'completions', ['task_id'])
+    op.create_index('ix_completions_completed_at', 'completions', ['completed_at'])
+
+    op.create_table(
+        'daily_logs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('log_date', sa.Date(), nullable=False),
+        sa.Column('energy_spent', sa.Integer()),
+        sa.Column('tasks_completed', sa.Integer()),
+        sa.Column('daily_score', sa.Float()),
+        sa.Column('overall_health', sa.Float()),
+        sa.Column('note', sa.Text()),
+    )
+    op.create_index('ix_daily_logs_id', 'daily_logs', ['id'])
+    op.create_index('ix_daily_logs_user_id', 'daily_logs', ['user_id'])
+    op.create_index('ix_daily_logs_log_date', 'daily_logs', ['log_date'])
+
+
+def downgrade():
+    op.drop_table('daily_logs')
+    op.drop_table('completions')
+    op.drop_table('tasks')
+    op.drop_table('categories')
+    op.drop_table('users')
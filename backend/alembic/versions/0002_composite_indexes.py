@@ -0,0 +1,62 @@
+"""热点查询的组合索引与每日完成唯一约束
+
+Revision ID: 0002_composite_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002_composite_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 新增完成日期列，并用已有的完成时间回填
+    with op.batch_alter_table('completions') as batch_op:
+        batch_op.add_column(sa.Column('completed_on', sa.Date(), nullable=True))
+    op.execute("UPDATE completions SET completed_on = date(completed_at)")
+
+    # 旧版本的先查后插存在竞态，建唯一索引前清理同日重复记录（保留最早一条）
+    op.execute(
+        "DELETE FROM completions WHERE id NOT IN ("
+        "SELECT MIN(id) FROM completions GROUP BY task_id, completed_on)"
+    )
+
+    with op.batch_alter_table('completions') as batch_op:
+        batch_op.alter_column('completed_on', existing_type=sa.Date(), nullable=False)
+        batch_op.drop_index('ix_completions_task_id')
+        batch_op.create_index(
+            'uq_completions_task_id_completed_on', ['task_id', 'completed_on'], unique=True
+        )
+        batch_op.create_index(
+            'ix_completions_task_id_completed_at', ['task_id', 'completed_at']
+        )
+
+    # 单列 user_id 索引是组合索引的前缀，删除以减少写放大
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_user_id')
+        batch_op.create_index('ix_tasks_user_id_is_active', ['user_id', 'is_active'])
+
+    with op.batch_alter_table('daily_logs') as batch_op:
+        batch_op.drop_index('ix_daily_logs_user_id')
+        batch_op.create_index('ix_daily_logs_user_id_log_date', ['user_id', 'log_date'])
+
+
+def downgrade():
+    with op.batch_alter_table('daily_logs') as batch_op:
+        batch_op.drop_index('ix_daily_logs_user_id_log_date')
+        batch_op.create_index('ix_daily_logs_user_id', ['user_id'])
+
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_user_id_is_active')
+        batch_op.create_index('ix_tasks_user_id', ['user_id'])
+
+    with op.batch_alter_table('completions') as batch_op:
+        batch_op.drop_index('ix_completions_task_id_completed_at')
+        batch_op.drop_index('uq_completions_task_id_completed_on')
+        batch_op.create_index('ix_completions_task_id', ['task_id'])
+        batch_op.drop_column('completed_on')
@@ -0,0 +1,76 @@
+"""按用户时区重算完成日期
+
+Revision ID: 0003_completed_on_local_date
+Revises: 0002_composite_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.timezone import TIMEZONE_KEY, is_valid_timezone, get_zone, local_date
+from app.config import settings
+
+
+revision = '0003_completed_on_local_date'
+down_revision = '0002_composite_indexes'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    # completed_at 以 UTC 保存，0002 按 UTC 日期回填了 completed_on，这里换算为用户本地日期
+    conn = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('settings', sa.JSON))
+    tasks = sa.table('tasks', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer))
+    completions = sa.table(
+        'completions',
+        sa.column('id', sa.Integer),
+        sa.column('task_id', sa.Integer),
+        sa.column('completed_at', sa.DateTime),
+        sa.column('completed_on', sa.Date),
+    )
+
+    rows = conn.execute(
+        sa.select(completions.c.id, completions.c.completed_at, users.c.settings)
+        .select_from(completions.join(tasks, tasks.c.id == completions.c.task_id)
+                     .join(users, users.c.id == tasks.c.user_id))
+        .where(completions.c.completed_at.isnot(None))
+    ).all()
+
+    updates = []
+    for completion_id, completed_at, user_settings in rows:
+        name = (user_settings or {}).get(TIMEZONE_KEY)
+        tz = get_zone(name if is_valid_timezone(name) else settings.DEFAULT_TIMEZONE)
+        updates.append({"cid": completion_id, "day": local_date(completed_at, tz)})
+
+    statement = completions.update().where(completions.c.id == sa.bindparam("cid")).values(
+        completed_on=sa.bindparam("day")
+    )
+    # 唯一索引在换算过程中可能短暂冲突，先移除再重建
+    op.drop_index('uq_completions_task_id_completed_on', table_name='completions')
+    for i in range(0, len(updates), BATCH_SIZE):
+        conn.execute(statement, updates[i:i + BATCH_SIZE])
+
+    op.execute(
+        "DELETE FROM completions WHERE id NOT IN ("
+        "SELECT MIN(id) FROM completions GROUP BY task_id, completed_on)"
+    )
+    op.create_index(
+        'uq_completions_task_id_completed_on', 'completions',
+        ['task_id', 'completed_on'], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_completions_task_id_completed_on', table_name='completions')
+    op.execute("UPDATE completions SET completed_on = date(completed_at)")
+    op.execute(
+        "DELETE FROM completions WHERE id NOT IN ("
+        "SELECT MIN(id) FROM completions GROUP BY task_id, completed_on)"
+    )
+    op.create_index(
+        'uq_completions_task_id_completed_on', 'completions',
+        ['task_id', 'completed_on'], unique=True
+    )
@@ -0,0 +1,28 @@
+"""今日推荐快照表
+
+Revision ID: 0004_recommendation_snapshots
+Revises: 0003_completed_on_local_date
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004_recommendation_snapshots'
+down_revision = '0003_completed_on_local_date'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'recommendation_snapshots',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('snapshot_date', sa.Date(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('recommendation_snapshots')
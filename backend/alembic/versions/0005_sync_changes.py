@@ -0,0 +1,50 @@
+"""增量同步的变更日志
+
+Revision ID: 0005_sync_changes
+Revises: 0004_recommendation_snapshots
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.user import new_sync_epoch
+
+
+revision = '0005_sync_changes'
+down_revision = '0004_recommendation_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sync_changes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('entity', sa.String(16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted', sa.Boolean(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=True),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_sync_changes_user_id_id', 'sync_changes', ['user_id', 'id'])
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('sync_epoch', sa.String(16), nullable=False, server_default=''))
+
+    # 已有用户各自生成纪元；他们还没有变更日志，首次同步返回全量
+    conn = op.get_bind()
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('sync_epoch', sa.String))
+    user_ids = conn.execute(sa.select(users.c.id)).scalars().all()
+    if user_ids:
+        conn.execute(
+            users.update().where(users.c.id == sa.bindparam('uid')).values(sync_epoch=sa.bindparam('epoch')),
+            [{'uid': user_id, 'epoch': new_sync_epoch()} for user_id in user_ids]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('sync_epoch')
+    op.drop_index('ix_sync_changes_user_id_id', table_name='sync_changes')
+    op.drop_table('sync_changes')
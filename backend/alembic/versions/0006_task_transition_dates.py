@@ -0,0 +1,72 @@
+"""任务的状态转换日期
+
+Revision ID: 0006_task_transition_dates
+Revises: 0005_sync_changes
+Create Date: 2026-10-18
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.algorithm import LentoFlowAlgorithm
+
+
+revision = '0006_task_transition_dates'
+down_revision = '0005_sync_changes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('high_urgency_on', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('critical_urgency_on', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('low_health_on', sa.Date(), nullable=True))
+        batch_op.create_index('ix_tasks_high_urgency_on', ['high_urgency_on'])
+        batch_op.create_index('ix_tasks_critical_urgency_on', ['critical_urgency_on'])
+        batch_op.create_index('ix_tasks_low_health_on', ['low_health_on'])
+
+    # 按已有的完成记录回填（只用本迁移时已有的列，不依赖之后的模型）
+    conn = op.get_bind()
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.Integer), sa.column('expected_interval', sa.Integer), sa.column('importance', sa.Integer),
+        sa.column('high_urgency_on', sa.Date), sa.column('critical_urgency_on', sa.Date), sa.column('low_health_on', sa.Date)
+    )
+    completions = sa.table('completions', sa.column('task_id', sa.Integer), sa.column('completed_on', sa.Date))
+    last_done = dict(conn.execute(
+        sa.select(completions.c.task_id, sa.func.max(completions.c.completed_on)).group_by(completions.c.task_id)
+    ).all())
+    today = date.today()
+    rows = [
+        {
+            'tid': task.id,
+            **{
+                f'new_{column}': value
+                for column, value in LentoFlowAlgorithm.transition_dates(
+                    last_done.get(task.id), task.expected_interval or 1, task.importance or 3, today
+                ).items()
+            }
+        }
+        for task in conn.execute(sa.select(tasks.c.id, tasks.c.expected_interval, tasks.c.importance))
+    ]
+    if rows:
+        conn.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('tid')).values(
+                high_urgency_on=sa.bindparam('new_high_urgency_on'),
+                critical_urgency_on=sa.bindparam('new_critical_urgency_on'),
+                low_health_on=sa.bindparam('new_low_health_on'),
+            ),
+            rows
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_index('ix_tasks_low_health_on')
+        batch_op.drop_index('ix_tasks_critical_urgency_on')
+        batch_op.drop_index('ix_tasks_high_urgency_on')
+        batch_op.drop_column('low_health_on')
+        batch_op.drop_column('critical_urgency_on')
+        batch_op.drop_column('high_urgency_on')
@@ -0,0 +1,36 @@
+"""提醒发件箱
+
+Revision ID: 0007_notification_outbox
+Revises: 0006_task_transition_dates
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007_notification_outbox'
+down_revision = '0006_task_transition_dates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('kind', sa.String(16), nullable=False),
+        sa.Column('due_on', sa.Date(), nullable=False),
+        sa.Column('message', sa.String(500), nullable=False),
+        sa.Column('task_ids', sa.JSON(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('user_id', 'kind', 'due_on', name='uq_notification_outbox_user_id_kind_due_on'),
+    )
+    op.create_index('ix_notification_outbox_sent_at_id', 'notification_outbox', ['sent_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_sent_at_id', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
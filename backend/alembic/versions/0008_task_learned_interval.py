@@ -0,0 +1,64 @@
+"""任务的学习间隔
+
+Revision ID: 0008_task_learned_interval
+Revises: 0007_notification_outbox
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.algorithm import LentoFlowAlgorithm
+
+
+revision = '0008_task_learned_interval'
+down_revision = '0007_notification_outbox'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('use_learned_interval', sa.Boolean(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('learned_interval', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('learned_samples', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('learned_last_on', sa.Date(), nullable=True))
+
+    # 按已有的完成记录回填（只用本迁移时已有的表，不依赖之后的模型）；默认不使用学习间隔，转换日期不受影响
+    conn = op.get_bind()
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.Integer), sa.column('learned_interval', sa.Float),
+        sa.column('learned_samples', sa.Integer), sa.column('learned_last_on', sa.Date)
+    )
+    completions = sa.table('completions', sa.column('task_id', sa.Integer), sa.column('completed_on', sa.Date))
+    state = {task_id: (None, 0, None) for task_id in conn.execute(sa.select(tasks.c.id)).scalars()}
+    for task_id, completed_on in conn.execute(
+        sa.select(completions.c.task_id, completions.c.completed_on).order_by(
+            completions.c.task_id, completions.c.completed_on
+        )
+    ):
+        learned, samples, last_on = state.get(task_id, (None, 0, None))
+        if last_on is not None:
+            learned, samples = LentoFlowAlgorithm.update_learned_interval(learned, samples, (completed_on - last_on).days)
+        state[task_id] = (learned, samples, completed_on)
+    rows = [
+        {'tid': task_id, 'new_learned_interval': learned, 'new_learned_samples': samples, 'new_learned_last_on': last_on}
+        for task_id, (learned, samples, last_on) in state.items()
+    ]
+    if rows:
+        conn.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('tid')).values(
+                learned_interval=sa.bindparam('new_learned_interval'),
+                learned_samples=sa.bindparam('new_learned_samples'),
+                learned_last_on=sa.bindparam('new_learned_last_on'),
+            ),
+            rows
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('learned_last_on')
+        batch_op.drop_column('learned_samples')
+        batch_op.drop_column('learned_interval')
+        batch_op.drop_column('use_learned_interval')
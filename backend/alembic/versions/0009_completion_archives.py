@@ -0,0 +1,38 @@
+"""历史完成记录的月度压缩表
+
+Revision ID: 0009_completion_archives
+Revises: 0008_task_learned_interval
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009_completion_archives'
+down_revision = '0008_task_learned_interval'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'completion_archives',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('task_id', sa.Integer(), sa.ForeignKey('tasks.id'), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('days', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('mood_count', sa.Integer(), nullable=False),
+        sa.Column('mood_sum', sa.Integer(), nullable=False),
+        sa.Column('day_moods', sa.String(31), nullable=False),
+    )
+    op.create_index('uq_completion_archives_task_id_month', 'completion_archives', ['task_id', 'month'], unique=True)
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('completions_archived_before', sa.Date(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('completions_archived_before')
+    op.drop_index('uq_completion_archives_task_id_month', table_name='completion_archives')
+    op.drop_table('completion_archives')
@@ -0,0 +1,67 @@
+"""任务的完成日位图
+
+Revision ID: 0010_task_completion_days
+Revises: 0009_completion_archives
+Create Date: 2026-10-18
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0010_task_completion_days'
+down_revision = '0009_completion_archives'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.add_column(sa.Column('completion_days', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('completion_days_start', sa.Date(), nullable=True))
+
+    # 按两层完成记录回填（只用本迁移时已有的表，不依赖之后的模型）
+    conn = op.get_bind()
+    tasks = sa.table(
+        'tasks',
+        sa.column('id', sa.Integer), sa.column('completion_days', sa.LargeBinary),
+        sa.column('completion_days_start', sa.Date)
+    )
+    completions = sa.table('completions', sa.column('task_id', sa.Integer), sa.column('completed_on', sa.Date))
+    archives = sa.table(
+        'completion_archives',
+        sa.column('task_id', sa.Integer), sa.column('month', sa.Date), sa.column('days', sa.Integer)
+    )
+    days = defaultdict(list)
+    for task_id, completed_on in conn.execute(sa.select(completions.c.task_id, completions.c.completed_on)):
+        days[task_id].append(completed_on)
+    for task_id, month, bits in conn.execute(sa.select(archives.c.task_id, archives.c.month, archives.c.days)):
+        days[task_id].extend(month + timedelta(days=index) for index in range(31) if bits >> index & 1)
+
+    rows = []
+    for task_id, task_days in days.items():
+        start = date(min(task_days).year, 1, 1)
+        value = 0
+        for day in task_days:
+            value |= 1 << (day - start).days
+        rows.append({
+            'tid': task_id,
+            'new_completion_days': value.to_bytes((value.bit_length() + 7) // 8, 'little'),
+            'new_completion_days_start': start,
+        })
+    if rows:
+        conn.execute(
+            tasks.update().where(tasks.c.id == sa.bindparam('tid')).values(
+                completion_days=sa.bindparam('new_completion_days'),
+                completion_days_start=sa.bindparam('new_completion_days_start'),
+            ),
+            rows
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('tasks') as batch_op:
+        batch_op.drop_column('completion_days_start')
+        batch_op.drop_column('completion_days')
@@ -1,10 +1,17 @@
+from fastapi import Request
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     """应用配置类"""
     # 数据库配置
     DATABASE_URL: str = "sqlite:///./lentoflow.db"
+    # 启动时自动建表；生产环境建议关闭并使用 alembic upgrade head
+    AUTO_CREATE_TABLES: bool = True
+    # 水平分片：SHARD_DATABASE_URLS 非空时按用户把数据分布到这些数据库（此时忽略 DATABASE_URL），
+    # 用户名到分片的映射保存在目录库 DIRECTORY_DATABASE_URL 中
+    SHARD_DATABASE_URLS: List[str] = []
+    DIRECTORY_DATABASE_URL: str = "sqlite:///./lentoflow_directory.db"
     
     # JWT配置
     SECRET_KEY: str = "your-secret-key-change-me-in-production"
@@ -16,7 +23,79 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     
+    # 是否采集请求/SQL 指标并开放 /metrics
+    METRICS_ENABLED: bool = True
+    
+    # 按需采样分析：请求头 X-LentoFlow-Profile 需用 PROFILER_SECRET（为空时用 SECRET_KEY）签名，
+    # PROFILER_USERNAMES 中的用户的请求总是被采样
+    PROFILER_ENABLED: bool = False
+    PROFILER_SECRET: str = ""
+    PROFILER_USERNAMES: List[str] = []
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_OUTPUT_DIR: str = "./profiles"
+    
+    # 今日推荐快照：用户本地零点 SNAPSHOT_DELAY_MINUTES 分钟后由后台调度器预计算，
+    # 按 SNAPSHOT_CHUNK_SIZE 个用户一批分给 SNAPSHOT_WORKERS 个进程（0 表示在线程中执行）。
+    # 调度器不在 worker 之间协调，只在单进程部署时开启；多 worker 部署改用 cron 执行 scripts.refresh_snapshots
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_DELAY_MINUTES: int = 5
+    SNAPSHOT_CHECK_INTERVAL_SECONDS: float = 60.0
+    SNAPSHOT_WORKERS: int = 2
+    SNAPSHOT_CHUNK_SIZE: int = 500
+    
+    # 完成/撤销的合并写入：单个写线程按批在一个事务中提交（适用于 SQLite 文件数据库）
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_MAX_BATCH: int = 64
+    WRITE_QUEUE_MAX_DELAY_MS: float = 2.0
+    
+    # 缓存后端：none（不缓存）、memory（进程内，仅适用于单进程）、sqlite（同一主机上的多个 worker 共享
+    # CACHE_PATH 文件，建议放在 /dev/shm）。写操作通过递增用户数据版本使缓存失效
+    CACHE_BACKEND: str = "none"
+    CACHE_PATH: str = "./lentoflow_cache.db"
+    CACHE_TTL_SECONDS: float = 300.0
+    CACHE_MAX_ENTRIES: int = 10000
+    
+    # 合并并发的相同读请求（今日视图和统计），键包含用户数据版本
+    SINGLE_FLIGHT_ENABLED: bool = True
+    
+    # 响应压缩：按 Accept-Encoding 选择 zstd / br（安装了 zstandard / brotli 时）或 gzip，
+    # 小于 COMPRESSION_MINIMUM_SIZE 字节的响应不压缩
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    
+    # 紧迫提醒：每 REMINDER_CHECK_INTERVAL_SECONDS 秒选出（按用户本地日期）REMINDER_LEAD_DAYS 天后紧迫度进入
+    # critical 的任务，跳过处于免打扰时段（User.settings 的 quiet_hours，未设置时用 REMINDER_QUIET_HOURS）
+    # 或关闭了提醒（reminders 为 false）的用户，按 REMINDER_BATCH_SIZE 行一批写入发件箱，
+    # 再由 REMINDER_SENDER 发送：stdout、file（追加到 REMINDER_OUTBOX_PATH）或 "模块:类"
+    REMINDERS_ENABLED: bool = False
+    REMINDER_CHECK_INTERVAL_SECONDS: float = 300.0
+    REMINDER_LEAD_DAYS: int = 1
+    REMINDER_QUIET_HOURS: str = "22:00-08:00"
+    REMINDER_BATCH_SIZE: int = 1000
+    REMINDER_MAX_ATTEMPTS: int = 5
+    REMINDER_SENDER: str = "stdout"
+    REMINDER_OUTBOX_PATH: str = "./reminders.jsonl"
+    
+    # 历史完成记录压缩：每 COMPACTION_INTERVAL_SECONDS 秒把 COMPLETION_HOT_DAYS 天（向前取整到月初）之前的
+    # 完成记录按 (任务, 月) 压缩到 completion_archives 并删除原始行，每 COMPACTION_BATCH_SIZE 个用户一个事务。
+    # 多 worker 部署时改用 cron 执行 scripts/compact_completions.py
+    COMPACTION_ENABLED: bool = False
+    COMPACTION_INTERVAL_SECONDS: float = 86400.0
+    COMPLETION_HOT_DAYS: int = 365
+    COMPACTION_BATCH_SIZE: int = 500
+    
+    # 用户未设置时区时使用的默认时区（IANA 名称）
+    DEFAULT_TIMEZONE: str = "Asia/Shanghai"
+    
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+
+# 依赖注入获取当前应用的配置
+def get_settings(request: Request) -> Settings:
+    return getattr(request.app.state, "settings", settings)
@@ -1,24 +1,47 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import settings
+from fastapi import Request
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+# 创建基类
+Base = declarative_base()
+
+# 已检查过表结构的数据库，同一进程内只检查一次
+_checked_schemas = set()
+
+
+# 创建数据库引擎（不会立即连接数据库）
+def create_db_engine(database_url: str) -> Engine:
+    return create_engine(
+        database_url,
+        connect_args={"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    )
 
-# 创建数据库引擎
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def ensure_schema(engine: Engine) -> None:
+    """首次启动时建表；已由 Alembic 管理的数据库交给迁移处理"""
+    key = str(engine.url)
+    if key in _checked_schemas:
+        return
+    
+    # 导入所有模型，确保它们被注册到Base元数据中
+    from . import models  # noqa: F401
+    
+    if not inspect(engine).has_table("alembic_version"):
+        Base.metadata.create_all(bind=engine)
+    _checked_schemas.add(key)
 
-# 创建基类
-Base = declarative_base()
 
-# 依赖注入获取数据库会话
-def get_db():
-    db = SessionLocal()
+# 依赖注入获取数据库会话（当前用户所在分片）
+def get_db(request: Request):
+    shards = request.app.state.shards
+    db = shards.session(shards.shard_for_request(request))
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
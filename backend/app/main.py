@@ -1,41 +1,152 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth_router, tasks_router, today_router, stats_router
-from .database import engine, Base
-
-# 导入所有模型，确保它们被注册到Base元数据中
-from . import models
-
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="LentoFlow API",
-    description="弹性习惯追踪系统 API",
-    version="1.0.0"
-)
-
-# CORS 配置
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 在生产环境中应指定具体域名
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# 注册路由
-app.include_router(auth_router)
-app.include_router(tasks_router)
-app.include_router(today_router)
-app.include_router(stats_router)
-app.include_router(categories_router)
-
-# 根路径
-@app.get("/")
-def root():
-    return {
-        "message": "Welcome to LentoFlow API",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
+from .routers import auth_router, tasks_router, today_router, stats_router, categories_router, dashboard_router, sync_router, metrics_router
+from .config import Settings, settings as default_settings
+from .shards import ShardRouter
+from .utils.metrics import MetricsRegistry, MetricsMiddleware, instrument_engine
+from .utils import profiling
+from .utils.compression import CompressionMiddleware
+from .services.snapshots import SnapshotScheduler
+from .services.reminders import ReminderScheduler, create_sender
+from .services.archive import CompactionScheduler
+from .services.write_queue import WriteQueue, create_writer_engine
+from .services.cache import create_cache
+from .services.singleflight import SingleFlight
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """创建应用实例；数据库引擎在启动阶段创建，导入模块时不访问数据库"""
+    settings = settings or default_settings
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 缓存（认证用户、今日视图和统计结果；分片时还有用户名到分片的映射）
+        cache = create_cache(settings)
+        if cache is not None and settings.METRICS_ENABLED:
+            app.state.metrics.set_collector("cache", cache.metric_lines)
+        app.state.cache = cache
+        
+        shards = ShardRouter(settings, cache)
+        for engine in shards.all_engines():
+            if settings.METRICS_ENABLED:
+                instrument_engine(engine, app.state.metrics)
+            if settings.PROFILER_ENABLED:
+                profiling.instrument_engine(engine)
+        if settings.AUTO_CREATE_TABLES:
+            shards.ensure_schema()
+        app.state.shards = shards
+        # 第一个分片（不分片时即唯一的数据库）
+        app.state.engine = shards.engines[0]
+        
+        # 完成记录的合并写入，每个分片一个写线程
+        write_queues = []
+        if settings.WRITE_QUEUE_ENABLED:
+            for url in shards.urls:
+                writer_engine = create_writer_engine(url)
+                if settings.METRICS_ENABLED:
+                    instrument_engine(writer_engine, app.state.metrics)
+                write_queue = WriteQueue(
+                    writer_engine,
+                    settings.WRITE_QUEUE_MAX_BATCH,
+                    settings.WRITE_QUEUE_MAX_DELAY_MS / 1000
+                )
+                write_queue.start()
+                write_queues.append(write_queue)
+        app.state.write_queues = write_queues
+        
+        # 后台预计算今日推荐快照
+        scheduler = None
+        if settings.SNAPSHOT_ENABLED:
+            scheduler = SnapshotScheduler(list(zip(shards.urls, shards.engines)), settings)
+            scheduler.start()
+        
+        # 紧迫提醒：批量写入发件箱并发送
+        reminders = None
+        if settings.REMINDERS_ENABLED:
+            reminders = ReminderScheduler(shards.engines, settings, create_sender(settings))
+            reminders.start()
+        
+        # 定期压缩历史完成记录
+        compaction = None
+        if settings.COMPACTION_ENABLED:
+            compaction = CompactionScheduler(shards.engines, settings, cache)
+            compaction.start()
+        yield
+        if compaction is not None:
+            await compaction.stop()
+        if reminders is not None:
+            await reminders.stop()
+        if scheduler is not None:
+            await scheduler.stop()
+        for write_queue in write_queues:
+            write_queue.stop()
+            write_queue.engine.dispose()
+        shards.dispose()
+        if cache is not None:
+            cache.close()
+
+    app = FastAPI(
+        title="LentoFlow API",
+        description="弹性习惯追踪系统 API",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.settings = settings
+
+    # 响应压缩（最内层，压缩耗时计入请求延迟）
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(CompressionMiddleware, settings=settings)
+
+    # 请求延迟与 SQL 统计
+    if settings.METRICS_ENABLED:
+        app.state.metrics = MetricsRegistry()
+        app.add_middleware(MetricsMiddleware, registry=app.state.metrics)
+        app.include_router(metrics_router)
+
+    # 合并并发的相同读请求
+    if settings.SINGLE_FLIGHT_ENABLED:
+        app.state.single_flight = SingleFlight()
+        if settings.METRICS_ENABLED:
+            app.state.metrics.set_collector("single_flight", app.state.single_flight.metric_lines)
+
+    # 按需采样分析（未开启时不安装）
+    if settings.PROFILER_ENABLED:
+        app.add_middleware(profiling.ProfilerMiddleware, settings=settings)
+
+    # CORS 配置
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # 在生产环境中应指定具体域名
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # 注册路由
+    app.include_router(auth_router)
+    app.include_router(tasks_router)
+    app.include_router(today_router)
+    app.include_router(stats_router)
+    app.include_router(categories_router)
+    app.include_router(dashboard_router)
+    app.include_router(sync_router)
+
+    # 根路径
+    @app.get("/")
+    def root():
+        return {
+            "message": "Welcome to LentoFlow API",
+            "docs": "/docs",
+            "redoc": "/redoc"
+        }
+
+    if settings.PROFILER_ENABLED:
+        profiling.instrument_routes(app)
+
+    return app
+
+
+app = create_app()
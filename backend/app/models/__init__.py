@@ -1,5 +1,10 @@
 from .user import User
 from .task import Task
 from .completion import Completion
+from .archive import CompletionArchive
 from .dailylog import DailyLog
 from .category import Category
+from .snapshot import RecommendationSnapshot
+from .directory import UserDirectory
+from .sync import SyncChange
+from .notification import Notification
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, String, Index
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+class CompletionArchive(Base):
+    """压缩后的历史完成记录：每个任务每月一行（见 services/archive.py）"""
+    __tablename__ = 'completion_archives'
+    __table_args__ = (
+        # 同时覆盖按 task_id 前缀的查询
+        Index('uq_completion_archives_task_id_month', 'task_id', 'month', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False)
+    month = Column(Date, nullable=False)  # 当月 1 日
+    days = Column(Integer, nullable=False)  # 完成日位图，第 n 位为 1 表示当月 n+1 日完成过
+    count = Column(Integer, nullable=False)
+    mood_count = Column(Integer, nullable=False)  # 填写了心情的完成次数
+    mood_sum = Column(Integer, nullable=False)
+    day_moods = Column(String(31), nullable=False)  # 每天的心情 1-5，'0' 表示未完成或未填写
+    
+    # 关系
+    task = relationship("Task", back_populates="completion_archives")
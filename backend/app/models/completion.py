@@ -1,14 +1,20 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
 class Completion(Base):
     __tablename__ = 'completions'
+    __table_args__ = (
+        # 同一任务每天只能完成一次，同时覆盖按 task_id 前缀的查询
+        Index('uq_completions_task_id_completed_on', 'task_id', 'completed_on', unique=True),
+        Index('ix_completions_task_id_completed_at', 'task_id', 'completed_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey('tasks.id'), nullable=False)
     completed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    completed_on = Column(Date, nullable=False)  # 完成日期（用户本地时区）
     note = Column(Text)
     mood = Column(Integer)  # 完成时的心情 1-5
     
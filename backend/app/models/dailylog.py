@@ -1,12 +1,15 @@
-from sqlalchemy import Column, Integer, Date, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, Date, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 class DailyLog(Base):
     __tablename__ = 'daily_logs'
+    __table_args__ = (
+        Index('ix_daily_logs_user_id_log_date', 'user_id', 'log_date'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     log_date = Column(Date, nullable=False, index=True)
     energy_spent = Column(Integer, default=0)
     tasks_completed = Column(Integer, default=0)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.orm import declarative_base
+from datetime import datetime
+
+# 目录库与分片库是不同的数据库，使用独立的元数据
+DirectoryBase = declarative_base()
+
+class UserDirectory(DirectoryBase):
+    """用户名到分片的映射；id 即用户 id，由目录库统一分配"""
+    __tablename__ = 'user_directory'
+    
+    id = Column(Integer, primary_key=True)
+    username = Column(String(50), unique=True, nullable=False, index=True)
+    email = Column(String(100), unique=True, nullable=False)
+    shard = Column(Integer, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
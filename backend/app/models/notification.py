@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from datetime import datetime
+from ..database import Base
+
+class Notification(Base):
+    """提醒发件箱：调度器批量写入渲染好的提醒，发送器按批取出发送（见 services/reminders.py）"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        # 同一用户同一类提醒每个到期日只写一次，调度器重复运行不会重复提醒；
+        # 写入之后同一天才到期的任务不再补发（每个用户每天最多一条，见 services/reminders.py）
+        UniqueConstraint('user_id', 'kind', 'due_on', name='uq_notification_outbox_user_id_kind_due_on'),
+        # 按 id 顺序取待发送的提醒
+        Index('ix_notification_outbox_sent_at_id', 'sent_at', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    kind = Column(String(16), nullable=False)  # critical
+    due_on = Column(Date, nullable=False)  # 任务进入该状态的日期（用户本地日期）
+    message = Column(String(500), nullable=False)
+    task_ids = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)  # 发送失败次数
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)  # NULL 表示待发送
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, JSON
+from datetime import datetime
+from ..database import Base
+
+class RecommendationSnapshot(Base):
+    """每个用户当天的推荐快照（后台预计算，每个用户只保留最新一份）"""
+    __tablename__ = 'recommendation_snapshots'
+    
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    snapshot_date = Column(Date, nullable=False)  # 用户本地日期
+    payload = Column(JSON, nullable=False)  # 见 services/snapshots.py
+    computed_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+class SyncChange(Base):
+    """增量同步的变更日志：任务、类别、完成记录每次写入追加一行（见 services/sync.py）"""
+    __tablename__ = 'sync_changes'
+    __table_args__ = (
+        Index('ix_sync_changes_user_id_id', 'user_id', 'id'),
+        # id 即同步游标，删除最大行后也不能被复用
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    entity = Column(String(16), nullable=False)  # task / category / completion
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)  # 删除标记（墓碑）
+    changed_at = Column(DateTime, default=datetime.utcnow)
@@ -1,13 +1,20 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Float, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
 class Task(Base):
     __tablename__ = 'tasks'
+    __table_args__ = (
+        Index('ix_tasks_user_id_is_active', 'user_id', 'is_active'),
+        # 按日期查询全体用户中进入某个状态的任务
+        Index('ix_tasks_high_urgency_on', 'high_urgency_on'),
+        Index('ix_tasks_critical_urgency_on', 'critical_urgency_on'),
+        Index('ix_tasks_low_health_on', 'low_health_on'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     name = Column(String(100), nullable=False, index=True)
     description = Column(Text)
     energy_cost = Column(Integer, default=2)  # 1-5
@@ -19,14 +26,30 @@ class Task(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # 按最近完成日期预先算出的状态转换日期（见 services/transitions.py），NULL 表示不会达到
+    high_urgency_on = Column(Date)  # 紧迫度进入 high
+    critical_urgency_on = Column(Date)  # 紧迫度进入 critical
+    low_health_on = Column(Date)  # 健康度低于 50
+    # 完成间隔的指数加权平均（见 services/intervals.py），use_learned_interval 开启后代替 expected_interval
+    use_learned_interval = Column(Boolean, nullable=False, default=False, server_default='0')
+    learned_interval = Column(Float)
+    learned_samples = Column(Integer, nullable=False, default=0, server_default='0')
+    learned_last_on = Column(Date)  # 已计入估计的最近一次完成日期
+    # 全部完成日期的位图（见 services/daybits.py），第 i 位表示 completion_days_start + i 天
+    completion_days = Column(LargeBinary)
+    completion_days_start = Column(Date)
     
     # 关系
     user = relationship("User", back_populates="tasks")
     category = relationship("Category", back_populates="tasks")
     completions = relationship("Completion", back_populates="task", cascade="all, delete-orphan")
+    # 删除任务时由路由批量删除，不逐行加载
+    completion_archives = relationship(
+        "CompletionArchive", back_populates="task", cascade="all, delete-orphan", passive_deletes=True
+    )
     
     @property
     def last_done_date(self):
         if self.completions:
-            return max(c.completed_at.date() for c in self.completions)
+            return max(c.completed_on for c in self.completions)
         return None
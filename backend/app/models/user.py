@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import secrets
 from ..database import Base
 
+
+def new_sync_epoch() -> str:
+    """同步游标的纪元；用户迁移分片后重新生成，客户端持有的旧游标随之失效"""
+    return secrets.token_hex(8)
+
+
 class User(Base):
     __tablename__ = 'users'
     
@@ -14,6 +21,8 @@ class User(Base):
     daily_energy_budget = Column(Integer, default=15)
     max_daily_tasks = Column(Integer, default=5)
     settings = Column(JSON, default={})
+    sync_epoch = Column(String(16), nullable=False, default=new_sync_epoch, server_default='')
+    completions_archived_before = Column(Date)  # 早于该日期的完成记录可能已压缩到 completion_archives
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
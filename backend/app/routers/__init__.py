@@ -3,3 +3,6 @@ from .tasks import router as tasks_router
 from .today import router as today_router
 from .stats import router as stats_router
 from .categories import router as categories_router
+from .metrics import router as metrics_router
+from .dashboard import router as dashboard_router
+from .sync import router as sync_router
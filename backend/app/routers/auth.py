@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 
 from ..database import get_db
 from ..models import User
@@ -12,7 +13,10 @@ from ..utils.auth import (
     create_access_token, 
     get_current_user
 )
-from ..config import settings
+from ..config import Settings, get_settings
+from ..shards import ShardRouter, get_shards
+from ..services.cache import Cache, get_cache, commit_and_invalidate
+from ..utils.timezone import TIMEZONE_KEY, QUIET_HOURS_KEY, is_valid_timezone, is_valid_quiet_hours
 
 router = APIRouter(prefix="/api/auth", tags=["认证"])
 
@@ -20,34 +24,40 @@ router = APIRouter(prefix="/api/auth", tags=["认证"])
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards)
 ):
-    # 检查用户名是否已存在
-    existing_user = db.query(User).filter(
-        (User.username == user_data.username) | (User.email == user_data.email)
-    ).first()
-    if existing_user:
-        if existing_user.username == user_data.username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="用户名已存在"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="邮箱已被注册"
-            )
+    # 检查用户名是否已存在（分片时在目录库中检查）
+    conflict = shards.find_conflict(user_data.username, user_data.email)
+    if conflict == "username":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户名已存在"
+        )
+    elif conflict == "email":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="邮箱已被注册"
+        )
+    
+    # 分配用户 id 和所在分片
+    user_id, shard = shards.reserve(user_data.username, user_data.email)
     
     # 创建新用户
     hashed_password = get_password_hash(user_data.password)
     new_user = User(
+        id=user_id,
         username=user_data.username,
         email=user_data.email,
         password_hash=hashed_password
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    with shards.session(shard) as db:
+        try:
+            db.add(new_user)
+            db.commit()
+        except Exception:
+            shards.release(user_id)
+            raise
+        db.refresh(new_user)
     
     return new_user
 
@@ -55,10 +65,15 @@ def register(
 @router.post("/login", response_model=Token)
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    shards: ShardRouter = Depends(get_shards),
+    app_settings: Settings = Depends(get_settings)
 ):
-    # 查找用户
-    user = db.query(User).filter(User.username == form_data.username).first()
+    # 查找用户（先按目录确定所在分片）
+    user = None
+    shard = shards.locate(form_data.username)
+    if shard is not None:
+        with shards.session(shard) as db:
+            user = db.query(User).filter(User.username == form_data.username).first()
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,9 +82,11 @@ def login(
         )
     
     # 创建访问令牌
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token_expires = timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": user.username},
+        expires_delta=access_token_expires,
+        app_settings=app_settings
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -86,7 +103,8 @@ def get_me(
 def update_settings(
     settings_data: UserSettings,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     # 更新用户设置
     if settings_data.daily_energy_budget is not None:
@@ -94,9 +112,20 @@ def update_settings(
     if settings_data.max_daily_tasks is not None:
         current_user.max_daily_tasks = settings_data.max_daily_tasks
     if settings_data.settings is not None:
-        current_user.settings.update(settings_data.settings)
+        if TIMEZONE_KEY in settings_data.settings and not is_valid_timezone(settings_data.settings[TIMEZONE_KEY]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的时区"
+            )
+        if QUIET_HOURS_KEY in settings_data.settings and not is_valid_quiet_hours(settings_data.settings[QUIET_HOURS_KEY]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="无效的免打扰时段"
+            )
+        # JSON 列不追踪原地修改，需要整体赋值
+        current_user.settings = {**(current_user.settings or {}), **settings_data.settings}
     
-    db.commit()
+    commit_and_invalidate(db, cache, current_user.id)
     db.refresh(current_user)
     
     return current_user
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
 from ..models import User, Category
 from ..schemas import CategoryCreate, CategoryUpdate, CategoryResponse
+from ..services.cache import Cache, get_cache, commit_and_invalidate
+from ..services.sync import CATEGORY, record_change, record_task_changes
 from ..utils.auth import get_current_user
 
 router = APIRouter(prefix="/api/categories", tags=["类别管理"])
@@ -44,7 +46,8 @@ def get_category(
 def create_category(
     category: CategoryCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     """创建新类别"""
     # 检查同名类别
@@ -62,7 +65,9 @@ def create_category(
         user_id=current_user.id
     )
     db.add(new_category)
-    db.commit()
+    db.flush()
+    record_change(db, current_user.id, CATEGORY, new_category.id)
+    commit_and_invalidate(db, cache, current_user.id)
     db.refresh(new_category)
     
     return new_category
@@ -73,7 +78,8 @@ def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     """更新类别信息"""
     category = db.query(Category).filter(
@@ -97,8 +103,13 @@ def update_category(
     update_data = category_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(category, field, value)
+    record_change(db, current_user.id, CATEGORY, category.id)
+    # 任务响应中带有类别名称和颜色，这些任务也需要重新同步
+    if "name" in update_data or "color" in update_data:
+        from ..models import Task
+        record_task_changes(db, current_user.id, Task.category_id == category_id)
     
-    db.commit()
+    commit_and_invalidate(db, cache, current_user.id)
     db.refresh(category)
     
     return category
@@ -108,7 +119,8 @@ def update_category(
 def delete_category(
     category_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     """删除类别"""
     category = db.query(Category).filter(
@@ -122,9 +134,11 @@ def delete_category(
     # 删除类别（级联删除相关任务？或者将任务的category_id设为null？）
     # 这里选择将任务的category_id设为null
     from ..models import Task
+    record_task_changes(db, current_user.id, Task.category_id == category_id)
     db.query(Task).filter(Task.category_id == category_id).update({"category_id": None})
     
     db.delete(category)
-    db.commit()
+    record_change(db, current_user.id, CATEGORY, category.id, deleted=True)
+    commit_and_invalidate(db, cache, current_user.id)
     
     return None
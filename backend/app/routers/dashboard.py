@@ -0,0 +1,117 @@
+"""
+仪表盘聚合接口
+
+移动端冷启动时今日视图和统计页会分别请求 /api/today、/api/stats/daily、/api/stats/heatmap、
+/api/stats/category 和 /api/categories，每个请求都要重新认证、加载任务并扫描完成记录。
+/api/dashboard 一次加载任务（带完成日位图）和类别，在内存中推导出各个数据块，
+sections 参数选择需要的数据块。各数据块的内容与对应的独立接口一致。
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from ..config import Settings, get_settings
+from ..database import get_db
+from ..models import User, Task, Category
+from ..schemas import DashboardResponse, CategoryResponse
+from ..services.cache import Cache, get_cache, cached_for_user
+from ..services.daybits import completed_ids, last_done_map, daily_counts
+from ..services.singleflight import SingleFlight, get_single_flight
+from ..utils.auth import get_current_user
+from ..utils.responses import JSONBytesResponse, dump_model
+from ..utils.timezone import user_today
+from .stats import _daily_stats, _heatmap_from_counts, _category_stats_from_counts
+from .today import _build_today_view
+
+router = APIRouter(prefix="/api/dashboard", tags=["仪表盘"])
+
+DASHBOARD = TypeAdapter(DashboardResponse)
+
+SECTIONS = ("today", "daily", "heatmap", "category", "categories")
+
+
+def _parse_sections(sections: str) -> List[str]:
+    """解析逗号分隔的数据块名，按 SECTIONS 的顺序返回"""
+    requested = {name.strip() for name in sections.split(",") if name.strip()}
+    unknown = requested - set(SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的数据块：{', '.join(sorted(unknown))}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="至少需要一个数据块")
+    return [name for name in SECTIONS if name in requested]
+
+
+def _dashboard(
+    db: Session,
+    current_user: User,
+    sections: List[str],
+    days: int,
+    heatmap_days: int,
+    today: date
+) -> dict:
+    """按需计算各数据块"""
+    user_id = current_user.id
+    result = {}
+
+    # 任务和类别各查一次，今日视图、热力图、分类统计和类别列表共用
+    tasks: List[Task] = []
+    if "today" in sections or "heatmap" in sections or "category" in sections:
+        tasks = db.query(Task).filter(Task.user_id == user_id).order_by(Task.id).all()
+    categories: List[Category] = []
+    if "category" in sections or "categories" in sections:
+        categories = db.query(Category).filter(Category.user_id == user_id).order_by(Category.id).all()
+
+    if "today" in sections:
+        # 今日完成和最近完成日期都由任务的完成日位图得到
+        active_tasks = [task for task in tasks if task.is_active]
+        result["today"] = _build_today_view(
+            db,
+            current_user,
+            active_tasks,
+            today,
+            lambda: completed_ids(active_tasks, today),
+            lambda: last_done_map(active_tasks, until=today - timedelta(days=1))
+        )
+
+    if "daily" in sections:
+        result["daily"] = _daily_stats(db, user_id, days, today)
+
+    if "heatmap" in sections:
+        start = today - timedelta(days=heatmap_days - 1)
+        result["heatmap"] = _heatmap_from_counts(daily_counts(tasks, start, today), start, today)
+
+    if "category" in sections:
+        counts = Counter(task.category_id for task in tasks)
+        result["category"] = _category_stats_from_counts(categories, counts)
+
+    if "categories" in sections:
+        # 与 /api/categories 相同的顺序
+        ordered = sorted(categories, key=lambda category: (category.order, category.created_at))
+        result["categories"] = [CategoryResponse.model_validate(category) for category in ordered]
+
+    return result
+
+
+@router.get("", response_model=DashboardResponse)
+def get_dashboard(
+    sections: str = ",".join(SECTIONS),
+    days: int = 7,
+    heatmap_days: int = 365,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """一次返回今日视图、统计和类别列表，sections 为逗号分隔的数据块名"""
+    selected = _parse_sections(sections)
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "dashboard", (",".join(selected), days, heatmap_days, today),
+        lambda: dump_model(DASHBOARD, _dashboard(db, current_user, selected, days, heatmap_days, today))
+    ))
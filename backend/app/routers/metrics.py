@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(tags=["监控"])
+
+# Prometheus 文本格式的内容类型
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# Prometheus 指标
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics(request: Request):
+    """按路由统计的延迟、SQL 语句数和数据库耗时"""
+    return PlainTextResponse(
+        request.app.state.metrics.render(),
+        media_type=PROMETHEUS_CONTENT_TYPE
+    )
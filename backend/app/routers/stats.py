@@ -1,39 +1,106 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy import func
+from sqlalchemy.orm import Session, load_only
 from datetime import date, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
+from ..config import Settings, get_settings
 from ..database import get_db
-from ..models import User, Task, Completion, DailyLog
-from ..schemas import DailyStats, WeeklyStats, MonthlyStats, HeatmapData, TaskStats, CategoryStat
+from ..models import User, Task, DailyLog, Category
+from ..schemas import DailyStats, WeeklyStats, MonthlyStats, HeatmapData, TaskStats, CategoryStat, MoodStats
 from ..utils.auth import get_current_user
+from ..utils.responses import JSONBytesResponse, dump_model, dump_rows
+from ..utils.timezone import user_today
 from ..services.algorithm import LentoFlowAlgorithm, TaskState
+from ..services.intervals import task_interval
+from ..services import daybits
+from ..services.moods import mood_stats
+from ..services.singleflight import SingleFlight, get_single_flight
+from ..services.cache import Cache, get_cache, cached_for_user
 
 router = APIRouter(prefix="/api/stats", tags=["统计数据"])
 
-# 每日统计
-@router.get("/daily", response_model=List[DailyStats])
-def get_daily_stats(
-    days: int = 7,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    end_date = date.today()
+# 预先创建的序列化器，结果编码后再缓存
+DAILY_STATS = TypeAdapter(List[DailyStats])
+WEEKLY_STATS = TypeAdapter(List[WeeklyStats])
+MONTHLY_STATS = TypeAdapter(List[MonthlyStats])
+CATEGORY_STATS = TypeAdapter(List[CategoryStat])
+TASK_STATS = TypeAdapter(TaskStats)
+MOOD_STATS = TypeAdapter(MoodStats)
+
+# 心情统计未指定开始日期时的天数
+MOOD_DEFAULT_DAYS = 90
+# 心情统计区间的最大天数：按天展开的矩阵随区间线性增长，过长的区间直接拒绝
+MOOD_MAX_DAYS = 366 * 5
+
+
+def _user_tasks(db: Session, user_id: int) -> List[Task]:
+    """查询用户的全部任务（包括停用的），完成日位图随任务一起加载"""
+    return db.query(Task).filter(Task.user_id == user_id).order_by(Task.id).all()
+
+
+def _period_health(tasks: List[Task], last_done: Dict[int, date]) -> dict:
+    """根据截至某天的最近完成日期计算整体健康度"""
+    task_states = [
+        TaskState(
+            id=task.id,
+            name=task.name,
+            energy_cost=task.energy_cost,
+            expected_interval=task_interval(task),
+            importance=task.importance,
+            last_done_date=last_done.get(task.id),
+            is_completed_today=False
+        )
+        for task in tasks
+    ]
+    return LentoFlowAlgorithm.calculate_overall_health(task_states)
+
+
+def _daily_logs(db: Session, user_id: int, start_date: date, end_date: date) -> List[DailyLog]:
+    """查询区间内的每日日志"""
+    return db.query(DailyLog).filter(
+        DailyLog.user_id == user_id,
+        DailyLog.log_date >= start_date,
+        DailyLog.log_date <= end_date
+    ).all()
+
+
+def _average_daily_score(daily_logs: List[DailyLog], start_date: date, end_date: date) -> float:
+    """计算区间内的平均每日得分"""
+    daily_logs = [log for log in daily_logs if start_date <= log.log_date <= end_date]
+    return sum(log.daily_score for log in daily_logs if log.daily_score is not None) / len(daily_logs) if daily_logs else 0
+
+
+def _sum_totals(totals: Dict[date, tuple], start_date: date, end_date: date) -> tuple:
+    """汇总区间内的 (完成数, 能量消耗, 活跃天数)"""
+    count = energy = active_days = 0
+    for day, (day_count, day_energy) in totals.items():
+        if start_date <= day <= end_date:
+            count += day_count
+            energy += day_energy
+            active_days += 1
+    return count, energy, active_days
+
+
+def _daily_stats(db: Session, user_id: int, days: int, end_date: date) -> List[dict]:
+    """截至 end_date 的最近 days 天统计"""
     start_date = end_date - timedelta(days=days-1)
     
     # 查询每日日志
     daily_logs = db.query(DailyLog).filter(
-        DailyLog.user_id == current_user.id,
+        DailyLog.user_id == user_id,
         DailyLog.log_date >= start_date,
         DailyLog.log_date <= end_date
     ).order_by(DailyLog.log_date).all()
+    logs_by_date = {log.log_date: log for log in daily_logs}
     
     # 如果没有每日日志，生成默认数据
     result = []
     current = start_date
     while current <= end_date:
         # 查找当天的日志
-        log = next((l for l in daily_logs if l.log_date == current), None)
+        log = logs_by_date.get(current)
         if log:
             result.append({
                 "date": log.log_date,
@@ -54,65 +121,52 @@ def get_daily_stats(
     
     return result
 
-# 周统计
-@router.get("/weekly", response_model=List[WeeklyStats])
-def get_weekly_stats(
-    weeks: int = 4,
+# 每日统计
+@router.get("/daily", response_model=List[DailyStats])
+def get_daily_stats(
+    days: int = 7,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
 ):
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.daily", (days, today),
+        lambda: dump_model(DAILY_STATS, _daily_stats(db, current_user.id, days, today))
+    ))
+
+
+def _weekly_stats(db: Session, user_id: int, weeks: int, today: date) -> List[dict]:
+    """截至今天的最近 weeks 周统计"""
     result = []
-    today = date.today()
+    all_tasks = _user_tasks(db, user_id)
+    tasks = [task for task in all_tasks if task.is_active]
+    
+    # 由完成日位图汇总整个区间每天的完成数和能量、各周末的最近完成日期
+    range_start = today - timedelta(days=7*weeks-1)
+    totals = daybits.daily_totals(all_tasks, range_start, today)
+    daily_logs = _daily_logs(db, user_id, range_start, today)
+    week_ends = [today - timedelta(days=7*i) for i in range(weeks)]
+    last_done_by_end = daybits.last_done_at(tasks, week_ends)
     
-    for i in range(weeks):
+    for week_end in week_ends:
         # 计算周的开始和结束日期（周一到周日）
-        week_end = today - timedelta(days=7*i)
         week_start = week_end - timedelta(days=6)
         
-        # 查询本周的完成记录
-        completions = db.query(Completion).join(Task).filter(
-            Task.user_id == current_user.id,
-            Completion.completed_at >= week_start,
-            Completion.completed_at <= week_end
-        ).all()
-        
-        # 查询本周的任务
-        tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.is_active == True
-        ).all()
-        
         # 计算统计数据
-        total_energy_spent = sum(task.energy_cost for completion in completions for task in tasks if task.id == completion.task_id)
-        total_tasks_completed = len(completions)
+        total_tasks_completed, total_energy_spent, _ = _sum_totals(totals, week_start, week_end)
         
         # 计算平均健康度
-        task_states = []
-        for task in tasks:
-            last_done = max([c.completed_at.date() for c in task.completions if c.completed_at.date() <= week_end], default=None)
-            task_states.append(TaskState(
-                id=task.id,
-                name=task.name,
-                energy_cost=task.energy_cost,
-                expected_interval=task.expected_interval,
-                importance=task.importance,
-                last_done_date=last_done,
-                is_completed_today=False
-            ))
-        
-        overall_health = LentoFlowAlgorithm.calculate_overall_health(task_states)
+        overall_health = _period_health(tasks, last_done_by_end[week_end])
         
         # 计算完成率
         total_expected = sum(len(tasks) for _ in range(7))  # 简化计算，实际应该根据每个任务的期望间隔
         completion_rate = total_tasks_completed / total_expected if total_expected > 0 else 0
         
         # 计算平均每日得分
-        daily_logs = db.query(DailyLog).filter(
-            DailyLog.user_id == current_user.id,
-            DailyLog.log_date >= week_start,
-            DailyLog.log_date <= week_end
-        ).all()
-        avg_daily_score = sum(log.daily_score for log in daily_logs if log.daily_score is not None) / len(daily_logs) if daily_logs else 0
+        avg_daily_score = _average_daily_score(daily_logs, week_start, week_end)
         
         result.append({
             "week_start": week_start,
@@ -126,78 +180,64 @@ def get_weekly_stats(
     
     return result
 
-# 月统计
-@router.get("/monthly", response_model=List[MonthlyStats])
-def get_monthly_stats(
-    months: int = 6,
+# 周统计
+@router.get("/weekly", response_model=List[WeeklyStats])
+def get_weekly_stats(
+    weeks: int = 4,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
 ):
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.weekly", (weeks, today),
+        lambda: dump_model(WEEKLY_STATS, _weekly_stats(db, current_user.id, weeks, today))
+    ))
+
+
+def _monthly_stats(db: Session, user_id: int, months: int, today: date) -> List[dict]:
+    """包括本月在内的最近 months 个月统计"""
     result = []
-    today = date.today()
+    all_tasks = _user_tasks(db, user_id)
+    tasks = [task for task in all_tasks if task.is_active]
     
+    # 计算每个月的开始和结束日期
+    periods = []
     for i in range(months):
         year = today.year
         month = today.month - i
-        if month <= 0:
+        while month <= 0:
             month += 12
             year -= 1
         
-        # 计算月的开始和结束日期
         start_date = date(year, month, 1)
         if month == 12:
             end_date = date(year, month, 31)
         else:
             end_date = date(year, month+1, 1) - timedelta(days=1)
-        
-        # 查询本月的完成记录
-        completions = db.query(Completion).join(Task).filter(
-            Task.user_id == current_user.id,
-            Completion.completed_at >= start_date,
-            Completion.completed_at <= end_date
-        ).all()
-        
-        # 查询本月的任务
-        tasks = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.is_active == True
-        ).all()
-        
-        # 计算统计数据
-        total_energy_spent = sum(task.energy_cost for completion in completions for task in tasks if task.id == completion.task_id)
-        total_tasks_completed = len(completions)
-        
-        # 计算活跃天数
-        active_dates = set([c.completed_at.date() for c in completions])
-        active_days = len(active_dates)
+        periods.append((year, month, start_date, end_date))
+    
+    # 由完成日位图汇总整个区间的完成记录
+    if periods:
+        totals = daybits.daily_totals(all_tasks, periods[-1][2], periods[0][3])
+        daily_logs = _daily_logs(db, user_id, periods[-1][2], periods[0][3])
+        last_done_by_end = daybits.last_done_at(tasks, [period[3] for period in periods])
+    
+    for year, month, start_date, end_date in periods:
+        # 计算统计数据与活跃天数
+        total_tasks_completed, total_energy_spent, active_days = _sum_totals(totals, start_date, end_date)
         
         # 计算平均健康度
-        task_states = []
-        for task in tasks:
-            last_done = max([c.completed_at.date() for c in task.completions if c.completed_at.date() <= end_date], default=None)
-            task_states.append(TaskState(
-                id=task.id,
-                name=task.name,
-                energy_cost=task.energy_cost,
-                expected_interval=task.expected_interval,
-                importance=task.importance,
-                last_done_date=last_done,
-                is_completed_today=False
-            ))
-        
-        overall_health = LentoFlowAlgorithm.calculate_overall_health(task_states)
+        overall_health = _period_health(tasks, last_done_by_end[end_date])
         
         # 计算完成率
         total_expected = sum(len(tasks) for _ in range((end_date - start_date).days + 1))  # 简化计算
         completion_rate = total_tasks_completed / total_expected if total_expected > 0 else 0
         
         # 计算平均每日得分
-        daily_logs = db.query(DailyLog).filter(
-            DailyLog.user_id == current_user.id,
-            DailyLog.log_date >= start_date,
-            DailyLog.log_date <= end_date
-        ).all()
-        avg_daily_score = sum(log.daily_score for log in daily_logs if log.daily_score is not None) / len(daily_logs) if daily_logs else 0
+        avg_daily_score = _average_daily_score(daily_logs, start_date, end_date)
         
         result.append({
             "month": month,
@@ -212,31 +252,38 @@ def get_monthly_stats(
     
     return result
 
-# 热力图数据
-@router.get("/heatmap", response_model=HeatmapData)
-def get_heatmap_data(
-    days: int = 365,
+# 月统计
+@router.get("/monthly", response_model=List[MonthlyStats])
+def get_monthly_stats(
+    months: int = 6,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
 ):
-    end_date = date.today()
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.monthly", (months, today),
+        lambda: dump_model(MONTHLY_STATS, _monthly_stats(db, current_user.id, months, today))
+    ))
+
+
+def _heatmap_data(db: Session, user_id: int, days: int, end_date: date) -> dict:
+    """截至 end_date 的最近 days 天每日完成数"""
     start_date = end_date - timedelta(days=days-1)
     
-    # 查询完成记录
-    completions = db.query(Completion).join(Task).filter(
-        Task.user_id == current_user.id,
-        Completion.completed_at >= start_date,
-        Completion.completed_at <= end_date
+    # 只加载各任务的完成日位图，按列求和得到每天的完成数
+    tasks = db.query(Task).options(load_only(Task.id, Task.completion_days, Task.completion_days_start)).filter(
+        Task.user_id == user_id
     ).all()
+    data_by_date = daybits.daily_counts(tasks, start_date, end_date)
     
-    # 按日期分组计算完成数
-    data_by_date = {}
-    for completion in completions:
-        comp_date = completion.completed_at.date()
-        if comp_date not in data_by_date:
-            data_by_date[comp_date] = 0
-        data_by_date[comp_date] += 1
-    
+    return _heatmap_from_counts(data_by_date, start_date, end_date)
+
+
+def _heatmap_from_counts(data_by_date: Dict[date, int], start_date: date, end_date: date) -> dict:
+    """由每日完成数生成 [start_date, end_date] 的热力图"""
     # 生成完整的日期范围数据
     data = []
     min_value = 0
@@ -257,25 +304,46 @@ def get_heatmap_data(
         "max_value": max_value
     }
 
-# 分类统计
-@router.get("/category", response_model=List[CategoryStat])
-def get_category_stats(
+# 热力图数据
+@router.get("/heatmap", response_model=HeatmapData)
+def get_heatmap_data(
+    days: int = 365,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
 ):
-    """获取任务分类统计"""
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.heatmap", (days, today),
+        lambda: dump_rows(_heatmap_data(db, current_user.id, days, today))
+    ))
+
+
+def _category_stats(db: Session, user_id: int) -> List[dict]:
+    """各类别（含未分类）的任务数"""
     # 查询用户所有类别
     categories = db.query(Category).filter(
-        Category.user_id == current_user.id
+        Category.user_id == user_id
     ).all()
     
-    # 查询每个类别的任务数量
+    # 一次分组查询每个类别（含未分类）的任务数量
+    counts = dict(db.query(
+        Task.category_id,
+        func.count(Task.id)
+    ).filter(
+        Task.user_id == user_id
+    ).group_by(Task.category_id).all())
+    
+    return _category_stats_from_counts(categories, counts)
+
+
+def _category_stats_from_counts(categories: List[Category], counts: Dict[Optional[int], int]) -> List[dict]:
+    """由各类别 id（None 为未分类）的任务数生成分类统计"""
     result = []
     for category in categories:
-        task_count = db.query(Task).filter(
-            Task.user_id == current_user.id,
-            Task.category_id == category.id
-        ).count()
+        task_count = counts.get(category.id, 0)
         
         if task_count > 0:
             result.append({
@@ -284,10 +352,7 @@ def get_category_stats(
             })
     
     # 统计未分类的任务
-    uncategorized_count = db.query(Task).filter(
-        Task.user_id == current_user.id,
-        Task.category_id.is_(None)
-    ).count()
+    uncategorized_count = counts.get(None, 0)
     
     if uncategorized_count > 0:
         result.append({
@@ -297,65 +362,47 @@ def get_category_stats(
     
     return result
 
-# 单任务统计
-@router.get("/task/{task_id}", response_model=TaskStats)
-def get_task_stats(
-    task_id: int,
+# 分类统计
+@router.get("/category", response_model=List[CategoryStat])
+def get_category_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
 ):
+    """获取任务分类统计"""
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.category", (),
+        lambda: dump_model(CATEGORY_STATS, _category_stats(db, current_user.id))
+    ))
+
+
+def _task_stats(db: Session, user_id: int, task_id: int, today: date) -> dict:
+    """单个任务的完成次数、连续天数和完成率"""
     # 检查任务是否存在
     task = db.query(Task).filter(
         Task.id == task_id,
-        Task.user_id == current_user.id
+        Task.user_id == user_id
     ).first()
     
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
     
-    # 查询所有完成记录
-    completions = db.query(Completion).filter(
-        Completion.task_id == task_id
-    ).order_by(Completion.completed_at).all()
-    
-    total_completions = len(completions)
-    
-    # 计算连续完成天数（简化版）
-    longest_streak = 0
-    current_streak = 0
-    if completions:
-        completion_dates = sorted([c.completed_at.date() for c in completions])
-        
-        # 计算最长连续
-        streak = 1
-        for i in range(1, len(completion_dates)):
-            if (completion_dates[i] - completion_dates[i-1]).days == 1:
-                streak += 1
-                longest_streak = max(longest_streak, streak)
-            else:
-                streak = 1
-        longest_streak = max(longest_streak, streak)
-        
-        # 计算当前连续
-        today = date.today()
-        if completion_dates[-1] == today:
-            current_streak = 1
-            for i in range(len(completion_dates)-2, -1, -1):
-                if (completion_dates[i+1] - completion_dates[i]).days == 1:
-                    current_streak += 1
-                else:
-                    break
+    # 完成次数、连续天数和最近完成日期都由任务的完成日位图算出（包括已压缩的完成记录）
+    total_completions = daybits.total_days(task)
+    longest_streak = daybits.longest_run(task)
+    current_streak = daybits.run_ending(task, today)
+    last_completed = daybits.last_day(task)
     
     # 计算完成率
-    expected_completions = (date.today() - task.created_at.date()).days / task.expected_interval
+    expected_completions = (today - task.created_at.date()).days / task_interval(task)
     completion_rate = total_completions / expected_completions if expected_completions > 0 else 0
     
     # 计算平均健康度
     avg_health = 0
-    if completions:
+    if last_completed:
         # 简化计算，实际应该基于每次完成后的健康度
-        last_done = max([c.completed_at.date() for c in completions])
-        avg_health = LentoFlowAlgorithm.calculate_health(last_done, task.expected_interval)
+        avg_health = LentoFlowAlgorithm.calculate_health(last_completed, task_interval(task), today)
     
     return {
         "task_id": task.id,
@@ -365,5 +412,47 @@ def get_task_stats(
         "current_streak": current_streak,
         "completion_rate": round(completion_rate, 2),
         "average_health": round(avg_health, 1),
-        "last_completed": completions[-1].completed_at.date() if completions else None
+        "last_completed": last_completed
     }
+
+# 单任务统计
+@router.get("/task/{task_id}", response_model=TaskStats)
+def get_task_stats(
+    task_id: int,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    today = user_today(current_user, app_settings=app_settings)
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.task", (task_id, today),
+        lambda: dump_model(TASK_STATS, _task_stats(db, current_user.id, task_id, today))
+    ))
+
+
+# 心情统计
+@router.get("/mood", response_model=MoodStats)
+def get_mood_stats(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """[start, end]（默认截至今天的最近 90 天）内按任务、类别、星期的心情汇总，以及心情与各习惯的相关性"""
+    end = end or user_today(current_user, app_settings=app_settings)
+    start = start or end - timedelta(days=MOOD_DEFAULT_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    if (end - start).days >= MOOD_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"统计区间不能超过 {MOOD_MAX_DAYS} 天")
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "stats.mood", (start, end),
+        lambda: dump_model(MOOD_STATS, mood_stats(
+            db, current_user.id, start, end, current_user.completions_archived_before
+        ))
+    ))
@@ -0,0 +1,135 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session, joinedload
+from typing import Dict, List, Optional
+
+from ..database import get_db
+from ..models import User, Task, Category, Completion
+from ..schemas import SyncResponse
+from ..services.completions import last_done_dates
+from ..services.sync import (
+    TASK, CATEGORY, COMPLETION, format_cursor, parse_cursor, latest_change_id, changes_since
+)
+from ..utils.auth import get_current_user
+from ..utils.responses import JSONBytesResponse, dump_rows
+from .tasks import task_to_response
+
+router = APIRouter(prefix="/api/sync", tags=["同步"])
+
+
+def _category_row(category: Category) -> dict:
+    """按 CategoryResponse 的字段转换为字典"""
+    return {
+        "id": category.id,
+        "name": category.name,
+        "color": category.color,
+        "order": category.order,
+        "is_active": category.is_active,
+        "user_id": category.user_id,
+        "created_at": category.created_at,
+        "updated_at": category.updated_at
+    }
+
+
+def _completion_row(completion: Completion) -> dict:
+    return {
+        "id": completion.id,
+        "task_id": completion.task_id,
+        "completed_on": completion.completed_on,
+        "completed_at": completion.completed_at,
+        "note": completion.note,
+        "mood": completion.mood
+    }
+
+
+def _full_state(db: Session, user_id: int) -> dict:
+    """全量数据"""
+    tasks = db.query(Task).options(joinedload(Task.category)).filter(
+        Task.user_id == user_id
+    ).order_by(Task.id).all()
+    last_done = last_done_dates(db, user_id)
+    categories = db.query(Category).filter(Category.user_id == user_id).order_by(Category.id).all()
+    completions = db.query(Completion).join(Task).filter(
+        Task.user_id == user_id
+    ).order_by(Completion.id).all()
+    return {
+        "tasks": [task_to_response(task, last_done.get(task.id)) for task in tasks],
+        "categories": [_category_row(category) for category in categories],
+        "completions": [_completion_row(completion) for completion in completions],
+        "deleted": {"tasks": [], "categories": [], "completions": []}
+    }
+
+
+def _changed_state(db: Session, user_id: int, changes: Dict[str, Dict[int, bool]]) -> dict:
+    """变化过的行的当前内容和被删除的 id；记为修改但已不存在的任务和类别按删除处理
+
+    完成记录只在撤销时记墓碑：记为修改但已不存在的完成记录要么随任务删除（客户端按任务墓碑一并删除），
+    要么被压缩进了月度行（见 services/archive.py），两种情况都不能作为删除发给客户端
+    """
+    def split(entity: str):
+        upserted = [entity_id for entity_id, deleted in changes[entity].items() if not deleted]
+        deleted = [entity_id for entity_id, deleted in changes[entity].items() if deleted]
+        return upserted, deleted
+
+    task_ids, deleted_tasks = split(TASK)
+    category_ids, deleted_categories = split(CATEGORY)
+    completion_ids, deleted_completions = split(COMPLETION)
+
+    tasks: List[Task] = []
+    last_done: Dict[int, object] = {}
+    if task_ids:
+        tasks = db.query(Task).options(joinedload(Task.category)).filter(
+            Task.user_id == user_id,
+            Task.id.in_(task_ids)
+        ).order_by(Task.id).all()
+        last_done = last_done_dates(db, user_id, task_ids=task_ids)
+    categories: List[Category] = []
+    if category_ids:
+        categories = db.query(Category).filter(
+            Category.user_id == user_id,
+            Category.id.in_(category_ids)
+        ).order_by(Category.id).all()
+    completions: List[Completion] = []
+    if completion_ids:
+        completions = db.query(Completion).join(Task).filter(
+            Task.user_id == user_id,
+            Completion.id.in_(completion_ids)
+        ).order_by(Completion.id).all()
+
+    found_tasks = {task.id for task in tasks}
+    found_categories = {category.id for category in categories}
+    return {
+        "tasks": [task_to_response(task, last_done.get(task.id)) for task in tasks],
+        "categories": [_category_row(category) for category in categories],
+        "completions": [_completion_row(completion) for completion in completions],
+        "deleted": {
+            "tasks": sorted(deleted_tasks + [i for i in task_ids if i not in found_tasks]),
+            "categories": sorted(deleted_categories + [i for i in category_ids if i not in found_categories]),
+            "completions": sorted(deleted_completions)
+        }
+    }
+
+
+@router.get("", response_model=SyncResponse)
+def sync(
+    since: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """返回游标 since 之后变化的任务、类别和完成记录；不带游标或游标失效时返回全量数据"""
+    user_id = current_user.id
+    epoch = current_user.sync_epoch
+    since_id = parse_cursor(since, epoch)
+
+    if since_id is None:
+        # 先取游标再读数据，读取期间的写入会在下次同步时再返回一次
+        latest = latest_change_id(db, user_id)
+        payload = _full_state(db, user_id)
+    else:
+        latest, changes = changes_since(db, user_id, since_id)
+        payload = _changed_state(db, user_id, changes)
+
+    return JSONBytesResponse(dump_rows({
+        "cursor": format_cursor(epoch, latest),
+        "reset": since_id is None,
+        **payload
+    }))
@@ -1,14 +1,99 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
+from datetime import date
 from typing import List, Optional
 
+from ..config import Settings, get_settings
 from ..database import get_db
-from ..models import User, Task, Category
+from ..models import User, Task, Category, Completion, CompletionArchive
 from ..schemas import TaskCreate, TaskResponse, TaskUpdate
+from ..services.completions import last_done_dates, task_last_done
+from ..services.cache import Cache, get_cache, commit_and_invalidate
+from ..services.sync import TASK, record_change
+from ..services.transitions import apply_transitions
 from ..utils.auth import get_current_user
+from ..utils.fields import parse_fields
+from ..utils.timezone import user_today
+from ..utils.responses import JSONBytesResponse, dump_rows
 
 router = APIRouter(prefix="/api/tasks", tags=["任务"])
 
+# TaskResponse 字段对应的列；类别名称和颜色需要连接类别表，last_done_date 单独分组查询
+TASK_COLUMNS = {
+    "id": Task.id,
+    "name": Task.name,
+    "description": Task.description,
+    "energy_cost": Task.energy_cost,
+    "expected_interval": Task.expected_interval,
+    "importance": Task.importance,
+    "category_id": Task.category_id,
+    "category_name": Category.name,
+    "category_color": Category.color,
+    "color": Task.color,
+    "icon": Task.icon,
+    "is_active": Task.is_active,
+    "use_learned_interval": Task.use_learned_interval,
+    "learned_interval": Task.learned_interval,
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+}
+
+
+def task_to_response(task: Task, last_done: Optional[date]) -> dict:
+    """按 TaskResponse 的字段转换为字典（列类型与模型一致，可直接编码）；最近完成日期由调用方查询后传入"""
+    category = task.category
+    return {
+        "id": task.id,
+        "name": task.name,
+        "description": task.description,
+        "energy_cost": task.energy_cost,
+        "expected_interval": task.expected_interval,
+        "importance": task.importance,
+        "category_id": task.category_id,
+        "category_name": category.name if category else None,
+        "category_color": category.color if category else None,
+        "color": task.color,
+        "icon": task.icon,
+        "is_active": task.is_active,
+        "use_learned_interval": task.use_learned_interval,
+        "learned_interval": task.learned_interval,
+        "last_done_date": last_done,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at
+    }
+
+
+def _filter_tasks(query, user_id: int, category_id: Optional[int], is_active: Optional[bool]):
+    """任务列表的过滤条件"""
+    query = query.filter(Task.user_id == user_id)
+    if category_id is not None:
+        query = query.filter(Task.category_id == category_id)
+    if is_active is not None:
+        query = query.filter(Task.is_active == is_active)
+    return query
+
+
+def _task_rows(
+    db: Session,
+    user_id: int,
+    fields: List[str],
+    skip: int,
+    limit: int,
+    category_id: Optional[int],
+    is_active: Optional[bool]
+) -> List[dict]:
+    """只查询 fields 需要的列"""
+    query = db.query(*[TASK_COLUMNS[name].label(name) for name in fields if name in TASK_COLUMNS])
+    if "category_name" in fields or "category_color" in fields:
+        query = query.outerjoin(Category, Task.category_id == Category.id)
+    rows = [row._asdict() for row in _filter_tasks(query, user_id, category_id, is_active).offset(skip).limit(limit)]
+    if "last_done_date" in fields and rows:
+        last_done = last_done_dates(db, user_id, task_ids=[row["id"] for row in rows])
+        for row in rows:
+            row["last_done_date"] = last_done.get(row["id"])
+    return rows
+
+
 # 获取所有任务
 @router.get("", response_model=List[TaskResponse])
 def get_tasks(
@@ -16,42 +101,25 @@ def get_tasks(
     limit: int = 100,
     category_id: Optional[int] = None,
     is_active: Optional[bool] = None,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    query = db.query(Task).filter(Task.user_id == current_user.id)
-    
-    # 过滤条件
-    if category_id is not None:
-        query = query.filter(Task.category_id == category_id)
-    if is_active is not None:
-        query = query.filter(Task.is_active == is_active)
+    # 指定 fields 时只查询和返回这些字段（id 始终返回）
+    selected = parse_fields(fields, TaskResponse)
+    if selected is not None:
+        return JSONBytesResponse(dump_rows(
+            _task_rows(db, current_user.id, selected, skip, limit, category_id, is_active)
+        ))
     
-    tasks = query.offset(skip).limit(limit).all()
+    query = _filter_tasks(db.query(Task), current_user.id, category_id, is_active)
     
-    # 转换为响应模型
-    result = []
-    for task in tasks:
-        task_dict = task.__dict__.copy()
-        result.append(TaskResponse(
-            id=task.id,
-            name=task.name,
-            description=task.description,
-            energy_cost=task.energy_cost,
-            expected_interval=task.expected_interval,
-            importance=task.importance,
-            category_id=task.category_id,
-            category_name=task.category.name if task.category else None,
-            category_color=task.category.color if task.category else None,
-            color=task.color,
-            icon=task.icon,
-            is_active=task.is_active,
-            last_done_date=task.last_done_date,
-            created_at=task.created_at,
-            updated_at=task.updated_at
-        ))
+    # 类别随任务一起加载，最近完成日期按本页任务一次分组查询，避免逐个任务查询
+    tasks = query.options(joinedload(Task.category)).offset(skip).limit(limit).all()
+    last_done = last_done_dates(db, current_user.id, task_ids=[task.id for task in tasks]) if tasks else {}
     
-    return result
+    # 直接编码，不再逐个构造并校验 TaskResponse
+    return JSONBytesResponse(dump_rows([task_to_response(task, last_done.get(task.id)) for task in tasks]))
 
 # 获取单个任务
 @router.get("/{task_id}", response_model=TaskResponse)
@@ -60,7 +128,7 @@ def get_task(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    task = db.query(Task).filter(
+    task = db.query(Task).options(joinedload(Task.category)).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
     ).first()
@@ -72,30 +140,16 @@ def get_task(
         )
     
     # 转换为响应模型
-    return TaskResponse(
-        id=task.id,
-        name=task.name,
-        description=task.description,
-        energy_cost=task.energy_cost,
-        expected_interval=task.expected_interval,
-        importance=task.importance,
-        category_id=task.category_id,
-        category_name=task.category.name if task.category else None,
-        category_color=task.category.color if task.category else None,
-        color=task.color,
-        icon=task.icon,
-        is_active=task.is_active,
-        last_done_date=task.last_done_date,
-        created_at=task.created_at,
-        updated_at=task.updated_at
-    )
+    return task_to_response(task, task_last_done(db, task.id))
 
 # 创建任务
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
     task_data: TaskCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     # 验证category_id是否存在
     if task_data.category_id is not None:
@@ -113,28 +167,15 @@ def create_task(
         **task_data.dict(),
         user_id=current_user.id
     )
+    apply_transitions(new_task, None, user_today(current_user, app_settings=app_settings))
     db.add(new_task)
-    db.commit()
+    db.flush()
+    record_change(db, current_user.id, TASK, new_task.id)
+    commit_and_invalidate(db, cache, current_user.id)
     db.refresh(new_task)
     
     # 转换为响应模型
-    return TaskResponse(
-        id=new_task.id,
-        name=new_task.name,
-        description=new_task.description,
-        energy_cost=new_task.energy_cost,
-        expected_interval=new_task.expected_interval,
-        importance=new_task.importance,
-        category_id=new_task.category_id,
-        category_name=new_task.category.name if new_task.category else None,
-        category_color=new_task.category.color if new_task.category else None,
-        color=new_task.color,
-        icon=new_task.icon,
-        is_active=new_task.is_active,
-        last_done_date=new_task.last_done_date,
-        created_at=new_task.created_at,
-        updated_at=new_task.updated_at
-    )
+    return task_to_response(new_task, None)
 
 # 更新任务
 @router.put("/{task_id}", response_model=TaskResponse)
@@ -142,7 +183,9 @@ def update_task(
     task_id: int,
     task_data: TaskUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     task = db.query(Task).filter(
         Task.id == task_id,
@@ -169,37 +212,31 @@ def update_task(
     
     # 更新任务字段
     update_data = task_data.dict(exclude_unset=True)
+    
+    # 间隔（期望间隔或是否使用学习间隔）或重要性变化时重算转换日期；
+    # 最近完成日期在修改字段前查询（避免提前 flush），响应中复用
+    refresh_transitions = bool({"expected_interval", "use_learned_interval", "importance"} & update_data.keys())
+    last_done = task_last_done(db, task.id) if refresh_transitions else None
+    
     for key, value in update_data.items():
         setattr(task, key, value)
+    record_change(db, current_user.id, TASK, task.id)
+    if refresh_transitions:
+        apply_transitions(task, last_done, user_today(current_user, app_settings=app_settings))
     
-    db.commit()
+    commit_and_invalidate(db, cache, current_user.id)
     db.refresh(task)
     
     # 转换为响应模型
-    return TaskResponse(
-        id=task.id,
-        name=task.name,
-        description=task.description,
-        energy_cost=task.energy_cost,
-        expected_interval=task.expected_interval,
-        importance=task.importance,
-        category_id=task.category_id,
-        category_name=task.category.name if task.category else None,
-        category_color=task.category.color if task.category else None,
-        color=task.color,
-        icon=task.icon,
-        is_active=task.is_active,
-        last_done_date=task.last_done_date,
-        created_at=task.created_at,
-        updated_at=task.updated_at
-    )
+    return task_to_response(task, last_done if refresh_transitions else task_last_done(db, task.id))
 
 # 删除任务
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     task = db.query(Task).filter(
         Task.id == task_id,
@@ -212,7 +249,11 @@ def delete_task(
             detail="任务不存在"
         )
     
+    # 先批量删除完成记录（包括已压缩的），避免级联删除时逐条加载
+    db.query(Completion).filter(Completion.task_id == task.id).delete(synchronize_session=False)
+    db.query(CompletionArchive).filter(CompletionArchive.task_id == task.id).delete(synchronize_session=False)
     db.delete(task)
-    db.commit()
+    record_change(db, current_user.id, TASK, task.id, deleted=True)
+    commit_and_invalidate(db, cache, current_user.id)
     
     return None
@@ -1,55 +1,80 @@
+import hashlib
+
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from datetime import date, datetime
-from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, load_only
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Set
 
+from ..config import Settings, get_settings
 from ..database import get_db
-from ..models import User, Task, Completion
-from ..schemas.today import TodayResponse, CompleteTaskRequest
+from ..models import User, Task
+from ..schemas.today import (
+    TodayResponse, TaskStatus, CompleteTaskRequest, SimulateRequest, SimulateResponse, PlanResponse
+)
 from ..services.algorithm import LentoFlowAlgorithm, TaskState, MotivationalMessages
+from ..services.completions import record_completion, remove_completion
+from ..services.daybits import completed_ids, last_done_map
+from ..services.write_queue import WriteQueue, get_write_queue, run_write
+from ..services.snapshots import load_payload, build_payload, apply_payload
+from ..services.simulation import simulate
+from ..services.planner import PLAN_MIN_DAYS, PLAN_MAX_DAYS, plan_days, load_plan_state, save_plan_state
+from ..services.singleflight import SingleFlight, get_single_flight
+from ..services.cache import Cache, get_cache, cached_for_user, invalidate_user
 from ..utils.auth import get_current_user
+from ..utils.timezone import user_today
+from ..utils.fields import parse_fields
+from ..utils.responses import JSONBytesResponse, dump_model, dump_rows
 
 router = APIRouter(prefix="/api/today", tags=["今日视图"])
 
+# 预先创建的序列化器：TodayResponse 在构造时已校验，编码时不再重复校验
+TODAY_VIEW = TypeAdapter(TodayResponse)
 
-def tasks_to_states(tasks: List[Task], today: date) -> List[TaskState]:
-    """将数据库任务转换为算法状态对象"""
-    states = []
-    for task in tasks:
-        # 检查今天是否已完成
-        is_completed = any(
-            c.completed_at.date() == today 
-            for c in task.completions
-        )
-        
-        states.append(TaskState(
-            id=task.id,
-            name=task.name,
-            energy_cost=task.energy_cost,
-            expected_interval=task.expected_interval,
-            importance=task.importance,
-            last_done_date=task.last_done_date,
-            is_completed_today=is_completed,
-            color=task.color,
-            icon=task.icon
-        ))
-    return states
 
+def _active_tasks(db: Session, user_id: int) -> List[Task]:
+    """用户所有活跃任务（按 id 排序），只加载计算和展示用到的列（不加载描述等）
 
-@router.get("", response_model=TodayResponse)
-def get_today_view(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """获取今日视图"""
-    today = date.today()
-    
-    # 获取用户所有活跃任务
-    tasks = db.query(Task).filter(
-        Task.user_id == current_user.id,
+    完成日位图随任务一起加载，今天是否完成和最近完成日期不再查询完成记录。
+    """
+    return db.query(Task).options(load_only(
+        Task.id, Task.name, Task.energy_cost, Task.expected_interval, Task.importance, Task.color, Task.icon,
+        Task.use_learned_interval, Task.learned_interval, Task.learned_samples,
+        Task.completion_days, Task.completion_days_start
+    )).filter(
+        Task.user_id == user_id,
         Task.is_active == True
-    ).all()
-    
+    ).order_by(Task.id).all()
+
+
+def _today_view(db: Session, current_user: User, today: date, fields: Optional[List[str]] = None):
+    """计算今日视图；fields 为任务条目需要返回的字段（None 表示全部）"""
+    tasks = _active_tasks(db, current_user.id)
+    return _build_today_view(
+        db,
+        current_user,
+        tasks,
+        today,
+        lambda: completed_ids(tasks, today),
+        lambda: last_done_map(tasks, until=today - timedelta(days=1)),
+        fields
+    )
+
+
+def _build_today_view(
+    db: Session,
+    current_user: User,
+    tasks: List[Task],
+    today: date,
+    load_completed_ids: Callable[[], Set[int]],
+    load_last_done: Callable[[], Dict[int, date]],
+    fields: Optional[List[str]] = None
+):
+    """由活跃任务（按 id 排序）计算今日视图
+
+    今天的完成记录和今天之前的最近完成日期按需加载，仪表盘传入已查询的数据。
+    指定 fields 时任务条目只包含这些字段，返回字典（不再按 TodayResponse 校验）。
+    """
     if not tasks:
         return {
             "date": today,
@@ -63,14 +88,23 @@ def get_today_view(
             "motivational_message": MotivationalMessages.get_daily_message(100, 0)
         }
     
-    # 转换为状态对象
-    task_states = tasks_to_states(tasks, today)
+    # 读取预计算的推荐快照，缺失或失效时按今天之前的完成记录实时计算
+    payload = load_payload(db, current_user, tasks, today)
+    if payload is None:
+        payload = build_payload(
+            tasks,
+            load_last_done(),
+            current_user.daily_energy_budget,
+            current_user.max_daily_tasks,
+            today
+        )
     
-    # 运行推荐算法
-    recommended, others = LentoFlowAlgorithm.recommend_tasks(
-        task_states,
-        current_user.daily_energy_budget,
-        current_user.max_daily_tasks
+    # 叠加今天的完成记录
+    task_states, recommended, others, overall_health = apply_payload(
+        payload,
+        tasks,
+        load_completed_ids(),
+        today
     )
     
     # 计算分数
@@ -80,9 +114,6 @@ def get_today_view(
         current_user.daily_energy_budget
     )
     
-    # 整体健康度
-    overall_health = LentoFlowAlgorithm.calculate_overall_health(task_states)
-    
     # 获取最紧急的未完成任务
     uncompleted = [t for t in task_states if not t.is_completed_today]
     most_urgent = max(uncompleted, key=lambda t: t.urgency) if uncompleted else None
@@ -91,7 +122,8 @@ def get_today_view(
     message = MotivationalMessages.get_daily_message(
         overall_health["score"],
         len(tasks),
-        most_urgent
+        most_urgent,
+        today
     )
     
     # 构建任务响应格式
@@ -115,6 +147,23 @@ def get_today_view(
     energy_spent = sum(t.energy_cost for t in completed_tasks)
     energy_remaining = current_user.daily_energy_budget - energy_spent
     
+    if fields is not None:
+        def project_task(t: TaskState):
+            entry = format_task(t)
+            return {name: entry[name] for name in fields}
+        
+        return {
+            "date": today,
+            "energy_budget": current_user.daily_energy_budget,
+            "energy_spent": energy_spent,
+            "energy_remaining": energy_remaining,
+            "recommended_tasks": [project_task(t) for t in recommended],
+            "other_tasks": [project_task(t) for t in others],
+            "overall_health": overall_health,
+            "daily_score": daily_score if completed_tasks else None,
+            "motivational_message": message
+        }
+    
     return TodayResponse(
         date=today,
         energy_budget=current_user.daily_energy_budget,
@@ -128,73 +177,141 @@ def get_today_view(
     )
 
 
+@router.get("", response_model=TodayResponse)
+def get_today_view(
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """获取今日视图；fields 指定任务条目返回的字段，如 fields=id,name,health"""
+    selected = parse_fields(fields, TaskStatus)
+    today = user_today(current_user, app_settings=app_settings)
+    if selected is None:
+        return JSONBytesResponse(cached_for_user(
+            cache, flights, current_user.id, "today", (today,),
+            lambda: dump_model(TODAY_VIEW, _today_view(db, current_user, today))
+        ))
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "today", (today, ",".join(selected)),
+        lambda: dump_rows(_today_view(db, current_user, today, selected))
+    ))
+
+
+def _plan_digest(planned: List[tuple]) -> str:
+    """完成计划的摘要，用作缓存键（计划可能有上千项）"""
+    return hashlib.blake2b(repr(planned).encode(), digest_size=12).hexdigest()
+
+
+@router.post("/simulate", response_model=SimulateResponse)
+def simulate_plan(
+    request: SimulateRequest,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """模拟未来 days 天内按 completions 完成任务后，每天各任务的紧迫度、健康度、整体健康度和推荐任务"""
+    planned = sorted({(item.task_id, item.day) for item in request.completions})
+    if any(day >= request.days for _, day in planned):
+        raise HTTPException(status_code=400, detail="模拟的完成日期超出了模拟天数")
+    today = user_today(current_user, app_settings=app_settings)
+
+    def compute() -> bytes:
+        tasks = _active_tasks(db, current_user.id)
+        unknown = {task_id for task_id, _ in planned} - {task.id for task in tasks}
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的任务：{', '.join(map(str, sorted(unknown)))}")
+        return dump_rows(simulate(
+            tasks,
+            last_done_map(tasks, until=today - timedelta(days=1)),
+            completed_ids(tasks, today),
+            planned,
+            current_user.daily_energy_budget,
+            current_user.max_daily_tasks,
+            today,
+            request.days
+        ))
+
+    return JSONBytesResponse(cached_for_user(
+        cache, flights, current_user.id, "simulate", (today, request.days, _plan_digest(planned)), compute
+    ))
+
+
+@router.get("/plan", response_model=PlanResponse)
+def get_plan(
+    days: int = PLAN_MIN_DAYS,
+    current_user: User = Depends(get_current_user),
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    cache: Optional[Cache] = Depends(get_cache),
+    flights: Optional[SingleFlight] = Depends(get_single_flight)
+):
+    """把未来 days 天（7~14）要做的任务分配到各天，每天不超过能量预算，并尽量压低紧迫度峰值"""
+    if not PLAN_MIN_DAYS <= days <= PLAN_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"规划天数必须在 {PLAN_MIN_DAYS} 到 {PLAN_MAX_DAYS} 之间")
+    user_id = current_user.id
+    today = user_today(current_user, app_settings=app_settings)
+
+    def compute() -> bytes:
+        # 上次的规划状态：只有今天的完成记录变化时，从变化处重算到与原规划重新一致为止
+        tasks = _active_tasks(db, user_id)
+        plan, state = plan_days(
+            tasks,
+            last_done_map(tasks, until=today - timedelta(days=1)),
+            completed_ids(tasks, today),
+            current_user.daily_energy_budget,
+            current_user.max_daily_tasks,
+            today,
+            days,
+            load_plan_state(cache, user_id, days)
+        )
+        save_plan_state(cache, user_id, days, state)
+        return dump_rows(plan)
+
+    return JSONBytesResponse(cached_for_user(cache, flights, user_id, "plan", (today, days), compute))
+
+
 @router.post("/complete/{task_id}", status_code=status.HTTP_201_CREATED)
 def complete_task(
     task_id: int,
     request: CompleteTaskRequest = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     """标记任务完成"""
-    task = db.query(Task).filter(
-        Task.id == task_id,
-        Task.user_id == current_user.id
-    ).first()
-    
-    if not task:
-        raise HTTPException(status_code=404, detail="任务不存在")
-    
-    # 检查今天是否已完成
-    today = date.today()
-    existing = db.query(Completion).filter(
-        Completion.task_id == task_id,
-        Completion.completed_at >= datetime.combine(today, datetime.min.time()),
-        Completion.completed_at < datetime.combine(today, datetime.max.time())
-    ).first()
-    
-    if existing:
-        raise HTTPException(status_code=400, detail="今天已经完成过了")
-    
-    # 创建完成记录
-    completion = Completion(
-        task_id=task_id,
-        note=request.note if request else None,
-        mood=request.mood if request else None
+    user_id = current_user.id
+    result = run_write(
+        db,
+        write_queue,
+        record_completion,
+        user_id,
+        task_id,
+        user_today(current_user, app_settings=app_settings),
+        request.note if request else None,
+        request.mood if request else None
     )
-    db.add(completion)
-    db.commit()
-    db.refresh(completion)
-    
-    return {
-        "success": True,
-        "message": f"已完成: {task.name} ✓",
-        "completion_id": completion.id
-    }
+    invalidate_user(cache, user_id)
+    return result
 
 
 @router.delete("/complete/{task_id}", status_code=status.HTTP_200_OK)
 def uncomplete_task(
     task_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    app_settings: Settings = Depends(get_settings),
+    db: Session = Depends(get_db),
+    write_queue: Optional[WriteQueue] = Depends(get_write_queue),
+    cache: Optional[Cache] = Depends(get_cache)
 ):
     """撤销今日完成"""
-    today = date.today()
-    
-    completion = db.query(Completion).join(Task).filter(
-        Completion.task_id == task_id,
-        Task.user_id == current_user.id,
-        Completion.completed_at >= datetime.combine(today, datetime.min.time()),
-        Completion.completed_at < datetime.combine(today, datetime.max.time())
-    ).first()
-    
-    if not completion:
-        raise HTTPException(status_code=404, detail="未找到今日完成记录")
-    
-    db.delete(completion)
-    db.commit()
-    
-    return {
-        "success": True,
-        "message": "已撤销完成"
-    }
+    user_id = current_user.id
+    result = run_write(db, write_queue, remove_completion, user_id, task_id, user_today(current_user, app_settings=app_settings))
+    invalidate_user(cache, user_id)
+    return result
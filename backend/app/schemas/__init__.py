@@ -1,5 +1,7 @@
 from .user import UserCreate, UserResponse, Token, TokenData, UserSettings
 from .task import TaskCreate, TaskResponse, TaskUpdate
-from .today import TodayResponse, CompleteTaskRequest
-from .stats import DailyStats, WeeklyStats, MonthlyStats, HeatmapData, TaskStats, CategoryStat
+from .today import TodayResponse, CompleteTaskRequest, SimulateRequest, SimulateResponse, PlanResponse
+from .stats import DailyStats, WeeklyStats, MonthlyStats, HeatmapData, TaskStats, CategoryStat, MoodStats
 from .category import CategoryCreate, CategoryUpdate, CategoryResponse
+from .dashboard import DashboardResponse
+from .sync import SyncResponse, SyncCompletion, SyncDeleted
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from .today import TodayResponse
+from .stats import DailyStats, HeatmapData, CategoryStat
+from .category import CategoryResponse
+
+# 仪表盘响应：未请求的数据块为 null
+class DashboardResponse(BaseModel):
+    today: Optional[TodayResponse] = None
+    daily: Optional[List[DailyStats]] = None
+    heatmap: Optional[HeatmapData] = None
+    category: Optional[List[CategoryStat]] = None
+    categories: Optional[List[CategoryResponse]] = None
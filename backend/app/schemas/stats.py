@@ -57,3 +57,45 @@ class TaskStats(BaseModel):
 class CategoryStat(BaseModel):
     name: str
     value: int
+
+# 心情汇总
+class MoodSummary(BaseModel):
+    rated: int  # 记录了心情的完成次数
+    average: Optional[float] = None
+    distribution: List[int]  # 心情 1-5 各自的次数
+
+# 单任务心情
+class TaskMood(MoodSummary):
+    task_id: int
+    task_name: str
+    completions: int
+    notes: int  # 带备注的完成次数（已压缩的记录不保留备注）
+
+# 分类心情
+class CategoryMood(MoodSummary):
+    category_id: Optional[int] = None
+    name: str
+
+# 星期心情
+class WeekdayMood(MoodSummary):
+    weekday: int  # 0 为周一
+
+# 心情与习惯的相关性
+class MoodCorrelation(BaseModel):
+    task_id: int
+    task_name: str
+    days_done: int  # 有心情记录且完成了该任务的天数
+    days_skipped: int  # 有心情记录但没有完成该任务的天数
+    mood_done: Optional[float] = None
+    mood_skipped: Optional[float] = None
+    correlation: Optional[float] = None  # 是否完成与当天平均心情的相关系数，无法计算时为空
+
+# 心情统计
+class MoodStats(BaseModel):
+    start: date
+    end: date
+    overall: MoodSummary
+    by_task: List[TaskMood]
+    by_category: List[CategoryMood]
+    by_weekday: List[WeekdayMood]
+    correlations: List[MoodCorrelation]
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Optional
+
+from .task import TaskResponse
+from .category import CategoryResponse
+
+# 同步的完成记录
+class SyncCompletion(BaseModel):
+    id: int
+    task_id: int
+    completed_on: date
+    completed_at: Optional[datetime] = None
+    note: Optional[str] = None
+    mood: Optional[int] = None
+
+# 已删除的行
+class SyncDeleted(BaseModel):
+    tasks: List[int]
+    categories: List[int]
+    completions: List[int]
+
+# 增量同步响应：reset 为 true 时是全量数据，客户端应替换本地副本
+class SyncResponse(BaseModel):
+    cursor: str
+    reset: bool
+    tasks: List[TaskResponse]
+    categories: List[CategoryResponse]
+    completions: List[SyncCompletion]
+    deleted: SyncDeleted
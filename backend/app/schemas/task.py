@@ -12,6 +12,7 @@ class TaskCreate(BaseModel):
     category_id: Optional[int] = None
     color: Optional[str] = Field('#6366f1', pattern='^#[0-9a-fA-F]{6}$')
     icon: Optional[str] = 'star'
+    use_learned_interval: bool = False  # 按实际完成节奏学到的间隔代替 expected_interval
 
 # 任务更新请求
 class TaskUpdate(BaseModel):
@@ -24,6 +25,7 @@ class TaskUpdate(BaseModel):
     color: Optional[str] = Field(None, pattern='^#[0-9a-fA-F]{6}$')
     icon: Optional[str] = None
     is_active: Optional[bool] = None
+    use_learned_interval: Optional[bool] = None
 
 # 任务响应
 class TaskResponse(BaseModel):
@@ -39,6 +41,8 @@ class TaskResponse(BaseModel):
     color: str
     icon: str
     is_active: bool
+    use_learned_interval: bool = False
+    learned_interval: Optional[float] = None  # 完成间隔的指数加权平均，尚无间隔时为 None
     last_done_date: Optional[date] = None
     created_at: datetime
     updated_at: datetime
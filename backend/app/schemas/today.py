@@ -50,3 +50,55 @@ class TodayResponse(BaseModel):
 class CompleteTaskRequest(BaseModel):
     note: Optional[str] = None
     mood: Optional[int] = Field(None, ge=1, le=5)
+
+# 模拟中假设的一次完成
+class SimulatedCompletion(BaseModel):
+    task_id: int
+    day: int = Field(..., ge=0)  # 第几天，0 为今天
+
+# 完成计划模拟请求
+class SimulateRequest(BaseModel):
+    days: int = Field(14, ge=1, le=90)
+    completions: List[SimulatedCompletion] = []
+
+# 模拟中的一天
+class SimulatedDay(BaseModel):
+    date: date
+    overall_health: float
+    recommended: List[int]  # 推荐任务 id（含当天已完成的）
+    completed: List[int]
+
+# 模拟中一个任务每天的状态
+class SimulatedTask(BaseModel):
+    id: int
+    name: str
+    urgency: List[float]
+    health: List[int]
+
+# 完成计划模拟响应
+class SimulateResponse(BaseModel):
+    start: date
+    days: List[SimulatedDay]
+    tasks: List[SimulatedTask]
+
+# 规划中安排的一个任务
+class PlannedTask(BaseModel):
+    id: int
+    name: str
+    energy_cost: int
+    urgency: float  # 当天完成之前的预计紧迫度
+
+# 规划中的一天
+class PlannedDay(BaseModel):
+    date: date
+    energy: int  # 当天已完成和安排的任务的能量合计
+    peak_urgency: float  # 当天开始时所有任务中最高的预计紧迫度
+    completed: List[int]  # 今天已完成的任务 id（只有第一天有）
+    tasks: List[PlannedTask]
+
+# 多日规划响应
+class PlanResponse(BaseModel):
+    start: date
+    energy_budget: int
+    peak_urgency: float
+    days: List[PlannedDay]
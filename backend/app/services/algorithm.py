@@ -34,6 +34,11 @@ class LentoFlowAlgorithm:
         "critical": (2.0, float('inf'))
     }
     
+    # 学习间隔：完成间隔的指数加权平均
+    LEARNED_INTERVAL_ALPHA = 0.3  # 最新一次间隔的权重
+    LEARNED_INTERVAL_MIN_SAMPLES = 3  # 至少积累这么多次间隔后才代替期望间隔
+    LEARNED_INTERVAL_MAX_GAP = 60  # 单次间隔的上限，长时间中断不会把估计一下拉得过大
+    
     @staticmethod
     def calculate_urgency(
         last_done_date: Optional[date],
@@ -92,6 +97,47 @@ class LentoFlowAlgorithm:
             extra_decay = min(40, extra_days * (30 / expected_interval))
             return max(10, int(50 - extra_decay))
     
+    @classmethod
+    def update_learned_interval(
+        cls,
+        learned_interval: Optional[float],
+        samples: int,
+        gap: int
+    ) -> tuple[float, int]:
+        """把一次完成间隔（天）计入指数加权平均，返回: (新的估计, 样本数)"""
+        gap = min(max(gap, 1), cls.LEARNED_INTERVAL_MAX_GAP)
+        if learned_interval is None or samples <= 0:
+            return float(gap), 1
+        alpha = cls.LEARNED_INTERVAL_ALPHA
+        return alpha * gap + (1 - alpha) * learned_interval, samples + 1
+    
+    @classmethod
+    def revert_learned_interval(
+        cls,
+        learned_interval: Optional[float],
+        samples: int,
+        gap: int
+    ) -> tuple[Optional[float], int]:
+        """撤销最近一次 update_learned_interval，返回: (原来的估计, 样本数)"""
+        if learned_interval is None or samples <= 1:
+            return None, 0
+        gap = min(max(gap, 1), cls.LEARNED_INTERVAL_MAX_GAP)
+        alpha = cls.LEARNED_INTERVAL_ALPHA
+        return (learned_interval - alpha * gap) / (1 - alpha), samples - 1
+    
+    @classmethod
+    def effective_interval(
+        cls,
+        expected_interval: int,
+        learned_interval: Optional[float],
+        samples: int,
+        use_learned: bool
+    ) -> int:
+        """计算紧迫度和健康度时使用的间隔：开启学习且样本足够时用学到的间隔（取整），否则用期望间隔"""
+        if use_learned and learned_interval is not None and samples >= cls.LEARNED_INTERVAL_MIN_SAMPLES:
+            return max(1, round(learned_interval))
+        return expected_interval
+    
     @staticmethod
     def get_urgency_level(urgency: float) -> str:
         """获取紧迫度级别"""
@@ -100,6 +146,46 @@ class LentoFlowAlgorithm:
                 return level
         return "critical"
     
+    @classmethod
+    def transition_dates(
+        cls,
+        last_done_date: Optional[date],
+        expected_interval: int,
+        importance: int,
+        since: date
+    ) -> dict:
+        """按当前的最近完成日期，计算紧迫度进入 high / critical、健康度低于 50 的日期
+        
+        两条曲线只取决于距上次完成的天数：紧迫度随天数单调不减，健康度单调不增，
+        逐天推进直到都越过阈值。从未完成的任务状态不随时间变化，已达到阈值时为 since，否则为 None。
+        """
+        high_threshold = cls.URGENCY_LEVELS["high"][0]
+        critical_threshold = cls.URGENCY_LEVELS["critical"][0]
+        
+        if last_done_date is None:
+            urgency = cls.calculate_urgency(None, expected_interval, importance, since)
+            health = cls.calculate_health(None, expected_interval, since)
+            return {
+                "high_urgency_on": since if urgency >= high_threshold else None,
+                "critical_urgency_on": since if urgency >= critical_threshold else None,
+                "low_health_on": since if health < 50 else None,
+            }
+        
+        result = {"high_urgency_on": None, "critical_urgency_on": None, "low_health_on": None}
+        # 紧迫度至少按 天数 / 期望间隔 * 0.6 增长，这个范围内一定越过 critical
+        for days in range(4 * max(expected_interval, 1) + 2):
+            day = last_done_date + timedelta(days=days)
+            urgency = cls.calculate_urgency(last_done_date, expected_interval, importance, day)
+            if result["high_urgency_on"] is None and urgency >= high_threshold:
+                result["high_urgency_on"] = day
+            if result["critical_urgency_on"] is None and urgency >= critical_threshold:
+                result["critical_urgency_on"] = day
+            if result["low_health_on"] is None and cls.calculate_health(last_done_date, expected_interval, day) < 50:
+                result["low_health_on"] = day
+            if None not in result.values():
+                break
+        return result
+    
     @classmethod
     def recommend_tasks(
         cls,
@@ -113,9 +199,14 @@ class LentoFlowAlgorithm:
         
         返回: (推荐任务列表, 其他任务列表)
         """
+        cls.score_tasks(tasks, today)
+        return cls.select_tasks(tasks, daily_energy_budget, max_tasks)
+    
+    @classmethod
+    def score_tasks(cls, tasks: List[TaskState], today: Optional[date] = None) -> None:
+        """计算所有任务的紧迫度和健康度（原地更新）"""
         today = today or date.today()
         
-        # 计算所有任务的紧迫度和健康度
         for task in tasks:
             task.urgency = cls.calculate_urgency(
                 task.last_done_date,
@@ -128,7 +219,15 @@ class LentoFlowAlgorithm:
                 task.expected_interval,
                 today
             )
-        
+    
+    @classmethod
+    def select_tasks(
+        cls,
+        tasks: List[TaskState],
+        daily_energy_budget: int,
+        max_tasks: int = 5
+    ) -> tuple[List[TaskState], List[TaskState]]:
+        """按已计算的紧迫度选出推荐任务，返回: (推荐任务列表, 其他任务列表)"""
         # 过滤今天已完成的任务
         available_tasks = [t for t in tasks if not t.is_completed_today]
         completed_today = [t for t in tasks if t.is_completed_today]
@@ -253,15 +352,17 @@ class MotivationalMessages:
     def get_daily_message(
         health_score: float,
         tasks_count: int,
-        most_urgent_task: Optional[TaskState] = None
+        most_urgent_task: Optional[TaskState] = None,
+        today: Optional[date] = None
     ) -> str:
         """生成每日激励消息"""
+        today = today or date.today()
         
         if tasks_count == 0:
             return "新的一天，新的开始！添加你想培养的习惯吧 ✨"
         
         if most_urgent_task and most_urgent_task.urgency >= 2.0:
-            days = (date.today() - most_urgent_task.last_done_date).days if most_urgent_task.last_done_date else "很久"
+            days = (today - most_urgent_task.last_done_date).days if most_urgent_task.last_done_date else "很久"
             return f"{most_urgent_task.name}已经等你{days}天了，今天来打个卡？ 📝"
         
         if health_score >= 80:
@@ -272,3 +373,11 @@ class MotivationalMessages:
             return "有些习惯在想念你了，今天看看它们？ 🌱"
         else:
             return "别担心，每天进步一点点就好 🌈"
+    
+    @staticmethod
+    def get_reminder_message(task_names: List[str], days_left: int = 1) -> str:
+        """生成紧迫提醒消息，days_left 天后这些任务的紧迫度进入 critical"""
+        when = {0: "今天", 1: "明天"}.get(days_left, f"{days_left}天后")
+        if len(task_names) == 1:
+            return f"{task_names[0]}{when}就要变得很紧迫了，抽空完成它吧 ⏰"
+        return f"{task_names[0]}等{len(task_names)}个习惯{when}就要变得很紧迫了，今天挑一个完成吧 ⏰"
@@ -0,0 +1,243 @@
+"""
+历史完成记录的冷存储
+
+completions 表随时间无限增长，热力图、统计和任务的完成记录查询都会越来越慢。压缩任务把保留期
+（COMPLETION_HOT_DAYS 天，向前取整到月初）之前的完成记录按 (任务, 月) 合并成 completion_archives 的一行：
+完成日位图、完成次数、心情的次数与总和以及每天的心情，然后删除原始行（备注和完成时刻不保留）。
+保留期从用户本地的今天算起，与统计接口使用的日期一致。
+
+每个任务保留保留期之前最近的一条原始记录，completions 中的最大完成日期因此始终是任务真正的最近完成日期：
+推荐快照、转换日期、任务列表等只关心最近完成日期的查询不需要读取冷数据。
+按日期区间的统计（热力图、周 / 月统计、连续天数）读取任务行上的完成日位图（见 services/daybits.py），
+位图包含两层的完成日期，压缩不需要改动它；学习间隔回填合并两层的数据，结果与压缩前相同。
+冷数据没有行 id，增量同步只包含 completions 中的记录；压缩不写入同步删除日志，增量同步也不把记过变更、
+之后被压缩掉的行当作删除，客户端已有的记录不受影响。
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection, Engine
+
+from ..config import Settings
+from ..models import User, Task, Completion, CompletionArchive
+from ..utils.timezone import TIMEZONE_KEY, zone_or_default
+from .cache import Cache, invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# 每条 DELETE 语句删除的完成记录数，避免超出数据库的参数个数限制
+_DELETE_CHUNK = 5000
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def iter_days(month: date, days: int) -> Iterator[date]:
+    """按日期顺序列出位图中完成过的日期"""
+    while days:
+        lowest = days & -days
+        yield month + timedelta(days=lowest.bit_length() - 1)
+        days ^= lowest
+
+
+def uses_archive(archived_before: Optional[date], start: Optional[date]) -> bool:
+    """从 start 开始（None 表示全部历史）的区间是否可能包含已压缩的完成记录"""
+    return archived_before is not None and (start is None or start < archived_before)
+
+
+def _compact_users(conn: Connection, user_ids: List[int], cutoff: date) -> List[int]:
+    """压缩一批用户 cutoff 之前的完成记录，返回有记录被压缩的用户 id"""
+    rows = conn.execute(
+        select(Task.user_id, Completion.id, Completion.task_id, Completion.completed_on, Completion.mood)
+        .join(Task, Task.id == Completion.task_id)
+        .where(Task.user_id.in_(user_ids), Completion.completed_on < cutoff)
+        .order_by(Completion.task_id, Completion.completed_on)
+    ).all()
+
+    # 每个任务保留 cutoff 之前最近的一条（按任务、日期排序后即下一行换了任务的那一行）
+    archived = [row for row, following in zip(rows, rows[1:]) if row.task_id == following.task_id]
+    if not archived:
+        return []
+
+    months: Dict[Tuple[int, date], dict] = {}
+    for row in archived:
+        month = month_start(row.completed_on)
+        summary = months.get((row.task_id, month))
+        if summary is None:
+            summary = months[(row.task_id, month)] = {
+                "days": 0, "count": 0, "mood_count": 0, "mood_sum": 0, "day_moods": ["0"] * 31
+            }
+        index = row.completed_on.day - 1
+        summary["days"] |= 1 << index
+        summary["count"] += 1
+        if row.mood is not None:
+            summary["mood_count"] += 1
+            summary["mood_sum"] += row.mood
+            summary["day_moods"][index] = str(row.mood)
+
+    # 上次压缩时保留的那一条落在已有的月度行里，合并进去
+    existing = {
+        (row.task_id, row.month): row
+        for row in conn.execute(
+            select(CompletionArchive).where(
+                CompletionArchive.task_id.in_({task_id for task_id, _ in months}),
+                CompletionArchive.month.in_({month for _, month in months})
+            )
+        )
+    }
+    inserts, updates = [], []
+    for (task_id, month), summary in months.items():
+        previous = existing.get((task_id, month))
+        if previous is None:
+            inserts.append({
+                "task_id": task_id, "month": month, "days": summary["days"], "count": summary["count"],
+                "mood_count": summary["mood_count"], "mood_sum": summary["mood_sum"],
+                "day_moods": "".join(summary["day_moods"]),
+            })
+            continue
+        day_moods = list(previous.day_moods)
+        for index, mood in enumerate(summary["day_moods"]):
+            if mood != "0":
+                day_moods[index] = mood
+        updates.append({
+            "archive_id": previous.id,
+            "new_days": previous.days | summary["days"],
+            "new_count": previous.count + summary["count"],
+            "new_mood_count": previous.mood_count + summary["mood_count"],
+            "new_mood_sum": previous.mood_sum + summary["mood_sum"],
+            "new_day_moods": "".join(day_moods),
+        })
+    if inserts:
+        conn.execute(insert(CompletionArchive), inserts)
+    if updates:
+        conn.execute(
+            update(CompletionArchive).where(CompletionArchive.id == bindparam("archive_id")).values(
+                days=bindparam("new_days"),
+                count=bindparam("new_count"),
+                mood_count=bindparam("new_mood_count"),
+                mood_sum=bindparam("new_mood_sum"),
+                day_moods=bindparam("new_day_moods"),
+            ),
+            updates
+        )
+
+    completion_ids = [row.id for row in archived]
+    for offset in range(0, len(completion_ids), _DELETE_CHUNK):
+        conn.execute(delete(Completion).where(Completion.id.in_(completion_ids[offset:offset + _DELETE_CHUNK])))
+
+    compacted = sorted({row.user_id for row in archived})
+    conn.execute(
+        update(User).where(
+            User.id.in_(compacted),
+            or_(User.completions_archived_before.is_(None), User.completions_archived_before < cutoff)
+        ).values(completions_archived_before=cutoff)
+    )
+    return compacted
+
+
+def compact_completions(
+    engine: Engine,
+    hot_days: int,
+    batch_size: int,
+    today: Optional[date] = None,
+    now: Optional[datetime] = None,
+    app_settings: Optional[Settings] = None
+) -> List[int]:
+    """把早于保留期的完成记录压缩为月度行（每批用户一个事务），返回有记录被压缩的用户 id
+
+    cutoff 按用户的本地日期计算：先取出用户设置中出现过的时区，算出各时区的 cutoff 后按 cutoff 分组处理
+    （通常只有一组，月初前后时区不同的用户才会分到两组）。today 不为 None 时所有用户都以它为本地日期。
+    """
+    zone_name = User.settings[TIMEZONE_KEY].as_string()
+    with engine.connect() as conn:
+        # cutoff -> 用户筛选条件
+        groups: Dict[date, list] = {}
+        if today is not None:
+            groups[month_start(today - timedelta(days=hot_days))] = []
+        else:
+            now = now or datetime.now(timezone.utc)
+            names: Dict[date, List[Optional[str]]] = defaultdict(list)
+            for name in conn.execute(select(zone_name).distinct()).scalars():
+                # 未设置或无效的时区按默认时区处理
+                local_today = now.astimezone(zone_or_default(name, app_settings)).date()
+                names[month_start(local_today - timedelta(days=hot_days))].append(name)
+            for cutoff, group in names.items():
+                named = [name for name in group if name is not None]
+                conditions = [zone_name.in_(named)] if named else []
+                if None in group:
+                    conditions.append(zone_name.is_(None))
+                groups[cutoff] = [or_(*conditions)]
+
+        # 只处理 cutoff 之前有不止一条完成记录的任务所属的用户
+        user_groups = {
+            cutoff: sorted(set(conn.execute(
+                select(Task.user_id).join(Completion, Completion.task_id == Task.id)
+                .join(User, User.id == Task.user_id)
+                .where(Completion.completed_on < cutoff, *conditions)
+                .group_by(Completion.task_id, Task.user_id)
+                .having(func.count(Completion.id) > 1)
+            ).scalars()))
+            for cutoff, conditions in groups.items()
+        }
+
+    compacted = []
+    for cutoff, user_ids in user_groups.items():
+        for offset in range(0, len(user_ids), batch_size):
+            with engine.begin() as conn:
+                compacted.extend(_compact_users(conn, user_ids[offset:offset + batch_size], cutoff))
+    return sorted(compacted)
+
+
+class CompactionScheduler:
+    """在应用生命周期内定期压缩历史完成记录（各分片在线程中并行处理）"""
+
+    def __init__(self, engines: List[Engine], settings, cache: Optional[Cache]):
+        self.engines = engines
+        self.settings = settings
+        self.cache = cache
+        self.interval = settings.COMPACTION_INTERVAL_SECONDS
+        self.hot_days = settings.COMPLETION_HOT_DAYS
+        self.batch_size = settings.COMPACTION_BATCH_SIZE
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("压缩历史完成记录失败")
+            await asyncio.sleep(self.interval)
+
+    def process_shard(self, engine: Engine) -> int:
+        """压缩一个分片，返回有记录被压缩的用户数"""
+        compacted = compact_completions(engine, self.hot_days, self.batch_size, app_settings=self.settings)
+        # 用户的 completions_archived_before 变了，缓存中的用户信息需要失效
+        for user_id in compacted:
+            invalidate_user(self.cache, user_id)
+        return len(compacted)
+
+    async def run_once(self) -> int:
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self.process_shard, engine) for engine in self.engines
+        ))
+        if sum(results):
+            logger.info("压缩了 %d 个用户的历史完成记录", sum(results))
+        return sum(results)
@@ -0,0 +1,287 @@
+"""
+可插拔缓存
+
+- MemoryCache：进程内 LRU，只适用于单进程部署
+- SQLiteCache：同一主机上所有 worker 共享的本地 SQLite 文件（WAL + mmap，建议放在 /dev/shm），
+  不需要额外的服务进程，任意 worker 的失效对其他 worker 立即可见
+
+失效通过版本号实现：每个用户有一个数据版本（命名空间 user:<id>），缓存键里带着读取时的版本，
+写操作提交后调用 invalidate_user() 递增版本，旧键自然不再命中，等过期或被淘汰。
+计算前先读版本，计算期间发生的写入会让结果存到旧版本的键上，不会被后续请求读到。
+值统一用 pickle 序列化，避免调用方修改缓存中的对象。
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+from ..utils.metrics import render_counter
+from .singleflight import SingleFlight
+
+# SQLiteCache 每写入这么多次清理一次过期和超量的条目
+_PRUNE_EVERY = 256
+
+
+class Cache(ABC):
+    """缓存接口：按键读写 pickle 后的值，按命名空间维护版本号；后端实现下面的抽象方法"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._counts_lock = threading.Lock()
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """读取未过期的原始值，未命中时返回 None"""
+
+    @abstractmethod
+    def _set(self, key: str, value: bytes, expires_at: float) -> None:
+        """写入原始值，expires_at 为过期的时间戳"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除一个键"""
+
+    @abstractmethod
+    def version(self, namespace: str) -> int:
+        """命名空间的当前版本，从未递增过时为 0"""
+
+    @abstractmethod
+    def bump(self, namespace: str) -> None:
+        """递增命名空间的版本，使其下所有版本化的键失效"""
+
+    def close(self) -> None:
+        pass
+
+    def get(self, key: str, name: str = "") -> Any:
+        """读取缓存，未命中时返回 None；name 用于按用途统计命中率"""
+        raw = self._get(key)
+        self._count(name, "miss" if raw is None else "hit")
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires_at)
+
+    def versioned_key(self, namespace: str, *parts) -> str:
+        return f"{namespace}#{self.version(namespace)}:" + ":".join(str(part) for part in parts)
+
+    def _count(self, name: str, result: str) -> None:
+        with self._counts_lock:
+            self._counts[(name, result)] = self._counts.get((name, result), 0) + 1
+
+    def metric_lines(self) -> List[str]:
+        with self._counts_lock:
+            samples = [({"name": name, "result": result}, value) for (name, result), value in sorted(self._counts.items())]
+        return render_counter("lentoflow_cache_requests_total", "缓存读取次数", samples)
+
+
+class MemoryCache(Cache):
+    """进程内 LRU 缓存"""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10000):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _set(self, key: str, value: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def version(self, namespace: str) -> int:
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace: str) -> None:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+
+class SQLiteCache(Cache):
+    """多个 worker 共享的本地 SQLite 缓存文件
+
+    每个线程一个连接；WAL 模式下读不阻塞写，mmap 让各进程直接读共享的页缓存。
+    缓存内容可以随时丢弃，因此关闭同步写盘。
+    """
+
+    def __init__(self, path: str, ttl: float = 300.0, max_entries: int = 10000, mmap_size: int = 64 * 1024 * 1024):
+        super().__init__(ttl)
+        self.path = path
+        self.max_entries = max_entries
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._writes = 0
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_versions (namespace TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def _set(self, key: str, value: bytes, expires_at: float) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, expires_at)
+        )
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if prune:
+            self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """删除过期条目，超出上限时再删除最早过期的条目"""
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN "
+            "(SELECT key FROM cache_entries ORDER BY expires_at LIMIT max((SELECT count(*) FROM cache_entries) - ?, 0))",
+            (self.max_entries,)
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def version(self, namespace: str) -> int:
+        row = self._connection().execute(
+            "SELECT version FROM cache_versions WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def bump(self, namespace: str) -> None:
+        self._connection().execute(
+            "INSERT INTO cache_versions (namespace, version) VALUES (?, 1) "
+            "ON CONFLICT (namespace) DO UPDATE SET version = version + 1",
+            (namespace,)
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_cache(settings) -> Optional[Cache]:
+    """按配置创建缓存，CACHE_BACKEND 为 none 时返回 None"""
+    backend = settings.CACHE_BACKEND
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(settings.CACHE_TTL_SECONDS, settings.CACHE_MAX_ENTRIES)
+    if backend == "sqlite":
+        return SQLiteCache(settings.CACHE_PATH, settings.CACHE_TTL_SECONDS, settings.CACHE_MAX_ENTRIES)
+    raise ValueError(f"未知的缓存后端：{backend}")
+
+
+def get_cache(request: Request) -> Optional[Cache]:
+    """依赖注入：当前应用的缓存，未开启时为 None"""
+    return getattr(request.app.state, "cache", None)
+
+
+def user_namespace(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+# 未开启缓存时的进程内用户数据版本，供请求合并区分写入前后的请求
+_local_versions: Dict[int, int] = {}
+_local_versions_lock = threading.Lock()
+
+
+def data_version(cache: Optional[Cache], user_id: int) -> int:
+    """用户当前的数据版本；开启缓存时由缓存后端维护（sqlite 后端跨 worker 共享）"""
+    if cache is None:
+        return _local_versions.get(user_id, 0)
+    return cache.version(user_namespace(user_id))
+
+
+def invalidate_user(cache: Optional[Cache], user_id: int) -> None:
+    """用户数据变更并提交后调用，递增数据版本，使该用户所有版本化的缓存失效"""
+    if cache is None:
+        with _local_versions_lock:
+            _local_versions[user_id] = _local_versions.get(user_id, 0) + 1
+    else:
+        cache.bump(user_namespace(user_id))
+
+
+def commit_and_invalidate(db: Session, cache: Optional[Cache], user_id: int) -> None:
+    """提交后使用户缓存失效；必须在提交之后递增版本，否则并发的读请求可能把旧数据存到新版本下
+
+    user_id 在提交前传入，避免提交后读取已过期的用户对象再查一次数据库。
+    """
+    db.commit()
+    invalidate_user(cache, user_id)
+
+
+def cached_for_user(
+    cache: Optional[Cache],
+    flights: Optional[SingleFlight],
+    user_id: int,
+    name: str,
+    params: tuple,
+    compute: Callable[[], Any]
+) -> Any:
+    """按 (用户, 用途, 参数, 数据版本) 缓存 compute() 的结果，并合并并发的相同计算"""
+    key = f"{user_namespace(user_id)}#{data_version(cache, user_id)}:" + ":".join(str(part) for part in (name, *params))
+    if cache is not None:
+        value = cache.get(key, name)
+        if value is not None:
+            return value
+
+    def load():
+        value = compute()
+        if cache is not None:
+            cache.set(key, value)
+        return value
+
+    return load() if flights is None else flights.do(key, name, load)
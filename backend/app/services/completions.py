@@ -0,0 +1,124 @@
+"""
+完成记录的查询与写入
+
+所有按天的判断都基于 completed_on（用户本地日期），
+分组、计数和取最大值都在数据库中完成，不再遍历 ORM 对象。
+较早的完成记录可能已压缩到 completion_archives（见 services/archive.py），最近完成日期只查 completions 即可；
+按日期区间的统计、连续天数和某天是否完成改用任务行上的完成日位图（见 services/daybits.py），
+写入时与完成记录一起维护。
+写入函数只 flush 不提交，由调用方（路由或写入队列）决定事务边界。
+"""
+
+from datetime import date
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import Task, Completion
+from .daybits import mark_day, unmark_day, last_day
+from .sync import COMPLETION, TASK, record_change
+from .intervals import record_interval, revert_interval
+from .transitions import apply_transitions
+
+
+def last_done_dates(
+    db: Session,
+    user_id: int,
+    until: Optional[date] = None,
+    task_ids: Optional[List[int]] = None
+) -> Dict[int, date]:
+    """每个任务最近一次完成的日期（可限定不晚于 until，或只查询部分任务）"""
+    query = db.query(
+        Completion.task_id,
+        func.max(Completion.completed_on)
+    ).join(Task).filter(Task.user_id == user_id)
+    if until is not None:
+        query = query.filter(Completion.completed_on <= until)
+    if task_ids is not None:
+        query = query.filter(Completion.task_id.in_(task_ids))
+    return dict(query.group_by(Completion.task_id).all())
+
+
+def task_last_done(db: Session, task_id: int) -> Optional[date]:
+    """单个任务最近一次完成的日期"""
+    return db.query(func.max(Completion.completed_on)).filter(
+        Completion.task_id == task_id
+    ).scalar()
+
+
+def record_completion(
+    db: Session,
+    user_id: int,
+    task_id: int,
+    day: date,
+    note: Optional[str] = None,
+    mood: Optional[int] = None
+) -> dict:
+    """记录一次完成，返回响应内容"""
+    task = db.query(Task).filter(
+        Task.id == task_id,
+        Task.user_id == user_id
+    ).first()
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    # 同日重复完成由 (task_id, completed_on) 唯一索引拒绝
+    completion = Completion(
+        task_id=task_id,
+        completed_on=day,
+        note=note,
+        mood=mood
+    )
+    db.add(completion)
+    try:
+        db.flush()
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="今天已经完成过了")
+    record_change(db, user_id, COMPLETION, completion.id)
+    # 任务的最近完成日期、学习间隔和 updated_at 随之变化，同步客户端需要重新拉取任务
+    record_change(db, user_id, TASK, task_id)
+    # 今天成为最近完成日期：记入位图、计入学习间隔，转换日期随之后移
+    mark_day(task, day)
+    record_interval(task, day)
+    apply_transitions(task, day, day)
+    
+    # 提交前取出响应所需的值，提交后对象过期，再访问会重新查询
+    return {
+        "success": True,
+        "message": f"已完成: {task.name} ✓",
+        "completion_id": completion.id
+    }
+
+
+def remove_completion(db: Session, user_id: int, task_id: int, day: date) -> dict:
+    """撤销某天的完成记录"""
+    # 任务随完成记录一起查出，用于刷新转换日期
+    row = db.query(Completion, Task).join(Task).filter(
+        Completion.task_id == task_id,
+        Task.user_id == user_id,
+        Completion.completed_on == day
+    ).first()
+    
+    if not row:
+        raise HTTPException(status_code=404, detail="未找到今日完成记录")
+    completion, task = row
+    
+    record_change(db, user_id, COMPLETION, completion.id, deleted=True)
+    # 最近完成日期和学习间隔回退，同样记一次任务变更
+    record_change(db, user_id, TASK, task_id)
+    db.delete(completion)
+    db.flush()
+    # 撤销后的最近完成日期直接从位图得到，不再查询
+    unmark_day(task, day)
+    last_done = last_day(task)
+    revert_interval(task, day, last_done)
+    apply_transitions(task, last_done, day)
+    
+    return {
+        "success": True,
+        "message": "已撤销完成"
+    }
@@ -0,0 +1,208 @@
+"""
+完成日位图
+
+每个任务的全部完成日期（包括已压缩到 completion_archives 的）另外编码成任务行上的一个位图：
+completion_days 为小端字节串，第 i 位为 1 表示 completion_days_start + i 天完成过；
+起点是最早一次完成那年的 1 月 1 日，末尾的全零字节不保存，一年约 46 字节。
+
+位图在完成、撤销完成时与学习间隔、转换日期一起改写任务行，不增加语句；读取时随任务一起加载：
+- 某天是否完成、某天及之前最近一次完成：测试一位、屏蔽高位后取最高位
+- 完成次数：popcount；最长连续天数：反复 x & (x >> 1) 直到为 0；截至某天的连续天数：从该位向下找第一个 0
+- 一段日期内每天的完成数：各任务的窗口拼成字节矩阵，NumPy unpackbits 后按列求和
+今日视图、模拟、规划、热力图、周 / 月统计、单任务统计和仪表盘不再扫描 completions 和 completion_archives。
+已有数据由迁移 0010 回填，修复完成记录后用 rebuild_completion_days 重建。
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Connection
+
+from ..models import Task, Completion, CompletionArchive
+from .archive import iter_days
+
+
+def _value(task) -> int:
+    return int.from_bytes(task.completion_days or b"", "little")
+
+
+def _to_bytes(value: int) -> Optional[bytes]:
+    return value.to_bytes((value.bit_length() + 7) // 8, "little") if value else None
+
+
+def encode_days(days: Iterable[date]) -> Tuple[Optional[bytes], Optional[date]]:
+    """把一组完成日期编码为 (completion_days, completion_days_start)"""
+    days = list(days)
+    if not days:
+        return None, None
+    start = date(min(days).year, 1, 1)
+    value = 0
+    for day in days:
+        value |= 1 << (day - start).days
+    return _to_bytes(value), start
+
+
+def mark_day(task, day: date) -> None:
+    """在任务的位图中记下 day（早于起点时起点前移到那年的 1 月 1 日）"""
+    value = _value(task)
+    start = task.completion_days_start
+    if not value or start is None:
+        value, start = 0, date(day.year, 1, 1)
+    elif day < start:
+        anchor = date(day.year, 1, 1)
+        value <<= (start - anchor).days
+        start = anchor
+    task.completion_days = _to_bytes(value | 1 << (day - start).days)
+    task.completion_days_start = start
+
+
+def unmark_day(task, day: date) -> None:
+    """从任务的位图中去掉 day"""
+    start = task.completion_days_start
+    if start is None or day < start:
+        return
+    value = _value(task) & ~(1 << (day - start).days)
+    task.completion_days = _to_bytes(value)
+    task.completion_days_start = start if value else None
+
+
+def has_day(task, day: date) -> bool:
+    start = task.completion_days_start
+    return start is not None and day >= start and bool(_value(task) >> (day - start).days & 1)
+
+
+def last_day(task, until: Optional[date] = None) -> Optional[date]:
+    """最近一次完成的日期（可限定不晚于 until）"""
+    value = _value(task)
+    start = task.completion_days_start
+    if not value or start is None:
+        return None
+    if until is not None:
+        if until < start:
+            return None
+        value &= (1 << ((until - start).days + 1)) - 1
+        if not value:
+            return None
+    return start + timedelta(days=value.bit_length() - 1)
+
+
+def total_days(task) -> int:
+    return _value(task).bit_count()
+
+
+def longest_run(task) -> int:
+    """最长连续完成天数：每次 x & (x >> 1) 让每段连续的 1 缩短一位"""
+    value = _value(task)
+    run = 0
+    while value:
+        value &= value >> 1
+        run += 1
+    return run
+
+
+def run_ending(task, day: date) -> int:
+    """截至 day（含）的连续完成天数，day 没有完成时为 0"""
+    if not has_day(task, day):
+        return 0
+    index = (day - task.completion_days_start).days
+    mask = (1 << (index + 1)) - 1
+    gaps = ~_value(task) & mask
+    return index + 1 if not gaps else index - (gaps.bit_length() - 1)
+
+
+def completed_ids(tasks: Iterable, day: date) -> Set[int]:
+    """某天完成过的任务 id"""
+    return {task.id for task in tasks if has_day(task, day)}
+
+
+def last_done_map(tasks: Iterable, until: Optional[date] = None) -> Dict[int, date]:
+    """每个任务最近一次完成的日期（可限定不晚于 until），没有完成过的任务不出现"""
+    result = {}
+    for task in tasks:
+        day = last_day(task, until)
+        if day is not None:
+            result[task.id] = day
+    return result
+
+
+def last_done_at(tasks: List, ends: List[date]) -> Dict[date, Dict[int, date]]:
+    """多个截止日期各自的最近完成日期"""
+    return {end: last_done_map(tasks, until=end) for end in set(ends)}
+
+
+def day_matrix(tasks: List, start: date, days: int) -> np.ndarray:
+    """各任务在 [start, start + days) 内每天是否完成，形状为 (任务数, days) 的布尔矩阵"""
+    width = (days + 7) // 8
+    mask = (1 << days) - 1
+    buffer = bytearray()
+    for task in tasks:
+        window = 0
+        if task.completion_days_start is not None:
+            offset = (start - task.completion_days_start).days
+            value = _value(task)
+            window = (value >> offset if offset >= 0 else value << -offset) & mask
+        buffer += window.to_bytes(width, "little")
+    rows = np.frombuffer(bytes(buffer), dtype=np.uint8).reshape(len(tasks), width)
+    return np.unpackbits(rows, axis=1, count=days, bitorder="little").astype(bool)
+
+
+def daily_counts(tasks: List, start: date, end: date) -> Dict[date, int]:
+    """[start, end] 内每天的完成数，没有完成的日期不出现"""
+    days = (end - start).days + 1
+    if days <= 0 or not tasks:
+        return {}
+    counts = day_matrix(tasks, start, days).sum(axis=0)
+    return {start + timedelta(days=int(index)): int(counts[index]) for index in np.flatnonzero(counts)}
+
+
+def daily_totals(tasks: List, start: date, end: date) -> Dict[date, Tuple[int, int]]:
+    """[start, end] 内每天的 (完成数, 能量消耗)，只计活跃任务的能量（口径与原来的分组查询相同）"""
+    days = (end - start).days + 1
+    if days <= 0 or not tasks:
+        return {}
+    matrix = day_matrix(tasks, start, days)
+    energy = np.array([(task.energy_cost or 0) if task.is_active else 0 for task in tasks], dtype=np.int64)
+    counts = matrix.sum(axis=0)
+    spent = energy @ matrix
+    return {
+        start + timedelta(days=int(index)): (int(counts[index]), int(spent[index]))
+        for index in np.flatnonzero(counts)
+    }
+
+
+def rebuild_completion_days(conn: Connection, user_ids: Optional[List[int]] = None) -> int:
+    """按 completions 和 completion_archives 重建位图（修复数据时使用），返回更新的任务数"""
+    task_query = select(Task.id)
+    completion_query = select(Completion.task_id, Completion.completed_on)
+    archive_query = select(CompletionArchive.task_id, CompletionArchive.month, CompletionArchive.days)
+    if user_ids is not None:
+        task_query = task_query.where(Task.user_id.in_(user_ids))
+        completion_query = completion_query.join(Task, Task.id == Completion.task_id).where(
+            Task.user_id.in_(user_ids)
+        )
+        archive_query = archive_query.join(Task, Task.id == CompletionArchive.task_id).where(
+            Task.user_id.in_(user_ids)
+        )
+
+    days: Dict[int, List[date]] = defaultdict(list)
+    for task_id, completed_on in conn.execute(completion_query):
+        days[task_id].append(completed_on)
+    for task_id, month, archived in conn.execute(archive_query):
+        days[task_id].extend(iter_days(month, archived))
+
+    rows = []
+    for task_id in conn.execute(task_query).scalars():
+        bits, start = encode_days(days.get(task_id, ()))
+        rows.append({"task_id": task_id, "new_days": bits, "new_start": start})
+    if rows:
+        conn.execute(
+            update(Task).where(Task.id == bindparam("task_id")).values(
+                completion_days=bindparam("new_days"),
+                completion_days_start=bindparam("new_start"),
+            ),
+            rows
+        )
+    return len(rows)
@@ -0,0 +1,122 @@
+"""
+学习间隔
+
+expected_interval 是用户填写的固定值，实际的打卡节奏会慢慢偏离它。每个任务另外维护完成间隔的
+指数加权平均（learned_interval、learned_samples），以及已计入估计的最近一次完成日期（learned_last_on）：
+- 完成时用 “今天 - learned_last_on” 更新估计，只改任务行上的几列，不查询历史
+- 撤销完成时按撤销后的最近完成日期（从完成日位图得到）反推出更新前的估计
+任务开启 use_learned_interval 且样本足够时，紧迫度、健康度和转换日期改用学到的间隔（见 task_interval）。
+已有数据用 backfill_learned_intervals 按完成历史（包括已压缩的完成记录）一次性回填。
+learned_interval 是任务响应的字段：完成、撤销完成时由 services/completions.py 记一次任务变更，
+回填时为估计有变化的任务各记一次，增量同步的客户端随之拉取新的值。
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.engine import Connection
+
+from ..models import Task, Completion, CompletionArchive, SyncChange
+from .algorithm import LentoFlowAlgorithm
+from .archive import iter_days
+from .sync import TASK
+
+
+def task_interval(task) -> int:
+    """任务（ORM 对象或包含相应列的行）计算紧迫度和健康度时使用的间隔"""
+    return LentoFlowAlgorithm.effective_interval(
+        task.expected_interval or 1,
+        task.learned_interval,
+        task.learned_samples or 0,
+        bool(task.use_learned_interval)
+    )
+
+
+def record_interval(task: Task, day: date) -> None:
+    """完成时把与上次完成的间隔计入估计；不晚于 learned_last_on 的补录不计入"""
+    last_on = task.learned_last_on
+    if last_on is not None and day <= last_on:
+        return
+    if last_on is not None:
+        task.learned_interval, task.learned_samples = LentoFlowAlgorithm.update_learned_interval(
+            task.learned_interval, task.learned_samples or 0, (day - last_on).days
+        )
+    task.learned_last_on = day
+
+
+def revert_interval(task: Task, day: date, previous: Optional[date]) -> None:
+    """撤销 day 的完成后回退估计，previous 为撤销后的最近完成日期"""
+    if task.learned_last_on != day:
+        return
+    if previous is not None:
+        task.learned_interval, task.learned_samples = LentoFlowAlgorithm.revert_learned_interval(
+            task.learned_interval, task.learned_samples or 0, (day - previous).days
+        )
+    task.learned_last_on = previous
+
+
+def backfill_learned_intervals(conn: Connection, user_ids: Optional[List[int]] = None) -> int:
+    """按完成历史重算学习间隔（迁移回填、数据修复时使用），返回估计有变化的任务数"""
+    task_query = select(Task.id, Task.user_id, Task.learned_interval, Task.learned_samples, Task.learned_last_on)
+    completion_query = select(Completion.task_id, Completion.completed_on)
+    archive_query = select(CompletionArchive.task_id, CompletionArchive.month, CompletionArchive.days)
+    if user_ids is not None:
+        task_query = task_query.where(Task.user_id.in_(user_ids))
+        completion_query = completion_query.join(Task, Task.id == Completion.task_id).where(
+            Task.user_id.in_(user_ids)
+        )
+        archive_query = archive_query.join(Task, Task.id == CompletionArchive.task_id).where(
+            Task.user_id.in_(user_ids)
+        )
+
+    # 已压缩的完成日期都早于同一任务在 completions 中的记录：回放每个任务时先回放它的冷数据
+    archived: Dict[int, List[date]] = defaultdict(list)
+    for task_id, month, days in conn.execute(archive_query.order_by(CompletionArchive.task_id, CompletionArchive.month)):
+        archived[task_id].extend(iter_days(month, days))
+
+    current = {row.id: row for row in conn.execute(task_query)}
+    state = {task_id: (None, 0, None) for task_id in current}
+
+    def replay(task_id: int, completed_on: date) -> None:
+        learned, samples, last_on = state.get(task_id, (None, 0, None))
+        if last_on is not None:
+            learned, samples = LentoFlowAlgorithm.update_learned_interval(
+                learned, samples, (completed_on - last_on).days
+            )
+        state[task_id] = (learned, samples, completed_on)
+
+    replaying = None
+    for task_id, completed_on in conn.execute(completion_query.order_by(Completion.task_id, Completion.completed_on)):
+        if task_id != replaying:
+            replaying = task_id
+            for day in archived.pop(task_id, ()):
+                replay(task_id, day)
+        replay(task_id, completed_on)
+    for task_id, days in archived.items():
+        for day in days:
+            replay(task_id, day)
+
+    # 只更新估计有变化的任务，并在同一事务中记为已修改
+    rows = [
+        {"task_id": task_id, "new_learned_interval": learned, "new_learned_samples": samples, "new_learned_last_on": last_on}
+        for task_id, (learned, samples, last_on) in state.items()
+        if task_id in current and (learned, samples, last_on) != (
+            current[task_id].learned_interval, current[task_id].learned_samples, current[task_id].learned_last_on
+        )
+    ]
+    if rows:
+        conn.execute(
+            update(Task).where(Task.id == bindparam("task_id")).values(
+                learned_interval=bindparam("new_learned_interval"),
+                learned_samples=bindparam("new_learned_samples"),
+                learned_last_on=bindparam("new_learned_last_on"),
+            ),
+            rows
+        )
+        conn.execute(insert(SyncChange), [
+            {"user_id": current[row["task_id"]].user_id, "entity": TASK, "entity_id": row["task_id"], "deleted": False}
+            for row in rows
+        ])
+    return len(rows)
@@ -0,0 +1,160 @@
+"""
+心情统计
+
+完成时记录的心情（1-5）按任务、类别和星期汇总，并计算每个任务“当天是否完成”与“当天平均心情”的相关系数。
+完成记录先在数据库中按 (任务, 心情) 和 (日期, 心情) 分组计数，已压缩的月度行按位置解码每天的心情，
+之后的汇总都是 NumPy 上的 np.add.at 和矩阵运算，不逐条遍历完成记录；是否完成取自任务的完成日位图。
+备注只统计条数（已压缩的记录不保留备注）。
+"""
+
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Task, Category, Completion, CompletionArchive
+from .archive import month_start, uses_archive
+from .daybits import day_matrix
+
+MOODS = np.arange(1, 6)
+
+
+def _summary(distribution: np.ndarray) -> dict:
+    """由心情 1-5 的次数生成汇总"""
+    rated = int(distribution.sum())
+    return {
+        "rated": rated,
+        "average": round(float(distribution @ MOODS) / rated, 2) if rated else None,
+        "distribution": distribution.tolist(),
+    }
+
+
+def _mean(total: float, count: float) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+
+def mood_stats(db: Session, user_id: int, start: date, end: date, archived_before: Optional[date] = None) -> dict:
+    """[start, end] 内的心情统计"""
+    days = (end - start).days + 1
+    tasks = db.execute(
+        select(
+            Task.id, Task.name, Task.category_id, Category.name.label("category_name"),
+            Task.completion_days, Task.completion_days_start
+        ).outerjoin(Category, Category.id == Task.category_id).where(Task.user_id == user_id).order_by(Task.id)
+    ).all()
+    task_ids = np.array([task.id for task in tasks], dtype=np.int64)
+
+    # 第 0 列为没有心情（或超出 1-5）的完成记录，汇总时丢弃
+    task_moods = np.zeros((len(tasks), 6), dtype=np.int64)
+    day_moods = np.zeros((days, 6), dtype=np.int64)
+    notes = np.zeros(len(tasks), dtype=np.int64)
+
+    in_range = (Task.user_id == user_id, Completion.completed_on >= start, Completion.completed_on <= end)
+    by_task = db.execute(
+        select(Completion.task_id, func.coalesce(Completion.mood, 0), func.count(Completion.id), func.count(Completion.note))
+        .join(Task, Task.id == Completion.task_id).where(*in_range)
+        .group_by(Completion.task_id, Completion.mood)
+    ).all()
+    if by_task:
+        ids, moods, counts, noted = np.array(by_task, dtype=np.int64).T
+        positions = np.searchsorted(task_ids, ids)
+        np.add.at(task_moods, (positions, np.where((moods >= 1) & (moods <= 5), moods, 0)), counts)
+        np.add.at(notes, positions, noted)
+
+    by_day = db.execute(
+        select(Completion.completed_on, Completion.mood, func.count(Completion.id))
+        .join(Task, Task.id == Completion.task_id).where(*in_range, Completion.mood.isnot(None))
+        .group_by(Completion.completed_on, Completion.mood)
+    ).all()
+    if by_day:
+        offsets = np.array([(day - start).days for day, _, _ in by_day], dtype=np.int64)
+        moods = np.array([mood for _, mood, _ in by_day], dtype=np.int64)
+        counts = np.array([count for _, _, count in by_day], dtype=np.int64)
+        valid = (moods >= 1) & (moods <= 5)
+        np.add.at(day_moods, (offsets[valid], moods[valid]), counts[valid])
+
+    if uses_archive(archived_before, start):
+        # 月度行的 day_moods 第 n 位是第 n+1 天的心情（'0' 为没有），解码成 (行, 31) 矩阵
+        archived = db.execute(
+            select(CompletionArchive.task_id, CompletionArchive.month, CompletionArchive.day_moods)
+            .join(Task, Task.id == CompletionArchive.task_id).where(
+                Task.user_id == user_id,
+                CompletionArchive.month >= month_start(start),
+                CompletionArchive.month <= end,
+                CompletionArchive.mood_count > 0
+            )
+        ).all()
+        if archived:
+            codes = np.frombuffer(
+                "".join(row.day_moods for row in archived).encode("ascii"), dtype=np.uint8
+            ).reshape(len(archived), 31).astype(np.int64) - ord("0")
+            offsets = np.array([(row.month - start).days for row in archived], dtype=np.int64)[:, None] + np.arange(31)
+            positions = np.broadcast_to(np.searchsorted(task_ids, [row.task_id for row in archived])[:, None], codes.shape)
+            valid = (codes >= 1) & (codes <= 5) & (offsets >= 0) & (offsets < days)
+            np.add.at(task_moods, (positions[valid], codes[valid]), 1)
+            np.add.at(day_moods, (offsets[valid], codes[valid]), 1)
+
+    # 完成次数和每天是否完成来自完成日位图（包括没有心情和已压缩的记录）
+    done = day_matrix(tasks, start, days)
+    completions = done.sum(axis=1)
+    listed = np.flatnonzero(completions)
+
+    # 类别：按类别 id 排序，未分类放在最后
+    category_ids = np.array([task.category_id or 0 for task in tasks], dtype=np.int64)
+    categories, category_index = np.unique(category_ids, return_inverse=True)
+    category_moods = np.zeros((len(categories), 5), dtype=np.int64)
+    category_completions = np.zeros(len(categories), dtype=np.int64)
+    np.add.at(category_moods, category_index, task_moods[:, 1:])
+    np.add.at(category_completions, category_index, completions)
+    category_names = {task.category_id or 0: task.category_name for task in tasks}
+    by_category = [
+        {"category_id": int(category_id) or None, "name": category_names[category_id] or "未分类",
+         **_summary(category_moods[index])}
+        for index, category_id in sorted(enumerate(categories), key=lambda item: (item[1] == 0, item[1]))
+        if category_completions[index]
+    ]
+
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    weekday_moods = np.zeros((7, 5), dtype=np.int64)
+    np.add.at(weekday_moods, weekdays, day_moods[:, 1:])
+
+    # 有心情记录的日子：当天平均心情与各任务是否完成的相关系数（点二列相关）
+    rated_counts = day_moods[:, 1:].sum(axis=1)
+    rated = rated_counts > 0
+    mood = (day_moods[:, 1:] @ MOODS)[rated] / rated_counts[rated]
+    habit = done[listed][:, rated].astype(np.float64)
+    days_done = habit.sum(axis=1)
+    days_skipped = rated.sum() - days_done
+    habit_centered = habit - habit.mean(axis=1, keepdims=True) if habit.size else habit
+    mood_centered = mood - mood.mean() if mood.size else mood
+    covariance = habit_centered @ mood_centered
+    spread = np.sqrt((habit_centered ** 2).sum(axis=1) * (mood_centered ** 2).sum())
+
+    correlations = []
+    for row, index in enumerate(listed):
+        task = tasks[index]
+        correlations.append({
+            "task_id": task.id,
+            "task_name": task.name,
+            "days_done": int(days_done[row]),
+            "days_skipped": int(days_skipped[row]),
+            "mood_done": _mean(float(habit[row] @ mood), days_done[row]),
+            "mood_skipped": _mean(float((1 - habit[row]) @ mood), days_skipped[row]),
+            "correlation": round(float(covariance[row] / spread[row]), 3) if spread[row] > 0 else None,
+        })
+
+    return {
+        "start": start,
+        "end": end,
+        "overall": _summary(day_moods[:, 1:].sum(axis=0)),
+        "by_task": [
+            {"task_id": tasks[index].id, "task_name": tasks[index].name, "completions": int(completions[index]),
+             "notes": int(notes[index]), **_summary(task_moods[index, 1:])}
+            for index in listed
+        ],
+        "by_category": by_category,
+        "by_weekday": [{"weekday": weekday, **_summary(weekday_moods[weekday])} for weekday in range(7)],
+        "correlations": correlations,
+    }
@@ -0,0 +1,187 @@
+"""
+多日规划
+
+recommend_tasks 只安排今天，几个任务同时到期时推荐会集中在某一天。规划器把未来 7~14 天要做的任务
+分配到各天，每天不超过能量预算和任务数上限，并尽量压低整个区间内的紧迫度峰值：
+- 任务的紧迫度达到 normal 后才会被安排，太早完成没有意义
+- 每天优先安排推迟一天后紧迫度最高的任务（峰值总是出现在被推迟的任务上），相同时当天紧迫度高的优先；
+  不受 critical 任务插队，也不按性价比挑选，每天严格不超过预算（单个任务超出预算时独占一天）
+- 当天有余量时，还没到期的任务会提前做掉，为之后集中到期的几天腾出空间
+- 安排在某天的任务从那天起重新计算紧迫度，间隔短的任务会在区间内出现多次
+今天已完成的任务固定在第 0 天，占用当天的能量预算（与今日视图一致）。
+
+增量重算：每天的选择只取决于当天开始时各任务的最近完成日期，因此规划状态保存每天结束时的这一向量。
+今天的完成记录变化后从第 0 天重新推进，一旦某天结束时的状态与保存的一致，之后各天直接沿用，
+结果与从头计算完全相同。任务、用户设置或今天之前的完成记录变化时从头计算。
+规划状态同时保存上次的规划结果：输入摘要和今天完成的任务都没变时直接返回，不再推进。
+状态存放在缓存中（不带数据版本，靠输入摘要校验）；未开启缓存时存放在进程内的 LRU 中，
+多 worker 部署时各进程各存一份，摘要保证不会用到过期的状态。
+"""
+
+import hashlib
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .algorithm import LentoFlowAlgorithm
+from .cache import Cache, MemoryCache, user_namespace
+from .intervals import task_interval
+from .simulation import days_since_matrix, last_done_offsets, urgency_matrix
+
+PLAN_MIN_DAYS = 7
+PLAN_MAX_DAYS = 14
+PLAN_STATE_TTL = 2 * 24 * 3600  # 状态只在当天有效，保留到用户本地的第二天结束足够
+
+RELEASE_URGENCY = LentoFlowAlgorithm.URGENCY_LEVELS["normal"][0]
+
+# 未开启缓存时的规划状态
+_local_states = MemoryCache(PLAN_STATE_TTL, max_entries=10000)
+
+
+def _plan_day(
+    last: np.ndarray,
+    fixed: np.ndarray,
+    day: int,
+    interval: np.ndarray,
+    importance: np.ndarray,
+    energy: np.ndarray,
+    daily_energy_budget: int,
+    max_tasks: int
+) -> List[int]:
+    """按当天开始时的最近完成日期 last 选出第 day 天新安排的任务下标；fixed 为当天已完成的任务"""
+    never = np.isneginf(last)
+    days_since = day - np.where(never, 0, last)
+    urgency = urgency_matrix(days_since, never, interval, importance)
+    deferred = urgency_matrix(days_since + 1, never, interval, importance)
+    candidates = np.flatnonzero(~fixed & (urgency >= RELEASE_URGENCY))
+    order = candidates[np.lexsort((candidates, -urgency[candidates], -deferred[candidates]))]
+
+    picked = []
+    remaining_energy = daily_energy_budget - int(energy[fixed].sum())
+    for index in order:
+        if len(picked) >= max_tasks:
+            break
+        cost = int(energy[index])
+        if cost <= remaining_energy or remaining_energy == daily_energy_budget:
+            picked.append(int(index))
+            remaining_energy -= cost
+    return picked
+
+
+def _inputs_digest(
+    tasks: List,
+    last_done: Dict[int, date],
+    daily_energy_budget: int,
+    max_daily_tasks: int,
+    today: date,
+    days: int
+) -> str:
+    """除今天的完成记录外，影响规划结果的全部输入的摘要（包括结果中的任务名称）"""
+    inputs = (
+        today, days, daily_energy_budget, max_daily_tasks,
+        [
+            (task.id, task.name, task_interval(task), task.importance, task.energy_cost, last_done.get(task.id))
+            for task in tasks
+        ]
+    )
+    return hashlib.blake2b(repr(inputs).encode(), digest_size=16).hexdigest()
+
+
+def plan_days(
+    tasks: List,
+    last_done: Dict[int, date],
+    completed_today: Set[int],
+    daily_energy_budget: int,
+    max_daily_tasks: int,
+    today: date,
+    days: int,
+    previous: Optional[dict] = None
+) -> Tuple[dict, dict]:
+    """规划从今天起 days 天，返回 (规划结果, 规划状态)
+
+    tasks 为活跃任务（按 id 排序），last_done 为今天之前的最近完成日期；
+    previous 为上次返回的规划状态，输入除今天的完成记录外都相同时只重算受影响的几天。
+    """
+    count = len(tasks)
+    interval = np.array([task_interval(task) for task in tasks], dtype=np.float64)
+    importance = np.array([task.importance for task in tasks], dtype=np.float64)
+    energy = np.array([task.energy_cost for task in tasks], dtype=np.int64)
+    initial = last_done_offsets(tasks, last_done, today)
+
+    fixed = np.array([task.id in completed_today for task in tasks], dtype=bool)
+    free = np.zeros(count, dtype=bool)
+
+    digest = _inputs_digest(tasks, last_done, daily_energy_budget, max_daily_tasks, today, days)
+    reusable = previous is not None and previous.get("digest") == digest
+    completed = sorted(completed_today)
+    if reusable and previous.get("completed") == completed:
+        return previous["result"], {**previous, "recomputed_days": 0}
+
+    picks: List[List[int]] = []
+    ends: List[np.ndarray] = []
+    last = initial
+    recomputed = 0
+    for day in range(days):
+        if reusable and day > 0 and np.array_equal(last, previous["ends"][day - 1]):
+            picks.extend(previous["picks"][day:])
+            ends.extend(previous["ends"][day:])
+            break
+        day_fixed = fixed if day == 0 else free
+        picked = _plan_day(
+            last, day_fixed, day, interval, importance, energy, daily_energy_budget, max_daily_tasks
+        )
+        last = last.copy()
+        last[day_fixed] = day
+        last[picked] = day
+        picks.append(picked)
+        ends.append(last)
+        recomputed += 1
+    state = {"digest": digest, "completed": completed, "picks": picks, "ends": ends, "recomputed_days": recomputed}
+
+    # 按规划推算每天开始时（当天完成之前）的紧迫度
+    done = np.zeros((days, count), dtype=bool)
+    done[0] = fixed
+    for day, picked in enumerate(picks):
+        done[day, picked] = True
+    days_since, never = days_since_matrix(done, initial)
+    urgency = urgency_matrix(days_since, never, interval, importance)
+
+    result_days = []
+    for day, picked in enumerate(picks):
+        completed = np.flatnonzero(fixed).tolist() if day == 0 else []
+        result_days.append({
+            "date": today + timedelta(days=day),
+            "energy": int(energy[completed].sum() + energy[picked].sum()),
+            "peak_urgency": float(urgency[day].max(initial=0.0)),
+            "completed": [tasks[index].id for index in completed],
+            "tasks": [
+                {
+                    "id": tasks[index].id,
+                    "name": tasks[index].name,
+                    "energy_cost": int(energy[index]),
+                    "urgency": float(urgency[day, index]),
+                }
+                for index in picked
+            ],
+        })
+    state["result"] = {
+        "start": today,
+        "energy_budget": daily_energy_budget,
+        "peak_urgency": float(urgency.max(initial=0.0)),
+        "days": result_days,
+    }
+    return state["result"], state
+
+
+def _state_key(user_id: int, days: int) -> str:
+    return f"{user_namespace(user_id)}:plan-state:{days}"
+
+
+def load_plan_state(cache: Optional[Cache], user_id: int, days: int) -> Optional[dict]:
+    """读取上次保存的规划状态，未开启缓存时从进程内读取"""
+    return (cache or _local_states).get(_state_key(user_id, days), "plan.state")
+
+
+def save_plan_state(cache: Optional[Cache], user_id: int, days: int, state: dict) -> None:
+    (cache or _local_states).set(_state_key(user_id, days), state, ttl=PLAN_STATE_TTL)
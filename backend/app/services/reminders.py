@@ -0,0 +1,267 @@
+"""
+紧迫提醒
+
+任务紧迫度进入 critical 的日期已经预先保存在 tasks.critical_urgency_on（见 services/transitions.py），
+选出到期提醒只需按这个索引列做一次 IN 查询：此刻全球用户的本地日期最多相差一天，候选日期只有三个。
+查询同时用 NOT EXISTS 排除已经写入发件箱的提醒，返回的行数只取决于当天到期的任务数，与用户总数无关；
+时区、免打扰时段和是否关闭提醒只对这些任务所属的用户在内存中判断。
+
+处理分两步，都按批进行：
+1. queue_reminders：按用户合并到期任务，渲染成消息（MotivationalMessages），
+   每 batch_size 行一个事务写入 notification_outbox
+2. dispatch_pending：按 id 顺序每次取一批待发送的提醒交给发送器，成功后一条 UPDATE 标记已发送；
+   发送失败时这一批的失败次数加一，下一轮重试，失败 max_attempts 次后不再发送
+发件箱的唯一约束 (user_id, kind, due_on) 保证调度器重复运行时每个提醒只写一次。
+去重按用户而不是按任务，这是有意的：每个用户每个到期日最多收到一条 critical 提醒。
+- 提醒针对“进入 critical”这一转换，due_on 就是转换日期；任务进入 critical 后一直保持，不会再次提醒
+- 任务完成后转换日期后移，到了新的 due_on 会再提醒一次
+- 某天的提醒写入之后，同一天才到期的其他任务（例如当天新建或撤销完成）不再补发，避免一天内多次打扰
+处于免打扰时段的用户这一轮不写入，免打扰结束后的下一轮再写入。
+
+发送器可以替换：内置 stdout 和 file（JSON Lines），REMINDER_SENDER="模块:类" 时导入该类并以 settings 构造。
+"""
+
+import asyncio
+import importlib
+import logging
+import sys
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time, timedelta, timezone
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+
+from ..config import Settings
+from ..models import User, Task, Notification
+from .algorithm import MotivationalMessages
+from ..utils.responses import dump_rows
+from ..utils.timezone import QUIET_HOURS_KEY, in_quiet_hours, parse_quiet_hours, user_timezone
+
+logger = logging.getLogger(__name__)
+
+# 提醒类型
+CRITICAL = "critical"
+
+# User.settings 中的提醒开关，值为 false 时不提醒
+REMINDERS_KEY = "reminders"
+
+
+def due_reminder_query(days: List[date]):
+    """紧迫度在 days 中的某天进入 critical、还没有写入发件箱的活跃任务，按用户排序"""
+    queued = select(Notification.id).where(
+        Notification.user_id == Task.user_id,
+        Notification.kind == CRITICAL,
+        Notification.due_on == Task.critical_urgency_on
+    ).exists()
+    return select(
+        Task.user_id, Task.id, Task.name, Task.critical_urgency_on, User.settings
+    ).join(User, User.id == Task.user_id).where(
+        Task.critical_urgency_on.in_(days),
+        Task.is_active == True,
+        ~queued
+    ).order_by(Task.user_id, Task.id)
+
+
+def _quiet_hours(user_settings: Optional[dict], default: Optional[Tuple[time, time]]):
+    """用户的免打扰时段，未设置或格式错误时使用默认值"""
+    if QUIET_HOURS_KEY not in (user_settings or {}):
+        return default
+    try:
+        return parse_quiet_hours(user_settings[QUIET_HOURS_KEY])
+    except ValueError:
+        return default
+
+
+def queue_reminders(
+    engine: Engine,
+    lead_days: int = 1,
+    default_quiet_hours: str = "",
+    batch_size: int = 1000,
+    now: Optional[datetime] = None,
+    app_settings: Optional[Settings] = None
+) -> int:
+    """把当前到期（用户本地日期 lead_days 天后进入 critical）的提醒写入发件箱，返回写入数
+
+    app_settings 提供未设置时区的用户使用的默认时区，未传入时使用全局配置。
+    """
+    now = now or datetime.now(timezone.utc)
+    default_quiet = parse_quiet_hours(default_quiet_hours)
+    days = [now.date() + timedelta(days=offset + lead_days) for offset in (-1, 0, 1)]
+    with engine.connect() as conn:
+        tasks = conn.execute(due_reminder_query(days)).all()
+
+    rows = []
+    for user_id, user_tasks in groupby(tasks, key=lambda task: task.user_id):
+        user_tasks = list(user_tasks)
+        user_settings = user_tasks[0].settings or {}
+        if user_settings.get(REMINDERS_KEY) is False:
+            continue
+        local_now = now.astimezone(user_timezone(user_tasks[0], app_settings))
+        if in_quiet_hours(local_now.time(), _quiet_hours(user_settings, default_quiet)):
+            continue
+        due_on = local_now.date() + timedelta(days=lead_days)
+        names, task_ids = [], []
+        for task in user_tasks:
+            if task.critical_urgency_on == due_on:
+                names.append(task.name)
+                task_ids.append(task.id)
+        if not task_ids:
+            continue
+        rows.append({
+            "user_id": user_id,
+            "kind": CRITICAL,
+            "due_on": due_on,
+            "message": MotivationalMessages.get_reminder_message(names, lead_days),
+            "task_ids": task_ids,
+            "attempts": 0,
+            "created_at": now.replace(tzinfo=None),
+        })
+
+    # 查询之后其他进程可能已经写入了同一提醒，由唯一约束忽略
+    statement = insert(Notification).prefix_with("OR IGNORE", dialect="sqlite")
+    written = 0
+    for i in range(0, len(rows), batch_size):
+        with engine.begin() as conn:
+            written += conn.execute(statement, rows[i:i + batch_size]).rowcount
+    return written
+
+
+def dispatch_pending(
+    engine: Engine,
+    sender: "Sender",
+    batch_size: int = 1000,
+    max_attempts: int = 5,
+    now: Optional[datetime] = None
+) -> int:
+    """把待发送的提醒按批交给发送器，返回发送数；发送失败时记一次失败并抛出异常"""
+    sent = 0
+    while True:
+        with engine.connect() as conn:
+            batch = [dict(row) for row in conn.execute(
+                select(
+                    Notification.id, Notification.user_id, Notification.kind,
+                    Notification.due_on, Notification.message, Notification.task_ids
+                ).where(
+                    Notification.sent_at.is_(None),
+                    Notification.attempts < max_attempts
+                ).order_by(Notification.id).limit(batch_size)
+            ).mappings()]
+        if not batch:
+            return sent
+        ids = [row["id"] for row in batch]
+        try:
+            sender.send(batch)
+        except Exception:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(Notification).where(Notification.id.in_(ids))
+                    .values(attempts=Notification.attempts + 1)
+                )
+            raise
+        sent_at = (now or datetime.now(timezone.utc)).replace(tzinfo=None)
+        with engine.begin() as conn:
+            conn.execute(update(Notification).where(Notification.id.in_(ids)).values(sent_at=sent_at))
+        sent += len(batch)
+
+
+class Sender(ABC):
+    """提醒发送器：send() 发送一批提醒（字典列表），抛出异常表示整批发送失败
+
+    REMINDER_SENDER="模块:类" 指定的类需要继承 Sender 并实现 send()。
+    """
+
+    @abstractmethod
+    def send(self, notifications: List[dict]) -> None:
+        """发送一批提醒"""
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutSender(Sender):
+    """输出到标准输出（JSON Lines），本地开发时代替推送服务"""
+
+    def send(self, notifications: List[dict]) -> None:
+        sys.stdout.buffer.write(b"".join(dump_rows(notification) + b"\n" for notification in notifications))
+        sys.stdout.flush()
+
+
+class FileSender(Sender):
+    """追加到本地文件（JSON Lines），代替推送服务"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, notifications: List[dict]) -> None:
+        with open(self.path, "ab") as f:
+            f.write(b"".join(dump_rows(notification) + b"\n" for notification in notifications))
+
+
+def create_sender(settings) -> Sender:
+    """按配置创建发送器"""
+    name = settings.REMINDER_SENDER
+    if name == "stdout":
+        return StdoutSender()
+    if name == "file":
+        return FileSender(settings.REMINDER_OUTBOX_PATH)
+    if ":" in name:
+        module_name, _, class_name = name.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)(settings)
+    raise ValueError(f"未知的提醒发送器：{name}")
+
+
+class ReminderScheduler:
+    """在应用生命周期内定期写入到期提醒并发送（各分片在线程中并行处理）"""
+
+    def __init__(self, engines: List[Engine], settings, sender: Sender):
+        self.engines = engines
+        self.settings = settings
+        self.sender = sender
+        self.interval = settings.REMINDER_CHECK_INTERVAL_SECONDS
+        self.lead_days = settings.REMINDER_LEAD_DAYS
+        self.quiet_hours = settings.REMINDER_QUIET_HOURS
+        self.batch_size = settings.REMINDER_BATCH_SIZE
+        self.max_attempts = settings.REMINDER_MAX_ATTEMPTS
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.sender.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("处理紧迫提醒失败")
+            await asyncio.sleep(self.interval)
+
+    def process_shard(self, engine: Engine) -> Tuple[int, int]:
+        """处理一个分片，返回 (写入数, 发送数)"""
+        queued = queue_reminders(
+            engine, self.lead_days, self.quiet_hours, self.batch_size, app_settings=self.settings
+        )
+        sent = dispatch_pending(engine, self.sender, self.batch_size, self.max_attempts)
+        return queued, sent
+
+    async def run_once(self) -> Tuple[int, int]:
+        """处理一轮，返回 (写入数, 发送数)"""
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(None, self.process_shard, engine) for engine in self.engines
+        ))
+        queued = sum(result[0] for result in results)
+        sent = sum(result[1] for result in results)
+        if queued or sent:
+            logger.info("写入 %d 条紧迫提醒，发送 %d 条", queued, sent)
+        return queued, sent
@@ -0,0 +1,158 @@
+"""
+完成计划模拟
+
+给定未来若干天的假设完成记录，推算每天各任务的紧迫度、健康度、整体健康度和推荐任务。
+紧迫度和健康度公式与 LentoFlowAlgorithm 相同，但按 (天, 任务) 矩阵整体计算：
+- 每天的“此前最近完成日期”由完成标记矩阵沿天数方向做累计最大值得到
+- 紧迫度、健康度和整体健康度都是矩阵运算，没有逐任务逐天的 Python 循环
+- 推荐任务仍按 select_tasks 的贪心规则逐天挑选，但排序用 argsort，每天只遍历一次任务
+某天完成的任务当天的状态与今日视图一致：紧迫度 0、健康度 100，并计入当天的推荐列表。
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+from .algorithm import LentoFlowAlgorithm
+from .intervals import task_interval
+
+CRITICAL_URGENCY = LentoFlowAlgorithm.URGENCY_LEVELS["critical"][0]
+
+
+def urgency_matrix(days_since: np.ndarray, never: np.ndarray, interval: np.ndarray, importance: np.ndarray) -> np.ndarray:
+    """LentoFlowAlgorithm.calculate_urgency 的矩阵版本"""
+    days_since = np.where(never, interval * 2, days_since)
+    base_urgency = days_since / interval
+    overdue_days = np.maximum(0, days_since - interval)
+    overdue_factor = 1 + np.log(1 + overdue_days * 0.3)
+    importance_weight = 0.6 + (importance - 1) * 0.2
+    return np.round(base_urgency * overdue_factor * importance_weight, 2)
+
+
+def health_matrix(days_since: np.ndarray, never: np.ndarray, interval: np.ndarray) -> np.ndarray:
+    """LentoFlowAlgorithm.calculate_health 的矩阵版本"""
+    within = np.floor(100 - days_since * (50 / interval))
+    extra_decay = np.minimum(40, (days_since - interval) * (30 / interval))
+    overdue = np.maximum(10, np.floor(50 - extra_decay))
+    health = np.where(days_since == 0, 100, np.where(days_since <= interval, within, overdue))
+    return np.where(never, 30, health).astype(np.int64)
+
+
+def last_done_offsets(tasks: List, last_done: Dict[int, date], today: date) -> np.ndarray:
+    """各任务今天之前的最近完成日期相对今天的天数，从未完成为 -inf"""
+    return np.array([
+        (last_done[task.id] - today).days if task.id in last_done else -np.inf
+        for task in tasks
+    ], dtype=np.float64)
+
+
+def days_since_matrix(done: np.ndarray, initial: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """由完成标记 (天, 任务) 算出每天开始时距上次完成的天数，以及是否从未完成
+
+    每天之前的最近完成日期由完成标记沿天数方向做累计最大值得到，initial 为第 0 天之前的值。
+    """
+    day_index = np.arange(done.shape[0], dtype=np.float64)[:, None]
+    last_through = np.maximum(np.maximum.accumulate(np.where(done, day_index, -np.inf), axis=0), initial)
+    last_before = np.vstack([initial[None, :], last_through[:-1]])
+    never = np.isneginf(last_before)
+    return day_index - np.where(never, 0, last_before), never
+
+
+def select_day(
+    urgency: np.ndarray,
+    done: np.ndarray,
+    energy: np.ndarray,
+    daily_energy_budget: int,
+    max_tasks: int
+) -> List[int]:
+    """按 LentoFlowAlgorithm.select_tasks 的规则选出一天的推荐任务，返回任务下标"""
+    completed = np.flatnonzero(done)
+    recommended = completed.tolist()
+    remaining_energy = daily_energy_budget - int(energy[completed].sum())
+    limit = max_tasks + len(completed)
+
+    # 1. 紧急任务按紧迫度从高到低（与 list.sort 一样稳定）
+    critical = np.flatnonzero(~done & (urgency >= CRITICAL_URGENCY))
+    for index in critical[np.argsort(-urgency[critical], kind="stable")]:
+        if len(recommended) < limit:
+            recommended.append(int(index))
+            remaining_energy -= int(energy[index])
+
+    # 2. 普通任务按性价比
+    normal = np.flatnonzero(~done & (urgency < CRITICAL_URGENCY))
+    ratio = -urgency[normal] / np.maximum(energy[normal], 1)
+    for index in normal[np.argsort(ratio, kind="stable")]:
+        if len(recommended) >= limit:
+            break
+        cost = int(energy[index])
+        if cost <= remaining_energy or remaining_energy == daily_energy_budget:
+            recommended.append(int(index))
+            remaining_energy -= cost
+    return recommended
+
+
+def simulate(
+    tasks: List,
+    last_done: Dict[int, date],
+    completed_today: Set[int],
+    planned: Iterable[Tuple[int, int]],
+    daily_energy_budget: int,
+    max_daily_tasks: int,
+    today: date,
+    days: int
+) -> dict:
+    """模拟从今天起 days 天的状态
+
+    tasks 为活跃任务（按 id 排序），last_done 为今天之前的最近完成日期，
+    planned 为假设的完成记录 [(任务 id, 第几天)]，第 0 天即今天。
+    """
+    count = len(tasks)
+    positions = {task.id: i for i, task in enumerate(tasks)}
+    interval = np.array([task_interval(task) for task in tasks], dtype=np.float64)
+    importance = np.array([task.importance for task in tasks], dtype=np.float64)
+    energy = np.array([task.energy_cost for task in tasks], dtype=np.int64)
+
+    # 完成标记 (天, 任务)，今天的真实完成记录也计入
+    done = np.zeros((days, count), dtype=bool)
+    for task_id in completed_today:
+        if task_id in positions:
+            done[0, positions[task_id]] = True
+    for task_id, day in planned:
+        done[day, positions[task_id]] = True
+
+    days_since, never = days_since_matrix(done, last_done_offsets(tasks, last_done, today))
+    urgency = np.where(done, 0.0, urgency_matrix(days_since, never, interval, importance))
+    health = np.where(done, 100, health_matrix(days_since, never, interval))
+
+    if count:
+        overall = np.round(health @ importance / importance.sum(), 1).tolist()
+    else:
+        overall = [100.0] * days
+
+    ids = [task.id for task in tasks]
+    return {
+        "start": today,
+        "days": [
+            {
+                "date": today + timedelta(days=day),
+                "overall_health": overall[day],
+                "recommended": [
+                    ids[index] for index in select_day(
+                        urgency[day], done[day], energy, daily_energy_budget, max_daily_tasks
+                    )
+                ],
+                "completed": [ids[index] for index in np.flatnonzero(done[day])],
+            }
+            for day in range(days)
+        ],
+        "tasks": [
+            {
+                "id": task.id,
+                "name": task.name,
+                "urgency": urgency[:, i].tolist(),
+                "health": health[:, i].tolist(),
+            }
+            for i, task in enumerate(tasks)
+        ],
+    }
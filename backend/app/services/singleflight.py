@@ -0,0 +1,90 @@
+"""
+相同读请求的合并（single-flight）
+
+同一用户在多个设备上同时打开应用，或前端重复发出请求时，相同的 /api/today、
+/api/stats/* 计算会并发执行多次。SingleFlight 按 (用户, 接口, 参数, 数据版本)
+登记正在进行的计算，后到的相同请求直接等待并共享其结果（或异常）。
+键里带着数据版本，写入提交后到达的请求不会拿到写入前开始的计算结果。
+
+同步路由（线程池）用 do()，协程用 do_async()；两者共用同一个 concurrent.futures.Future，
+可以互相等待。合并只在进程内生效。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from ..utils.metrics import render_counter
+
+
+class SingleFlight:
+    """按键合并并发的相同计算"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def _join(self, key: str, name: str) -> Tuple[Future, bool]:
+        """返回 (Future, 是否由当前调用方执行计算)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            role = "leader" if leader else "coalesced"
+            self._counts[(name, role)] = self._counts.get((name, role), 0) + 1
+        return future, leader
+
+    def _finish(self, key: str, future: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._calls[key]
+        if exc is None:
+            future.set_result(result)
+        else:
+            future.set_exception(exc)
+
+    def do(self, key: str, name: str, compute: Callable[[], Any]) -> Any:
+        future, leader = self._join(key, name)
+        if not leader:
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: str, name: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        future, leader = self._join(key, name)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await compute()
+        except BaseException as exc:
+            self._finish(key, future, exc=exc)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def metric_lines(self) -> List[str]:
+        with self._lock:
+            samples = [({"name": name, "role": role}, value) for (name, role), value in sorted(self._counts.items())]
+        return render_counter(
+            "lentoflow_singleflight_requests_total",
+            "合并读请求数（leader 为实际执行的计算，coalesced 为共享结果的请求）",
+            samples
+        )
+
+
+def get_single_flight(request: Request) -> Optional[SingleFlight]:
+    """依赖注入：当前应用的请求合并器，未开启时为 None"""
+    return getattr(request.app.state, "single_flight", None)
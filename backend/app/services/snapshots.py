@@ -0,0 +1,311 @@
+"""
+今日推荐快照
+
+紧迫度、健康度和推荐结果只取决于今天之前的完成记录，一天之内不会变化。
+后台调度器在每个用户本地零点后把它们预计算到 recommendation_snapshots，
+/api/today 读取快照后只叠加当天的完成记录，不再对全部历史做分组查询。
+
+payload 格式：
+    {
+        "budget": 15, "max_tasks": 5,
+        "tasks": {"<task_id>": {"urgency": 1.2, "health": 60, "last_done": "2026-10-10",
+                                "key": [interval, importance, energy_cost]}},
+        "recommended": [task_id, ...], "others": [task_id, ...],
+        "overall_health": {...}
+    }
+快照与当前任务或用户设置不一致（任务增删改、调整能量预算等）时视为失效，
+请求回退到实时计算。
+SnapshotScheduler 在所在进程内定期运行，多个 worker 各自开启会重复计算同一批快照，
+因此默认关闭；多 worker 部署时用 cron 执行 scripts/refresh_snapshots.py。
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models import User, Task, Completion, RecommendationSnapshot
+from .algorithm import LentoFlowAlgorithm, TaskState
+from .intervals import task_interval
+from ..config import Settings
+from ..utils.timezone import TIMEZONE_KEY, user_today, zone_or_default
+
+logger = logging.getLogger(__name__)
+
+# 进程池中每个进程各自持有的引擎
+_worker_engines: Dict[str, Engine] = {}
+
+
+def _task_key(task) -> list:
+    """影响紧迫度和推荐结果的任务字段（间隔为实际使用的间隔，见 services/intervals.py）"""
+    return [task_interval(task), task.importance, task.energy_cost]
+
+
+def build_payload(
+    tasks: Iterable,
+    last_done: Dict[int, date],
+    daily_energy_budget: int,
+    max_daily_tasks: int,
+    today: date
+) -> dict:
+    """根据今天之前的最近完成日期计算快照"""
+    states = [
+        TaskState(
+            id=task.id,
+            name="",
+            energy_cost=task.energy_cost,
+            expected_interval=task_interval(task),
+            importance=task.importance,
+            last_done_date=last_done.get(task.id)
+        )
+        for task in tasks
+    ]
+    keys = {task.id: _task_key(task) for task in tasks}
+    recommended, others = LentoFlowAlgorithm.recommend_tasks(states, daily_energy_budget, max_daily_tasks, today)
+    return {
+        "budget": daily_energy_budget,
+        "max_tasks": max_daily_tasks,
+        "tasks": {
+            str(state.id): {
+                "urgency": state.urgency,
+                "health": state.health,
+                "last_done": state.last_done_date.isoformat() if state.last_done_date else None,
+                "key": keys[state.id],
+            }
+            for state in states
+        },
+        "recommended": [state.id for state in recommended],
+        "others": [state.id for state in others],
+        "overall_health": LentoFlowAlgorithm.calculate_overall_health(states),
+    }
+
+
+def load_payload(db: Session, user: User, tasks: List[Task], today: date) -> Optional[dict]:
+    """读取今天的快照，不存在或与当前任务、设置不一致时返回 None"""
+    snapshot = db.get(RecommendationSnapshot, user.id)
+    if snapshot is None or snapshot.snapshot_date != today:
+        return None
+    payload = snapshot.payload
+    if payload["budget"] != user.daily_energy_budget or payload["max_tasks"] != user.max_daily_tasks:
+        return None
+    entries = payload["tasks"]
+    if len(entries) != len(tasks):
+        return None
+    for task in tasks:
+        entry = entries.get(str(task.id))
+        if entry is None or entry["key"] != _task_key(task):
+            return None
+    return payload
+
+
+def apply_payload(
+    payload: dict,
+    tasks: List[Task],
+    completed_ids: Set[int],
+    today: date
+) -> Tuple[List[TaskState], List[TaskState], List[TaskState], dict]:
+    """在快照上叠加今天的完成记录
+
+    返回: (全部任务状态, 推荐任务列表, 其他任务列表, 整体健康度)
+    """
+    states = []
+    for task in tasks:
+        entry = payload["tasks"][str(task.id)]
+        done = task.id in completed_ids
+        last_done = entry["last_done"]
+        states.append(TaskState(
+            id=task.id,
+            name=task.name,
+            energy_cost=task.energy_cost,
+            expected_interval=task_interval(task),
+            importance=task.importance,
+            # 今天完成的任务与实时计算一致：间隔为 0，紧迫度 0，健康度 100
+            last_done_date=today if done else (date.fromisoformat(last_done) if last_done else None),
+            urgency=0.0 if done else entry["urgency"],
+            health=100 if done else entry["health"],
+            is_completed_today=done,
+            color=task.color,
+            icon=task.icon
+        ))
+
+    if not completed_ids:
+        by_id = {state.id: state for state in states}
+        return (
+            states,
+            [by_id[task_id] for task_id in payload["recommended"]],
+            [by_id[task_id] for task_id in payload["others"]],
+            payload["overall_health"],
+        )
+
+    # 已完成任务会占用能量预算，重新挑选（只排序，不再计算紧迫度）
+    recommended, others = LentoFlowAlgorithm.select_tasks(states, payload["budget"], payload["max_tasks"])
+    return states, recommended, others, LentoFlowAlgorithm.calculate_overall_health(states)
+
+
+def refresh_snapshots(
+    engine: Engine, user_ids: List[int], now: Optional[datetime] = None, app_settings: Optional[Settings] = None
+) -> int:
+    """批量计算并写入一组用户的快照，返回写入数（app_settings 提供未设置时区的用户使用的默认时区）"""
+    now = now or datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        users = conn.execute(
+            select(User.id, User.settings, User.daily_energy_budget, User.max_daily_tasks)
+            .where(User.id.in_(user_ids))
+        ).all()
+        tasks_by_user = defaultdict(list)
+        for task in conn.execute(
+            select(
+                Task.id, Task.user_id, Task.energy_cost, Task.expected_interval, Task.importance,
+                Task.use_learned_interval, Task.learned_interval, Task.learned_samples
+            )
+            .where(Task.user_id.in_(user_ids), Task.is_active == True)
+            .order_by(Task.id)
+        ):
+            tasks_by_user[task.user_id].append(task)
+
+        # 同一批用户的本地日期通常只有一两个取值，按日期分组查询最近完成日期
+        today_by_user = {user.id: user_today(user, now, app_settings) for user in users}
+        users_by_today = defaultdict(list)
+        for user_id, today in today_by_user.items():
+            users_by_today[today].append(user_id)
+        last_done = {}
+        for today, ids in users_by_today.items():
+            last_done.update(conn.execute(
+                select(Completion.task_id, func.max(Completion.completed_on))
+                .join(Task, Task.id == Completion.task_id)
+                .where(Task.user_id.in_(ids), Completion.completed_on < today)
+                .group_by(Completion.task_id)
+            ).all())
+
+        rows = [
+            {
+                "user_id": user.id,
+                "snapshot_date": today_by_user[user.id],
+                "payload": build_payload(
+                    tasks_by_user[user.id], last_done,
+                    user.daily_energy_budget, user.max_daily_tasks, today_by_user[user.id]
+                ),
+                "computed_at": now.replace(tzinfo=None),
+            }
+            for user in users
+        ]
+        conn.execute(delete(RecommendationSnapshot).where(RecommendationSnapshot.user_id.in_(user_ids)))
+        if rows:
+            conn.execute(insert(RecommendationSnapshot), rows)
+    return len(rows)
+
+
+def build_snapshots(database_url: str, user_ids: List[int], app_settings: Optional[Settings] = None) -> int:
+    """进程池入口：每个进程复用自己的引擎"""
+    engine = _worker_engines.get(database_url)
+    if engine is None:
+        from ..database import create_db_engine
+        engine = _worker_engines[database_url] = create_db_engine(database_url)
+    return refresh_snapshots(engine, user_ids, app_settings=app_settings)
+
+
+def due_user_ids(
+    engine: Engine, delay_minutes: int, now: Optional[datetime] = None, app_settings: Optional[Settings] = None
+) -> List[int]:
+    """本地日期已过零点 delay_minutes 分钟、但还没有当天快照的用户
+
+    先取出用户设置中出现过的时区（通常只有几个），在 Python 中算出各时区的本地日期并筛掉还没到点的，
+    再按本地日期分组，用左连接当天快照的查询在数据库中选出没有快照的用户，不把全部用户和快照读进内存。
+    """
+    now = now or datetime.now(timezone.utc)
+    zone_name = User.settings[TIMEZONE_KEY].as_string()
+    with engine.connect() as conn:
+        names = conn.execute(select(zone_name).distinct()).scalars().all()
+
+        # 本地日期 -> 已到点的时区名（未设置或无效的时区按默认时区处理）
+        due_names: Dict[date, List[Optional[str]]] = defaultdict(list)
+        for name in names:
+            zone = zone_or_default(name, app_settings)
+            local_now = now.astimezone(zone)
+            midnight = local_now.replace(hour=0, minute=0, second=0, microsecond=0)
+            if local_now - midnight >= timedelta(minutes=delay_minutes):
+                due_names[local_now.date()].append(name)
+
+        due = []
+        for local_date, group in due_names.items():
+            named = [name for name in group if name is not None]
+            conditions = [zone_name.in_(named)] if named else []
+            if None in group:
+                conditions.append(zone_name.is_(None))
+            due.extend(conn.execute(
+                select(User.id).outerjoin(
+                    RecommendationSnapshot,
+                    and_(RecommendationSnapshot.user_id == User.id, RecommendationSnapshot.snapshot_date == local_date)
+                ).where(RecommendationSnapshot.user_id.is_(None), or_(*conditions))
+            ).scalars())
+    return sorted(due)
+
+
+class SnapshotScheduler:
+    """在应用生命周期内定期为到点的用户预计算快照（逐个分片处理）"""
+
+    def __init__(self, shards: List[Tuple[str, Engine]], settings):
+        self.shards = shards  # [(数据库 URL, 引擎)]
+        self.settings = settings
+        self.delay_minutes = settings.SNAPSHOT_DELAY_MINUTES
+        self.interval = settings.SNAPSHOT_CHECK_INTERVAL_SECONDS
+        self.chunk_size = settings.SNAPSHOT_CHUNK_SIZE
+        self.workers = settings.SNAPSHOT_WORKERS
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        # 内存数据库无法跨进程共享，只能用应用自己的引擎在线程中计算
+        in_memory = any(engine.url.database in (None, "", ":memory:") for _, engine in self.shards)
+        if self.workers > 0 and not in_memory:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("预计算今日推荐快照失败")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """处理一轮到点的用户，返回写入的快照数"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for database_url, engine in self.shards:
+            user_ids = await loop.run_in_executor(
+                None, due_user_ids, engine, self.delay_minutes, None, self.settings
+            )
+            for i in range(0, len(user_ids), self.chunk_size):
+                chunk = user_ids[i:i + self.chunk_size]
+                if self._executor is not None:
+                    futures.append(loop.run_in_executor(
+                        self._executor, build_snapshots, database_url, chunk, self.settings
+                    ))
+                else:
+                    futures.append(loop.run_in_executor(None, refresh_snapshots, engine, chunk, None, self.settings))
+        written = sum(await asyncio.gather(*futures))
+        if written:
+            logger.info("已预计算 %d 个用户的今日推荐快照", written)
+        return written
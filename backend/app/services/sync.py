@@ -0,0 +1,72 @@
+"""
+增量同步
+
+任务、类别和完成记录的每次写入都在同一事务中向 sync_changes 追加一行（删除时带墓碑标记），
+行 id 单调递增，作为同步游标。客户端保存上次同步返回的游标，/api/sync?since=<游标> 只返回
+之后变化过的行的当前内容和被删除的 id；没有变化时只需一次走索引的查询。
+
+游标格式为 "<纪元>.<变更 id>"。纪元保存在 users.sync_epoch，用户迁移分片时重新生成
+（任务等的 id 会变化），旧游标随之失效，服务端返回全量数据（reset=true）。
+删除任务时其完成记录随之删除，不再逐条记录墓碑，客户端应一并删除该任务的完成记录。
+完成和撤销完成会改变任务响应中的最近完成日期等字段，因此除完成记录外也记一次任务变更。
+"""
+
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import false, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from ..models import Task, SyncChange
+
+TASK = "task"
+CATEGORY = "category"
+COMPLETION = "completion"
+ENTITIES = (TASK, CATEGORY, COMPLETION)
+
+
+def record_change(db: Session, user_id: int, entity: str, entity_id: int, deleted: bool = False) -> None:
+    """记录一行的新增、修改或删除，随调用方的事务一起提交"""
+    db.add(SyncChange(user_id=user_id, entity=entity, entity_id=entity_id, deleted=deleted))
+
+
+def record_task_changes(db: Session, user_id: int, *conditions) -> None:
+    """批量更新任务前，一条 INSERT ... SELECT 把受影响的任务记为已修改"""
+    db.execute(insert(SyncChange).from_select(
+        ["user_id", "entity", "entity_id", "deleted"],
+        select(Task.user_id, literal(TASK), Task.id, false()).where(Task.user_id == user_id, *conditions)
+    ))
+
+
+def format_cursor(epoch: str, change_id: int) -> str:
+    return f"{epoch}.{change_id}"
+
+
+def parse_cursor(cursor: Optional[str], epoch: str) -> Optional[int]:
+    """游标中的变更 id；缺失、格式错误或纪元不一致时返回 None，需要全量同步"""
+    if not cursor:
+        return None
+    cursor_epoch, _, change_id = cursor.rpartition(".")
+    if cursor_epoch != epoch or not change_id.isdigit():
+        return None
+    return int(change_id)
+
+
+def latest_change_id(db: Session, user_id: int) -> int:
+    return db.query(func.max(SyncChange.id)).filter(SyncChange.user_id == user_id).scalar() or 0
+
+
+def changes_since(db: Session, user_id: int, since: int) -> Tuple[int, Dict[str, Dict[int, bool]]]:
+    """since 之后的变更，同一行只保留最后一次
+
+    返回: (最新的变更 id, {实体类型: {行 id: 是否已删除}})
+    """
+    rows = db.query(SyncChange.id, SyncChange.entity, SyncChange.entity_id, SyncChange.deleted).filter(
+        SyncChange.user_id == user_id,
+        SyncChange.id > since
+    ).order_by(SyncChange.id).all()
+    latest = since
+    changes: Dict[str, Dict[int, bool]] = {entity: {} for entity in ENTITIES}
+    for change_id, entity, entity_id, deleted in rows:
+        changes[entity][entity_id] = deleted
+        latest = change_id
+    return latest, changes
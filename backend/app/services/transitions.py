@@ -0,0 +1,73 @@
+"""
+状态转换日期
+
+紧迫度和健康度只取决于最近完成日期、期望间隔和重要性，任务何时进入 high / critical 紧迫度、
+何时健康度低于 50 可以提前算出。这些日期保存在任务的 high_urgency_on、critical_urgency_on、
+low_health_on 列上（带索引），在完成、撤销完成和修改期望间隔或重要性时刷新。
+“明天哪些用户的哪些任务会变成 critical” 只需一次按索引的等值查询，不必逐个任务打分。
+"""
+
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import Task, Completion
+from .algorithm import LentoFlowAlgorithm
+from .intervals import task_interval
+
+# 状态名到转换日期列
+TRANSITION_COLUMNS = {
+    "high": Task.high_urgency_on,
+    "critical": Task.critical_urgency_on,
+    "low_health": Task.low_health_on,
+}
+
+
+def apply_transitions(task, last_done: Optional[date], since: date) -> None:
+    """按最近完成日期重新计算任务的转换日期；从未完成且已达到某状态的任务记为 since（计算当天）"""
+    dates = LentoFlowAlgorithm.transition_dates(last_done, task_interval(task), task.importance, since)
+    for column, value in dates.items():
+        setattr(task, column, value)
+
+
+def tasks_reaching(db: Session, state: str, day: date) -> List[Tuple[int, int]]:
+    """在 day 当天进入某个状态的活跃任务，返回 [(user_id, task_id)]"""
+    column = TRANSITION_COLUMNS[state]
+    return db.query(Task.user_id, Task.id).filter(
+        column == day,
+        Task.is_active == True
+    ).order_by(Task.user_id, Task.id).all()
+
+
+def refresh_transitions(conn: Connection, today: date, user_ids: Optional[List[int]] = None) -> int:
+    """批量重算任务的转换日期（迁移回填、数据修复时使用），返回更新的任务数"""
+    task_query = select(
+        Task.id, Task.expected_interval, Task.importance,
+        Task.use_learned_interval, Task.learned_interval, Task.learned_samples
+    )
+    last_done_query = select(Completion.task_id, func.max(Completion.completed_on)).group_by(Completion.task_id)
+    if user_ids is not None:
+        task_query = task_query.where(Task.user_id.in_(user_ids))
+        last_done_query = last_done_query.join(Task, Task.id == Completion.task_id).where(Task.user_id.in_(user_ids))
+    tasks = conn.execute(task_query).all()
+    last_done = dict(conn.execute(last_done_query).all())
+
+    rows = []
+    for task in tasks:
+        dates = LentoFlowAlgorithm.transition_dates(
+            last_done.get(task.id), task_interval(task), task.importance or 3, today
+        )
+        rows.append({"task_id": task.id, **{f"new_{column}": value for column, value in dates.items()}})
+    if rows:
+        conn.execute(
+            update(Task).where(Task.id == bindparam("task_id")).values(
+                high_urgency_on=bindparam("new_high_urgency_on"),
+                critical_urgency_on=bindparam("new_critical_urgency_on"),
+                low_health_on=bindparam("new_low_health_on"),
+            ),
+            rows
+        )
+    return len(rows)
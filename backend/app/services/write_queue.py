@@ -0,0 +1,137 @@
+"""
+完成记录的合并写入（group commit）
+
+SQLite 上每次提交都要独占写锁并单独 fsync，突发的打卡请求会在写锁上排队。
+开启 WRITE_QUEUE_ENABLED 后，完成/撤销操作交给进程内队列，由单个写线程按
+批（最多 WRITE_QUEUE_MAX_BATCH 个，或等待 WRITE_QUEUE_MAX_DELAY_MS 毫秒）
+在同一个事务中执行：每个操作包在 SAVEPOINT 里，失败只回滚自己；整批提交
+成功后才把结果交还给各自的请求，因此响应返回时数据已经落盘，持久性不变。
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import create_db_engine
+
+# 通知写线程退出
+_STOP = object()
+
+
+def create_writer_engine(database_url: str) -> Engine:
+    """写线程专用引擎
+
+    pysqlite 默认自行管理事务，最外层 SAVEPOINT 的 RELEASE 会直接提交，
+    这里改为由 SQLAlchemy 显式 BEGIN IMMEDIATE：一开始就拿到写锁，
+    批内的 SAVEPOINT 也都在同一个事务里。
+    """
+    engine = create_db_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return engine
+
+
+class WriteQueue:
+    """单写线程的合并写入队列"""
+
+    def __init__(self, engine: Engine, max_batch: int = 64, max_delay: float = 0.002):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.operations = 0
+        self._session_factory = sessionmaker(bind=engine, autoflush=False)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="lentoflow-writer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """处理完已入队的操作后退出"""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def submit(self, operation: Callable, *args):
+        """入队并等待结果；operation(session, *args) 抛出的异常原样抛给调用方"""
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future.result()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[Callable, tuple, Future]]) -> None:
+        outcomes = []
+        session = self._session_factory()
+        try:
+            for operation, args, future in batch:
+                try:
+                    with session.begin_nested():
+                        outcomes.append((future, operation(session, *args), None))
+                except Exception as exc:
+                    outcomes.append((future, None, exc))
+            session.commit()
+        except Exception as exc:
+            # 提交失败时整批都没有落盘，全部按失败返回
+            session.rollback()
+            for _, _, future in batch:
+                future.set_exception(exc)
+            return
+        finally:
+            session.close()
+
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+def get_write_queue(request: Request) -> Optional[WriteQueue]:
+    """依赖注入：当前用户所在分片的写入队列，未开启时为 None"""
+    write_queues = getattr(request.app.state, "write_queues", None)
+    if not write_queues:
+        return None
+    return write_queues[request.app.state.shards.shard_for_request(request)]
+
+
+def run_write(db: Session, write_queue: Optional[WriteQueue], operation: Callable, *args):
+    """执行写操作：开启队列时交给写线程，否则在当前会话中执行并提交"""
+    if write_queue is not None:
+        return write_queue.submit(operation, *args)
+    result = operation(db, *args)
+    db.commit()
+    return result
@@ -0,0 +1,167 @@
+"""
+按用户的水平分片
+
+每个用户的全部数据（任务、完成记录、类别、日志……）都在同一个分片上，
+所以每个请求只访问一个分片，各分片有各自的写锁。
+- 未配置 SHARD_DATABASE_URLS 时只有一个分片（DATABASE_URL），不使用目录库，行为与不分片时一致
+- 配置后，用户名 → (用户 id, 分片) 保存在目录库中；用户 id 由目录库分配，全局唯一
+- 已登录请求的分片由令牌中的用户名查目录得到，结果缓存在 request.state.shard 上，
+  开启缓存时用户名到分片的映射也会缓存（迁移用户后由迁移工具删除）
+迁移用户见 scripts/rebalance_shards.py。
+"""
+
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .database import create_db_engine, create_session_factory, ensure_schema
+from .models import User
+from .models.directory import DirectoryBase, UserDirectory
+
+
+class ShardRouter:
+    """用户到分片数据库的路由"""
+
+    def __init__(self, settings, cache=None):
+        self.settings = settings
+        self.cache = cache
+        self.urls: List[str] = list(settings.SHARD_DATABASE_URLS) or [settings.DATABASE_URL]
+        self.engines: List[Engine] = [create_db_engine(url) for url in self.urls]
+        self.session_factories = [create_session_factory(engine) for engine in self.engines]
+        self.directory_engine: Optional[Engine] = None
+        self._directory_factory = None
+        if settings.SHARD_DATABASE_URLS:
+            self.directory_engine = create_db_engine(settings.DIRECTORY_DATABASE_URL)
+            self._directory_factory = create_session_factory(self.directory_engine)
+
+    @property
+    def sharded(self) -> bool:
+        return self.directory_engine is not None
+
+    def all_engines(self) -> List[Engine]:
+        """全部分片引擎，以及目录库引擎（如果有）"""
+        return self.engines + ([self.directory_engine] if self.directory_engine is not None else [])
+
+    def ensure_schema(self) -> None:
+        for engine in self.engines:
+            ensure_schema(engine)
+        if self.directory_engine is not None:
+            DirectoryBase.metadata.create_all(bind=self.directory_engine)
+
+    def dispose(self) -> None:
+        for engine in self.all_engines():
+            engine.dispose()
+
+    def session(self, shard: int) -> Session:
+        return self.session_factories[shard]()
+
+    def directory_session(self) -> Session:
+        return self._directory_factory()
+
+    def locate(self, username: str) -> Optional[int]:
+        """用户所在的分片，用户不存在时返回 None（不分片时总是 0）"""
+        if not self.sharded:
+            return 0
+        if self.cache is not None:
+            shard = self.cache.get(shard_cache_key(username), "shard")
+            if shard is not None:
+                return shard
+        with self.directory_session() as directory:
+            shard = directory.query(UserDirectory.shard).filter(
+                UserDirectory.username == username
+            ).scalar()
+        if shard is not None and self.cache is not None:
+            self.cache.set(shard_cache_key(username), shard)
+        return shard
+
+    def shard_for_request(self, request: Request) -> int:
+        """按令牌中的用户名确定请求的分片；未登录或令牌无效时返回 0，由认证依赖拒绝"""
+        if not self.sharded:
+            return 0
+        shard = getattr(request.state, "shard", None)
+        if shard is not None:
+            return shard
+
+        shard = 0
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(
+                    authorization[7:], self.settings.SECRET_KEY, algorithms=[self.settings.ALGORITHM]
+                )
+            except JWTError:
+                payload = {}
+            username = payload.get("sub")
+            if username:
+                shard = self.locate(username)
+                shard = 0 if shard is None else shard
+        request.state.shard = shard
+        return shard
+
+    def find_conflict(self, username: str, email: str) -> Optional[str]:
+        """检查用户名或邮箱是否已被占用，返回 "username"、"email" 或 None"""
+        if self.sharded:
+            with self.directory_session() as directory:
+                existing = directory.query(UserDirectory.username).filter(
+                    (UserDirectory.username == username) | (UserDirectory.email == email)
+                ).first()
+                existing_username = existing.username if existing else None
+        else:
+            with self.session(0) as db:
+                existing = db.query(User.username).filter(
+                    (User.username == username) | (User.email == email)
+                ).first()
+                existing_username = existing.username if existing else None
+        if existing is None:
+            return None
+        return "username" if existing_username == username else "email"
+
+    def reserve(self, username: str, email: str) -> Tuple[Optional[int], int]:
+        """为新用户分配 (用户 id, 分片)；新用户放到用户最少的分片。不分片时 id 由数据库生成"""
+        if not self.sharded:
+            return None, 0
+        with self.directory_session() as directory:
+            counts = dict(directory.query(UserDirectory.shard, func.count(UserDirectory.id)).group_by(
+                UserDirectory.shard
+            ).all())
+            shard = min(range(len(self.engines)), key=lambda index: (counts.get(index, 0), index))
+            entry = UserDirectory(username=username, email=email, shard=shard)
+            directory.add(entry)
+            directory.commit()
+            return entry.id, shard
+
+    def release(self, user_id: Optional[int]) -> None:
+        """注册失败时撤销 reserve 分配的目录项"""
+        if not self.sharded or user_id is None:
+            return
+        with self.directory_session() as directory:
+            entry = directory.get(UserDirectory, user_id)
+            if entry is not None:
+                directory.delete(entry)
+                directory.commit()
+                if self.cache is not None:
+                    self.cache.delete(shard_cache_key(entry.username))
+
+    def user_counts(self) -> List[int]:
+        """每个分片上的用户数（按目录库统计）"""
+        if not self.sharded:
+            with self.engines[0].connect() as conn:
+                return [conn.execute(select(func.count(User.id))).scalar()]
+        with self.directory_engine.connect() as conn:
+            counts = dict(conn.execute(
+                select(UserDirectory.shard, func.count(UserDirectory.id)).group_by(UserDirectory.shard)
+            ).all())
+        return [counts.get(index, 0) for index in range(len(self.engines))]
+
+
+def shard_cache_key(username: str) -> str:
+    return f"shard:{username}"
+
+
+def get_shards(request: Request) -> ShardRouter:
+    """依赖注入：当前应用的分片路由"""
+    return request.app.state.shards
@@ -3,12 +3,13 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from typing import Optional
 
 from ..database import get_db
 from ..models import User
-from ..config import settings
+from ..config import Settings, settings, get_settings
+from ..services.cache import Cache, get_cache, user_namespace
 
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -32,33 +33,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(password_truncated, hashed_password)
 
 # 创建访问令牌
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(
+    data: dict,
+    expires_delta: Optional[timedelta] = None,
+    app_settings: Settings = settings
+) -> str:
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.utcnow() + timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, app_settings.SECRET_KEY, algorithm=app_settings.ALGORITHM)
     return encoded_jwt
 
+# 把缓存的列值还原为会话中的持久化对象（不查询数据库）
+def _attach_user(db: Session, columns: dict) -> User:
+    user = User(**columns)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
 # 获取当前用户
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    app_settings: Settings = Depends(get_settings),
+    cache: Optional[Cache] = Depends(get_cache)
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = jwt.decode(token, app_settings.SECRET_KEY, algorithms=[app_settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
+    # 用户名到 id 的映射不会变化；列值按用户数据版本缓存，版本在查询前读取
+    user_id = key = None
+    if cache is not None:
+        user_id = cache.get(f"uid:{username}", "auth")
+        if user_id is not None:
+            key = cache.versioned_key(user_namespace(user_id), "user")
+            columns = cache.get(key, "auth")
+            if columns is not None:
+                return _attach_user(db, columns)
+    
     user = db.query(User).filter(User.username == username).first()
     if user is None:
         raise credentials_exception
+    if cache is not None:
+        if key is None:
+            cache.set(f"uid:{username}", user.id)
+        else:
+            cache.set(key, {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs})
     
     return user
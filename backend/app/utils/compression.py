@@ -0,0 +1,285 @@
+"""
+响应压缩
+
+按 Accept-Encoding 协商压缩算法：安装了 zstandard / brotli 时优先使用，否则用 gzip。
+- 只压缩文本类响应（JSON、text/*、XML），小于 minimum_size 字节的响应原样返回
+- 流式响应（more_body）先缓冲到 minimum_size 再开始压缩，之后每个分块压缩后立即刷出，
+  不会把整个流攒在内存里；不足 minimum_size 就结束的流原样返回
+- 压缩后的内容与原内容字节不同，强 ETag 改为弱 ETag（W/"..."），If-None-Match 仍按弱比较命中
+- 已经带 Content-Encoding 或 Cache-Control: no-transform 的响应不处理
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 可压缩的内容类型
+COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "application/xml", "image/svg+xml"}
+
+
+class Compressor(ABC):
+    """增量压缩器：compress() 压缩一个分块，flush() 刷出已压缩的数据，finish() 结束压缩流"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """压缩一个分块，返回目前可以输出的数据"""
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """刷出已压缩的数据，压缩流保持打开"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """结束压缩流，返回剩余的数据"""
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int = 6):
+        # wbits=31 输出带 gzip 头的数据
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int = 4):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int = 3):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    """当前环境可用的编码，按服务端偏好排序"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def create_compressor(encoding: str, level: int) -> Compressor:
+    if encoding == "zstd":
+        return ZstdCompressor(level)
+    if encoding == "br":
+        return BrotliCompressor(level)
+    return GzipCompressor(level)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 {编码: q 值}"""
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[token] = quality
+    return accepted
+
+
+def negotiate(header: str, encodings: List[str]) -> Optional[str]:
+    """选出客户端接受（q 值最高）且服务端支持的编码，q 值相同时按服务端偏好"""
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in COMPRESSIBLE_TYPES
+        or media_type.endswith("+json")
+        or media_type.endswith("+xml")
+    )
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩响应的 ASGI 中间件"""
+
+    def __init__(self, app, settings):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE
+        self.encodings = available_encodings()
+        self.levels = {
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_QUALITY,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        responder = _CompressionResponder(self, send, negotiate(accept_encoding, self.encodings))
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """单个响应的压缩状态"""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: Optional[str]):
+        self.middleware = middleware
+        self.downstream = send
+        self.encoding = encoding
+        self.start_message = None
+        # None：尚未决定；True：压缩中；False：原样透传
+        self.compressing: Optional[bool] = None
+        self.pending: List[bytes] = []
+        self.pending_size = 0
+        self.compressor: Optional[Compressor] = None
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            if not self._eligible(message):
+                self.compressing = False
+                await self.downstream(message)
+            return
+        if message_type != "http.response.body" or self.compressing is False:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressing:
+            data = self.compressor.compress(body)
+            data += self.compressor.flush() if more_body else self.compressor.finish()
+            await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+            return
+
+        # 还没决定：缓冲到达到阈值或响应结束
+        self.pending.append(body)
+        self.pending_size += len(body)
+        if more_body and self.pending_size < self.middleware.minimum_size:
+            return
+        buffered = b"".join(self.pending)
+        self.pending = []
+        headers = _Headers(self.start_message)
+        if self.pending_size >= self.middleware.minimum_size:
+            # 足够大的响应是否压缩取决于 Accept-Encoding
+            headers.add_vary()
+        if self.pending_size < self.middleware.minimum_size or self.encoding is None:
+            # 太小或客户端不接受压缩：原样发出
+            self.compressing = False
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": buffered, "more_body": more_body})
+            return
+
+        self.compressing = True
+        self.compressor = create_compressor(self.encoding, self.middleware.levels[self.encoding])
+        data = self.compressor.compress(buffered)
+        if more_body:
+            data += self.compressor.flush()
+            headers.remove("content-length")
+        else:
+            data += self.compressor.finish()
+            headers.set("content-length", str(len(data)))
+        headers.set("content-encoding", self.encoding)
+        headers.weaken_etag()
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _eligible(self, message) -> bool:
+        status = message["status"]
+        if status < 200 or status in (204, 304):
+            return False
+        headers = _Headers(message)
+        if headers.get("content-encoding") is not None:
+            return False
+        if "no-transform" in (headers.get("cache-control") or "").lower():
+            return False
+        return is_compressible(headers.get("content-type") or "")
+
+
+class _Headers:
+    """直接修改 http.response.start 消息中的响应头"""
+
+    def __init__(self, message):
+        self.raw = list(message.get("headers", []))
+        message["headers"] = self.raw
+
+    def get(self, name: str) -> Optional[str]:
+        key = name.encode("latin-1")
+        for header, value in self.raw:
+            if header.lower() == key:
+                return value.decode("latin-1")
+        return None
+
+    def remove(self, name: str) -> None:
+        key = name.encode("latin-1")
+        self.raw[:] = [(header, value) for header, value in self.raw if header.lower() != key]
+
+    def set(self, name: str, value: str) -> None:
+        self.remove(name)
+        self.raw.append((name.encode("latin-1"), value.encode("latin-1")))
+
+    def add_vary(self) -> None:
+        vary = self.get("vary")
+        if vary is None:
+            self.set("vary", "Accept-Encoding")
+        elif "accept-encoding" not in vary.lower():
+            self.set("vary", f"{vary}, Accept-Encoding")
+
+    def weaken_etag(self) -> None:
+        etag = self.get("etag")
+        if etag is not None and not etag.startswith("W/"):
+            self.set("etag", f"W/{etag}")
@@ -0,0 +1,23 @@
+"""
+稀疏字段集
+
+列表接口支持 fields=id,name,health 只返回需要的字段，按响应模型的字段校验，
+路由据此缩小 SQL 查询的列和编码的内容。id 始终返回，供客户端作为主键。
+"""
+
+from typing import List, Optional, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel], always: tuple = ("id",)) -> Optional[List[str]]:
+    """解析逗号分隔的字段名，按模型的字段顺序返回；未指定时返回 None，表示全部字段"""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"未知的字段：{', '.join(sorted(unknown))}")
+    requested.update(always)
+    return [name for name in model.model_fields if name in requested]
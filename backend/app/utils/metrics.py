@@ -0,0 +1,221 @@
+"""
+请求级 SQL 统计与 Prometheus 指标
+
+- SQLAlchemy 的 before/after_cursor_execute 钩子把语句数和数据库耗时
+  记到当前请求上（通过 ContextVar 传递，线程池中的同步路由同样可见）
+- MetricsMiddleware 按路由模板记录延迟、语句数和数据库耗时的直方图
+- MetricsRegistry.render() 输出 Prometheus 文本格式，供 /metrics 使用；
+  缓存等组件通过 set_collector() 追加自己的指标
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 直方图分桶
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+# 未匹配到路由的请求统一归到一个标签，避免路径基数爆炸
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    """单个请求的数据库统计"""
+    __slots__ = ("statements", "db_time")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("lentoflow_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """当前请求的数据库统计，请求之外返回 None"""
+    return _current_stats.get()
+
+
+class Histogram:
+    """固定分桶的直方图（非线程安全，由 MetricsRegistry 加锁）"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[Tuple[str, str, int], int] = {}
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._statements: Dict[Tuple[str, str], Histogram] = {}
+        self._db_time: Dict[Tuple[str, str], Histogram] = {}
+        self._background_statements = 0
+        self._background_db_time = 0.0
+        self._collectors: Dict[str, Callable[[], List[str]]] = {}
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stats: RequestStats
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            self._requests[(method, route, status)] = self._requests.get((method, route, status), 0) + 1
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._statements[key] = Histogram(STATEMENT_BUCKETS)
+                self._db_time[key] = Histogram(LATENCY_BUCKETS)
+            self._latency[key].observe(duration)
+            self._statements[key].observe(stats.statements)
+            self._db_time[key].observe(stats.db_time)
+
+    def observe_background_statement(self, duration: float) -> None:
+        """请求之外（后台任务、脚本）执行的语句"""
+        with self._lock:
+            self._background_statements += 1
+            self._background_db_time += duration
+
+    def set_collector(self, name: str, collector: Callable[[], List[str]]) -> None:
+        """注册（或替换）一个在 render() 时输出额外指标行的组件"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP lentoflow_http_requests_total HTTP 请求数")
+            lines.append("# TYPE lentoflow_http_requests_total counter")
+            for (method, route, status), value in sorted(self._requests.items()):
+                lines.append(
+                    f"lentoflow_http_requests_total{_labels(method=method, route=route, status=status)} {value}"
+                )
+            _render_histograms(
+                lines, "lentoflow_http_request_duration_seconds", "请求延迟（秒）", self._latency
+            )
+            _render_histograms(
+                lines, "lentoflow_db_statements_per_request", "每个请求执行的 SQL 语句数", self._statements
+            )
+            _render_histograms(
+                lines, "lentoflow_db_time_per_request_seconds", "每个请求的数据库耗时（秒）", self._db_time
+            )
+            lines.append("# HELP lentoflow_db_background_statements_total 请求之外执行的 SQL 语句数")
+            lines.append("# TYPE lentoflow_db_background_statements_total counter")
+            lines.append(f"lentoflow_db_background_statements_total {self._background_statements}")
+            lines.append("# HELP lentoflow_db_background_time_seconds_total 请求之外的数据库耗时（秒）")
+            lines.append("# TYPE lentoflow_db_background_time_seconds_total counter")
+            lines.append(f"lentoflow_db_background_time_seconds_total {_format_value(self._background_db_time)}")
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_counter(name: str, help_text: str, samples: Iterable[Tuple[dict, float]]) -> List[str]:
+    """输出一个计数器的 Prometheus 文本行，samples 为 (标签, 值)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(**labels)} {_format_value(value)}")
+    return lines
+
+
+def _render_histograms(lines: list, name: str, help_text: str, histograms: Dict[Tuple[str, str], Histogram]) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for (method, route), histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+
+def instrument_engine(engine: Engine, registry: MetricsRegistry) -> None:
+    """给引擎挂上语句计数与计时钩子"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._lentoflow_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._lentoflow_started
+        stats = _current_stats.get()
+        if stats is None:
+            registry.observe_background_statement(elapsed)
+        else:
+            stats.statements += 1
+            stats.db_time += elapsed
+
+
+class MetricsMiddleware:
+    """按路由模板记录请求延迟与数据库统计的 ASGI 中间件"""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            _current_stats.reset(token)
+            route = scope.get("route")
+            self.registry.observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                duration,
+                stats
+            )
@@ -0,0 +1,321 @@
+"""
+按需采样分析器
+
+只对单个请求开启：请求头携带有效签名，或当前用户在 PROFILER_USERNAMES 中。
+被选中的请求运行期间，后台线程定期采样处理该请求的线程栈，
+结束后输出 flamegraph.pl / speedscope 可读的 collapsed stack 文件和 JSON 汇总，
+执行 SQL 期间的样本以 [db] 帧结尾，数据库耗时与语句数单独统计。
+采样线程需要拿到 GIL 才能读取其他线程的栈：默认每 5ms 才切换一次，纯 Python 计算期间几乎采不到样本，
+只有在执行 SQL 等释放 GIL 的时候才被采到。因此有会话进行时把切换间隔临时调低到采样间隔的四分之一。
+
+PROFILER_ENABLED 为 False 时不安装中间件、钩子和路由包装，没有任何额外开销。
+"""
+
+import functools
+import hashlib
+import hmac
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from jose import JWTError, jwt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 请求头：值为 "<过期时间戳>.<签名>"
+PROFILE_HEADER = "x-lentoflow-profile"
+PROFILE_ID_HEADER = "X-LentoFlow-Profile-Id"
+
+# 执行 SQL 时追加到栈顶的帧名
+DB_FRAME = "[db]"
+
+_active_session: ContextVar[Optional["ProfileSession"]] = ContextVar("lentoflow_profile_session", default=None)
+
+# 进行中的会话数，以及第一个会话开始前的 GIL 切换间隔（最后一个会话结束时恢复）
+_switch_lock = threading.Lock()
+_running_sessions = 0
+_saved_switch_interval = 0.0
+
+
+def _signature(secret: str, path: str, expires: int) -> str:
+    return hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+
+
+def sign_profile_request(secret: str, path: str, ttl: int = 300, now: Optional[float] = None) -> str:
+    """生成某个路径的分析请求头，ttl 秒内有效"""
+    expires = int((now or time.time()) + ttl)
+    return f"{expires}.{_signature(secret, path, expires)}"
+
+
+def verify_profile_signature(secret: str, path: str, value: str, now: Optional[float] = None) -> bool:
+    """校验分析请求头的签名与有效期"""
+    expires, _, signature = value.partition(".")
+    if not expires.isdigit() or int(expires) < (now or time.time()):
+        return False
+    return hmac.compare_digest(signature, _signature(secret, path, int(expires)))
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # co_qualname 从 Python 3.11 开始才有，更早的版本只有函数名
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _lower_switch_interval(interval: float) -> None:
+    global _running_sessions, _saved_switch_interval
+    with _switch_lock:
+        if _running_sessions == 0:
+            _saved_switch_interval = sys.getswitchinterval()
+        _running_sessions += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval / 4))
+
+
+def _restore_switch_interval() -> None:
+    global _running_sessions
+    with _switch_lock:
+        _running_sessions -= 1
+        if _running_sessions == 0:
+            sys.setswitchinterval(_saved_switch_interval)
+
+
+class ProfileSession:
+    """单个请求的采样会话"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.statements = 0
+        self.db_time = 0.0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self._threads = {}  # 线程 id -> 嵌套计数
+        self._db_threads = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="lentoflow-profiler", daemon=True)
+
+    @contextmanager
+    def track_current_thread(self):
+        """在上下文内采样当前线程"""
+        tid = threading.get_ident()
+        with self._lock:
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._threads[tid] == 1:
+                    del self._threads[tid]
+                else:
+                    self._threads[tid] -= 1
+
+    def enter_db(self) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            # SQL 可能在未包装的依赖中执行，此时临时纳入采样
+            self._threads[tid] = self._threads.get(tid, 0) + 1
+            self._db_threads.add(tid)
+
+    def exit_db(self, elapsed: float) -> None:
+        tid = threading.get_ident()
+        with self._lock:
+            self.statements += 1
+            self.db_time += elapsed
+            self._db_threads.discard(tid)
+            if self._threads.get(tid, 0) <= 1:
+                self._threads.pop(tid, None)
+            else:
+                self._threads[tid] -= 1
+
+    def start(self) -> None:
+        _lower_switch_interval(self.interval)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._sampler.join()
+        _restore_switch_interval()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            threads = list(self._threads)
+            db_threads = set(self._db_threads)
+        for tid in threads:
+            frame = frames.get(tid)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            names.reverse()
+            if tid in db_threads:
+                names.append(DB_FRAME)
+            self.stacks[";".join(names)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """collapsed stack 格式：每行 "帧;帧;帧 样本数" """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _profiled(call):
+    """包装路由或依赖函数，使其运行的线程在分析期间被采样"""
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            session = _active_session.get()
+            if session is None:
+                return await call(*args, **kwargs)
+            with session.track_current_thread():
+                return await call(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        session = _active_session.get()
+        if session is None:
+            return call(*args, **kwargs)
+        with session.track_current_thread():
+            return call(*args, **kwargs)
+    return wrapper
+
+
+def instrument_routes(app) -> None:
+    """包装所有路由函数及其普通（非生成器）依赖"""
+    wrapped = {}
+
+    def wrap(dependant):
+        call = dependant.call
+        if call is not None and inspect.isfunction(call) and not (
+            inspect.isgeneratorfunction(call) or inspect.isasyncgenfunction(call)
+        ):
+            # 同一函数只包装一次，保持依赖缓存按函数去重
+            if call not in wrapped:
+                wrapped[call] = _profiled(call)
+            dependant.call = wrapped[call]
+        for sub_dependant in dependant.dependencies:
+            wrap(sub_dependant)
+
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            wrap(route.dependant)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """把分析期间执行的 SQL 计入会话，并在样本中标记为 [db]"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        session = _active_session.get()
+        if session is not None:
+            context._lentoflow_profile_started = time.perf_counter()
+            session.enter_db()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        session = _active_session.get()
+        if session is not None:
+            session.exit_db(time.perf_counter() - context._lentoflow_profile_started)
+
+
+class ProfilerMiddleware:
+    """为被选中的请求开启采样，结果写入 PROFILER_OUTPUT_DIR"""
+
+    def __init__(self, app, settings):
+        self.app = app
+        self.secret = settings.PROFILER_SECRET or settings.SECRET_KEY
+        self.jwt_secret = settings.SECRET_KEY
+        self.jwt_algorithm = settings.ALGORITHM
+        self.usernames = set(settings.PROFILER_USERNAMES)
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.output_dir = settings.PROFILER_OUTPUT_DIR
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(self.interval)
+        token = _active_session.set(session)
+
+        async def send_wrapper(message):
+            # 响应头发出时处理已结束，停止采样并写出结果
+            if message["type"] == "http.response.start":
+                session.stop()
+                profile_id = self._write(scope, session)
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.lower().encode(), profile_id.encode()))
+                headers.append((
+                    b"server-timing",
+                    f"total;dur={session.elapsed * 1000:.1f}, db;dur={session.db_time * 1000:.1f}".encode()
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        session.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.stop()
+            _active_session.reset(token)
+
+    def _requested(self, scope) -> bool:
+        header_value = None
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER.encode():
+                header_value = value.decode("latin-1")
+            elif name == b"authorization":
+                authorization = value.decode("latin-1")
+
+        if header_value is not None:
+            return verify_profile_signature(self.secret, scope["path"], header_value)
+
+        if self.usernames and authorization and authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], self.jwt_secret, algorithms=[self.jwt_algorithm])
+            except JWTError:
+                return False
+            return payload.get("sub") in self.usernames
+        return False
+
+    def _write(self, scope, session: ProfileSession) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-") or "root"
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{slug}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, profile_id)
+        with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+            f.write(session.collapsed())
+        # 汇总信息单独存放，保持 collapsed 文件可被火焰图工具直接读取
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope["query_string"].decode("latin-1"),
+                "wall_ms": round(session.elapsed * 1000, 3),
+                "db_ms": round(session.db_time * 1000, 3),
+                "statements": session.statements,
+                "samples": session.samples,
+                "interval_ms": self.interval * 1000,
+            }, f, ensure_ascii=False, indent=2)
+        return profile_id
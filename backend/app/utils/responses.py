@@ -0,0 +1,45 @@
+"""
+JSON 响应的快速路径
+
+按 response_model 序列化时，FastAPI 会把路由的返回值再校验一遍（同步路由还要为此切换一次线程池），
+手动构造的 TaskResponse(...) 等模型也因此被校验两次。热点路由改为直接返回编码好的字节：
+- 已经构造好的数据用路由模块里预先创建的 TypeAdapter 在 pydantic-core 中编码，最多校验一次
+- 类型确定的行（热力图、任务列表）直接拼成字典交给 orjson 编码，不经过 pydantic
+路由仍然声明 response_model，只用于生成文档。编码结果是字节，可以直接放进缓存。
+未安装 orjson 时退回标准库 json。
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONBytesResponse(Response):
+    """已编码的 JSON 响应体"""
+    media_type = "application/json"
+
+
+def _default(value: Any):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def dump_rows(content: Any) -> bytes:
+    """直接编码由 str/int/float/bool/None/date/datetime 组成的数据，不做校验"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def dump_model(adapter: TypeAdapter, content: Any) -> bytes:
+    """按 adapter 的类型编码；模型实例不会重复校验，字典只校验一次"""
+    return adapter.dump_json(adapter.validate_python(content))
@@ -0,0 +1,85 @@
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from ..config import Settings, settings
+
+# User.settings 中保存时区的键
+TIMEZONE_KEY = "timezone"
+# User.settings 中保存免打扰时段的键，格式为 "22:00-08:00"（可以跨零点），空字符串表示不设免打扰
+QUIET_HOURS_KEY = "quiet_hours"
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """按 IANA 名称获取时区对象（带缓存）"""
+    return ZoneInfo(name)
+
+
+def is_valid_timezone(name) -> bool:
+    """检查时区名称是否有效"""
+    if not isinstance(name, str) or not name:
+        return False
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def zone_or_default(name, app_settings: Optional[Settings] = None) -> ZoneInfo:
+    """按名称获取时区，名称未设置或无效时使用应用配置（未传入时为全局配置）的默认时区"""
+    if not is_valid_timezone(name):
+        name = (app_settings or settings).DEFAULT_TIMEZONE
+    return get_zone(name)
+
+
+def user_timezone(user, app_settings: Optional[Settings] = None) -> ZoneInfo:
+    """获取用户时区，未设置或无效时使用默认时区"""
+    return zone_or_default((user.settings or {}).get(TIMEZONE_KEY), app_settings)
+
+
+def user_today(user, now: Optional[datetime] = None, app_settings: Optional[Settings] = None) -> date:
+    """用户所在时区的今天"""
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(user_timezone(user, app_settings)).date()
+
+
+def local_date(utc_dt: datetime, tz: ZoneInfo) -> date:
+    """将数据库中的 UTC 时间（无时区信息）转换为本地日期"""
+    if utc_dt.tzinfo is None:
+        utc_dt = utc_dt.replace(tzinfo=timezone.utc)
+    return utc_dt.astimezone(tz).date()
+
+
+def parse_quiet_hours(value) -> Optional[Tuple[time, time]]:
+    """解析免打扰时段，返回 (开始, 结束)；空字符串返回 None，格式错误时抛出 ValueError"""
+    if not isinstance(value, str):
+        raise ValueError("免打扰时段必须是字符串")
+    if not value.strip():
+        return None
+    start, sep, end = value.partition("-")
+    if not sep:
+        raise ValueError("免打扰时段格式应为 HH:MM-HH:MM")
+    return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+
+
+def is_valid_quiet_hours(value) -> bool:
+    """检查免打扰时段是否有效"""
+    try:
+        parse_quiet_hours(value)
+    except ValueError:
+        return False
+    return True
+
+
+def in_quiet_hours(local_time: time, quiet_hours: Optional[Tuple[time, time]]) -> bool:
+    """本地时间是否在免打扰时段内（开始时间包含在内，结束时间不包含）"""
+    if quiet_hours is None:
+        return False
+    start, end = quiet_hours
+    if start <= end:
+        return start <= local_time < end
+    # 跨零点
+    return local_time >= start or local_time < end
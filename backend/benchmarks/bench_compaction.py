@@ -0,0 +1,125 @@
+"""
+历史完成记录压缩基准
+
+生成多年的合成数据后压缩 --hot-days 天之前的完成记录，比较压缩前后：
+- 结果：每个用户的周 / 月统计、多年热力图、每个任务的统计（连续天数）、含热力图的仪表盘、今日视图，
+  以及按完成历史回填的学习间隔，逐字节一致
+- 规模：completions 的行数和 completion_archives 的行数
+- 耗时：压缩本身，以及压缩前后各接口的总耗时（热力图、统计等读取任务行上的完成日位图，不受压缩影响）
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_compaction --users 20 --tasks 10 --years 4 --hot-days 365
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.config import Settings
+from app.database import create_db_engine
+from app.main import create_app
+from app.models import User, Task, Completion, CompletionArchive
+from app.services.archive import compact_completions
+from app.services.intervals import backfill_learned_intervals
+from app.utils.auth import create_access_token
+from benchmarks.datagen import generate
+
+
+def snapshot(client: TestClient, settings: Settings, users: list, task_ids: dict, days: int) -> tuple:
+    """请求所有受压缩影响的接口，返回 ({(用户, 路径): 响应字节}, 总耗时)"""
+    responses = {}
+    started = time.perf_counter()
+    for user_id, username in users:
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': username}, app_settings=settings)}"}
+        paths = [
+            f"/api/stats/weekly?weeks={days // 7}",
+            f"/api/stats/monthly?months={days // 30}",
+            f"/api/stats/heatmap?days={days}",
+            f"/api/dashboard?heatmap_days={days}",
+            "/api/today",
+        ] + [f"/api/stats/task/{task_id}" for task_id in task_ids[user_id]]
+        for path in paths:
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, (path, response.text[:200])
+            responses[(user_id, path)] = response.content
+    return responses, time.perf_counter() - started
+
+
+def learned_intervals(engine) -> dict:
+    with engine.begin() as conn:
+        backfill_learned_intervals(conn)
+        return {
+            row.id: (row.learned_interval, row.learned_samples, row.learned_last_on)
+            for row in conn.execute(select(Task.id, Task.learned_interval, Task.learned_samples, Task.learned_last_on))
+        }
+
+
+def count_rows(engine) -> tuple:
+    with engine.connect() as conn:
+        return (
+            conn.execute(select(func.count(Completion.id))).scalar(),
+            conn.execute(select(func.count(CompletionArchive.id))).scalar(),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="历史完成记录压缩基准")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=10, help="每个用户的任务数")
+    parser.add_argument("--years", type=float, default=4.0)
+    parser.add_argument("--hot-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    days = int(args.years * 365)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(database_url)
+        generate(engine, users=args.users, tasks_per_user=args.tasks, years=args.years, seed=args.seed)
+        with engine.connect() as conn:
+            users = conn.execute(select(User.id, User.username).order_by(User.id)).all()
+            task_ids = {}
+            for user_id, task_id in conn.execute(select(Task.user_id, Task.id).order_by(Task.id)):
+                task_ids.setdefault(user_id, []).append(task_id)
+
+        settings = Settings(DATABASE_URL=database_url, CACHE_BACKEND="none", SNAPSHOT_ENABLED=False)
+        app = create_app(settings)
+        with TestClient(app) as client:
+            intervals_before = learned_intervals(engine)
+            hot_before, _ = count_rows(engine)
+            before, before_seconds = snapshot(client, settings, users, task_ids, days)
+
+            started = time.perf_counter()
+            compacted = compact_completions(engine, args.hot_days, args.batch_size, date.today())
+            compact_seconds = time.perf_counter() - started
+            hot_after, archived = count_rows(engine)
+
+            # 用户的 completions_archived_before 已更新；未开启缓存，认证时会重新读取
+            after, after_seconds = snapshot(client, settings, users, task_ids, days)
+            intervals_after = learned_intervals(engine)
+
+            # 再压缩一次：没有新的可压缩记录
+            again = compact_completions(engine, args.hot_days, args.batch_size, date.today())
+        engine.dispose()
+
+    mismatched = [key for key in before if before[key] != after[key]]
+    assert not mismatched, f"压缩前后结果不一致：{mismatched[:5]}"
+    assert intervals_before == intervals_after, "压缩前后回填的学习间隔不一致"
+    assert not again, "重复压缩时不应再有记录被压缩"
+
+    print(f"{len(users)} 个用户、{sum(len(ids) for ids in task_ids.values())} 个任务、{args.years:g} 年数据，"
+          f"压缩 {args.hot_days} 天之前的记录（{len(before)} 个响应和学习间隔一致）")
+    print(f"completions        {hot_before:>10} 行 -> {hot_after} 行")
+    print(f"completion_archives{archived:>10} 行（{len(compacted)} 个用户）")
+    print(f"压缩耗时           {compact_seconds:>10.2f}s")
+    print(f"接口耗时           {before_seconds:>10.2f}s -> {after_seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+响应压缩基准
+
+用合成数据中的一个重度用户请求几个响应体较大的接口，对比各编码下的传输字节数和每次压缩的 CPU 时间：
+- 原始字节数来自 Accept-Encoding: identity 的响应
+- 压缩后字节数来自经过 CompressionMiddleware 的真实响应，并解压校验与原文一致
+- CPU 时间用 time.process_time 对同一响应体重复压缩取平均（与中间件使用相同的压缩级别）
+未安装 brotli / zstandard 时只测 gzip。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_compression --tasks 50 --years 2 --repeat 200
+"""
+
+import argparse
+import gzip
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.config import Settings
+from app.database import create_db_engine
+from app.main import create_app
+from app.models import User
+from app.utils import compression
+from app.utils.auth import create_access_token
+from app.utils.compression import available_encodings, create_compressor
+from benchmarks.datagen import generate
+
+ENDPOINTS = [
+    ("GET /api/tasks", "/api/tasks"),
+    ("GET /api/today", "/api/today"),
+    ("GET /api/stats/heatmap?days=365", "/api/stats/heatmap?days=365"),
+    ("GET /api/stats/daily?days=365", "/api/stats/daily?days=365"),
+    ("GET /api/stats/monthly", "/api/stats/monthly"),
+]
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "zstd":
+        return compression.zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    if encoding == "br":
+        return compression.brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def cpu_ms(encoding: str, level: int, body: bytes, repeat: int) -> float:
+    """压缩一次响应体的平均 CPU 时间（毫秒）"""
+    started = time.process_time()
+    for _ in range(repeat):
+        compressor = create_compressor(encoding, level)
+        compressor.compress(body)
+        compressor.finish()
+    return (time.process_time() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应压缩基准")
+    parser.add_argument("--tasks", type=int, default=50, help="重度用户的任务数")
+    parser.add_argument("--years", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    encodings = available_encodings()
+    rows: List[Dict] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_db_engine(database_url)
+        generate(engine, 1, args.tasks, years=args.years, seed=args.seed)
+        with engine.connect() as conn:
+            username = conn.execute(select(User.username)).scalar()
+        engine.dispose()
+
+        settings = Settings(DATABASE_URL=database_url, SNAPSHOT_ENABLED=False)
+        levels = {
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_QUALITY,
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+        }
+        token = create_access_token({"sub": username}, app_settings=settings)
+        auth = {"Authorization": f"Bearer {token}"}
+        with TestClient(create_app(settings)) as client:
+            for name, path in ENDPOINTS:
+                raw = client.get(path, headers={**auth, "Accept-Encoding": "identity"})
+                raw.raise_for_status()
+                row = {"name": name, "raw": len(raw.content)}
+                for encoding in encodings:
+                    # 直接读取线路上的字节，不让 httpx 自动解压
+                    with client.stream("GET", path, headers={**auth, "Accept-Encoding": encoding}) as response:
+                        wire = b"".join(response.iter_raw())
+                        applied = response.headers.get("content-encoding")
+                    if applied == encoding:
+                        assert decompress(encoding, wire) == raw.content, f"{name} {encoding} 解压后与原文不一致"
+                    row[encoding] = (len(wire), cpu_ms(encoding, levels[encoding], raw.content, args.repeat))
+                rows.append(row)
+
+    header = f"{'接口':<34}{'原始字节':>10}"
+    for encoding in encodings:
+        header += f"{encoding + ' 字节':>12}{'比例':>8}{'CPU ms':>9}"
+    print(header)
+    for row in rows:
+        line = f"{row['name']:<34}{row['raw']:>10}"
+        for encoding in encodings:
+            size, cpu = row[encoding]
+            line += f"{size:>12}{size / row['raw']:>8.1%}{cpu:>9.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+完成日位图基准
+
+生成多年的合成数据后，比较两种实现的结果和耗时：
+- rows：扫描 completions 的查询（按日期分组计数、按日期汇总能量、逐行计算连续天数、某天完成的任务）
+- bits：services/daybits.py 对任务行上位图的位运算（随任务一次查出）
+每个用户的热力图、每日完成数与能量、每个任务的完成次数 / 最长连续 / 当前连续 / 最近完成日期、
+今天完成的任务会先比对一致。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_daybits --users 50 --tasks 10 --years 3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.database import create_db_engine
+from app.models import User, Task, Completion
+from app.services import daybits
+from benchmarks.datagen import generate
+
+
+def rows_user(db: Session, user_id: int, start: date, today: date) -> tuple:
+    """按完成记录计算一个用户的 (热力图, 每日完成数与能量, 任务统计, 今天完成的任务)"""
+    heatmap = dict(db.query(Completion.completed_on, func.count(Completion.id)).join(Task).filter(
+        Task.user_id == user_id, Completion.completed_on >= start, Completion.completed_on <= today
+    ).group_by(Completion.completed_on).all())
+    totals = {
+        day: (count, energy) for day, count, energy in db.query(
+            Completion.completed_on,
+            func.count(Completion.id),
+            func.coalesce(func.sum(case((Task.is_active == True, Task.energy_cost), else_=0)), 0)
+        ).join(Task).filter(
+            Task.user_id == user_id, Completion.completed_on >= start, Completion.completed_on <= today
+        ).group_by(Completion.completed_on).all()
+    }
+    stats = {}
+    for task_id, in db.query(Task.id).filter(Task.user_id == user_id):
+        dates = [day for day, in db.query(Completion.completed_on).filter(
+            Completion.task_id == task_id
+        ).order_by(Completion.completed_on)]
+        longest = current = 0
+        streak = 0
+        for index, day in enumerate(dates):
+            streak = streak + 1 if index and (day - dates[index - 1]).days == 1 else 1
+            longest = max(longest, streak)
+        if dates and dates[-1] == today:
+            current = streak
+        stats[task_id] = (len(dates), longest, current, dates[-1] if dates else None)
+    completed = {task_id for task_id, in db.query(Completion.task_id).join(Task).filter(
+        Task.user_id == user_id, Completion.completed_on == today
+    )}
+    return heatmap, totals, stats, completed
+
+
+def bits_user(db: Session, user_id: int, start: date, today: date) -> tuple:
+    """按完成日位图计算同样的结果"""
+    tasks = db.query(Task).filter(Task.user_id == user_id).order_by(Task.id).all()
+    stats = {
+        task.id: (
+            daybits.total_days(task), daybits.longest_run(task),
+            daybits.run_ending(task, today), daybits.last_day(task)
+        )
+        for task in tasks
+    }
+    return (
+        daybits.daily_counts(tasks, start, today),
+        daybits.daily_totals(tasks, start, today),
+        stats,
+        daybits.completed_ids(tasks, today),
+    )
+
+
+def run(engine, user_ids: list, compute, start: date, today: date) -> tuple:
+    results = {}
+    started = time.perf_counter()
+    for user_id in user_ids:
+        # 每个用户一个新会话，避免身份映射跨用户复用已加载的任务
+        with Session(engine) as db:
+            results[user_id] = compute(db, user_id, start, today)
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="完成日位图基准")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks", type=int, default=10, help="每个用户的任务数")
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--days", type=int, default=365, help="热力图和每日汇总的天数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    today = date.today()
+    start = today - timedelta(days=args.days - 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        counts = generate(
+            engine, users=args.users, tasks_per_user=args.tasks, years=args.years, seed=args.seed, today=today
+        )
+        with engine.connect() as conn:
+            user_ids = list(conn.execute(User.__table__.select().with_only_columns(User.id)).scalars())
+
+        rows, rows_seconds = run(engine, user_ids, rows_user, start, today)
+        bits, bits_seconds = run(engine, user_ids, bits_user, start, today)
+        engine.dispose()
+
+    for user_id in user_ids:
+        for name, expected, actual in zip(("热力图", "每日汇总", "任务统计", "今日完成"), rows[user_id], bits[user_id]):
+            assert expected == actual, f"用户 {user_id} 的{name}不一致"
+
+    print(f"{len(user_ids)} 个用户、{counts['tasks']} 个任务、{counts['completions']} 条完成记录（结果一致）")
+    print(f"{'rows':<8}{rows_seconds * 1000 / len(user_ids):>10.2f} ms/用户")
+    print(f"{'bits':<8}{bits_seconds * 1000 / len(user_ids):>10.2f} ms/用户{rows_seconds / bits_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+心情统计基准
+
+生成多年的合成数据后，对每个用户的几段日期区间比较两种实现的结果和耗时：
+- rows：逐条读取区间内的完成记录，在 Python 中按任务、类别、星期累加心情，逐个任务计算点二列相关
+- numpy：services/moods.py（分组计数 + 月度行解码 + NumPy 矩阵运算）
+区间包括默认的最近 90 天、跨月和跨年的区间，以及落在压缩保留期之前的区间。
+之后压缩 --hot-days 天之前的完成记录再算一次 numpy，与压缩前的 rows 结果比对：
+星期折叠、月度行 day_moods 的解码和相关系数都要与逐条计算一致（备注数除外，压缩不保留备注）。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_moods --users 20 --tasks 10 --years 3 --hot-days 365
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database import create_db_engine
+from app.models import User, Task, Category, Completion
+from app.services.archive import compact_completions
+from app.services.moods import mood_stats
+from benchmarks.datagen import generate
+
+
+def _summary(moods: list) -> dict:
+    return {
+        "rated": len(moods),
+        "average": round(sum(moods) / len(moods), 2) if moods else None,
+        "distribution": [moods.count(mood) for mood in range(1, 6)],
+    }
+
+
+def rows_stats(db: Session, user_id: int, start: date, end: date, archived_before=None) -> dict:
+    """逐条读取完成记录计算心情统计（archived_before 不使用，压缩后的记录不在 completions 中）"""
+    tasks = db.execute(
+        select(Task.id, Task.name, Task.category_id).where(Task.user_id == user_id).order_by(Task.id)
+    ).all()
+    categories = dict(db.execute(select(Category.id, Category.name).where(Category.user_id == user_id)).all())
+    category_of = {task.id: task.category_id or 0 for task in tasks}
+
+    done = defaultdict(set)
+    notes = defaultdict(int)
+    task_moods = defaultdict(list)
+    day_moods = defaultdict(list)
+    category_moods = defaultdict(list)
+    category_done = set()
+    for task_id, completed_on, mood, note in db.execute(
+        select(Completion.task_id, Completion.completed_on, Completion.mood, Completion.note)
+        .join(Task, Task.id == Completion.task_id)
+        .where(Task.user_id == user_id, Completion.completed_on >= start, Completion.completed_on <= end)
+    ):
+        done[task_id].add(completed_on)
+        notes[task_id] += note is not None
+        category_done.add(category_of[task_id])
+        if mood is not None and 1 <= mood <= 5:
+            task_moods[task_id].append(mood)
+            day_moods[completed_on].append(mood)
+            category_moods[category_of[task_id]].append(mood)
+
+    weekday_moods = defaultdict(list)
+    for day, moods in day_moods.items():
+        weekday_moods[day.weekday()].extend(moods)
+
+    # 相关系数：有心情记录的日子上，“当天是否完成”与“当天平均心情”的皮尔逊相关
+    rated_days = sorted(day_moods)
+    mood = np.array([sum(day_moods[day]) / len(day_moods[day]) for day in rated_days])
+    correlations = []
+    for task in tasks:
+        if not done[task.id]:
+            continue
+        habit = np.array([day in done[task.id] for day in rated_days], dtype=np.float64)
+        days_done = int(habit.sum())
+        days_skipped = len(rated_days) - days_done
+        correlation = None
+        if rated_days and habit.std() > 0 and mood.std() > 0:
+            correlation = round(float(np.corrcoef(habit, mood)[0, 1]), 3)
+        correlations.append({
+            "task_id": task.id,
+            "task_name": task.name,
+            "days_done": days_done,
+            "days_skipped": days_skipped,
+            "mood_done": round(float(habit @ mood) / days_done, 2) if days_done else None,
+            "mood_skipped": round(float((1 - habit) @ mood) / days_skipped, 2) if days_skipped else None,
+            "correlation": correlation,
+        })
+
+    return {
+        "start": start,
+        "end": end,
+        "overall": _summary([mood for moods in day_moods.values() for mood in moods]),
+        "by_task": [
+            {"task_id": task.id, "task_name": task.name, "completions": len(done[task.id]),
+             "notes": notes[task.id], **_summary(task_moods[task.id])}
+            for task in tasks if done[task.id]
+        ],
+        "by_category": [
+            {"category_id": category_id or None, "name": categories[category_id] if category_id else "未分类",
+             **_summary(category_moods[category_id])}
+            for category_id in sorted(category_done, key=lambda category_id: (category_id == 0, category_id))
+        ],
+        "by_weekday": [{"weekday": weekday, **_summary(weekday_moods[weekday])} for weekday in range(7)],
+        "correlations": correlations,
+    }
+
+
+def same(expected, actual) -> bool:
+    """逐项比较，浮点数（平均值、相关系数）允许舍入误差"""
+    if isinstance(expected, float) and isinstance(actual, float):
+        return abs(expected - actual) < 2e-3
+    if isinstance(expected, dict):
+        return expected.keys() == actual.keys() and all(same(expected[key], actual[key]) for key in expected)
+    if isinstance(expected, list):
+        return len(expected) == len(actual) and all(same(a, b) for a, b in zip(expected, actual))
+    return expected == actual
+
+
+def without_notes(stats: dict) -> dict:
+    return {**stats, "by_task": [{**task, "notes": 0} for task in stats["by_task"]]}
+
+
+def run(engine, users: list, ranges: list, compute) -> tuple:
+    results = {}
+    started = time.perf_counter()
+    with Session(engine) as db:
+        for user_id, archived_before in users:
+            for start, end in ranges:
+                results[(user_id, start)] = compute(db, user_id, start, end, archived_before)
+    return results, time.perf_counter() - started
+
+
+def load_users(engine) -> list:
+    with engine.connect() as conn:
+        return conn.execute(select(User.id, User.completions_archived_before).order_by(User.id)).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="心情统计基准")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=10, help="每个用户的任务数")
+    parser.add_argument("--years", type=float, default=3.0)
+    parser.add_argument("--hot-days", type=int, default=365, help="压缩多少天之前的完成记录")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    today = date.today()
+    cold = today - timedelta(days=args.hot_days + 60)
+    ranges = [
+        (today - timedelta(days=89), today),                                 # 默认区间
+        (today - timedelta(days=364), today),                                # 一年
+        (date(cold.year - 1, 11, 17), date(cold.year, 2, 11)),               # 跨年、从月中开始，全部在压缩范围内
+        (cold - timedelta(days=200), today - timedelta(days=args.hot_days // 2)),  # 跨过压缩边界
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        counts = generate(
+            engine, users=args.users, tasks_per_user=args.tasks, years=args.years, seed=args.seed, today=today
+        )
+        users = load_users(engine)
+
+        rows, rows_seconds = run(engine, users, ranges, rows_stats)
+        hot, hot_seconds = run(engine, users, ranges, mood_stats)
+        compact_completions(engine, args.hot_days, 500, today)
+        users = load_users(engine)
+        cold_results, cold_seconds = run(engine, users, ranges, mood_stats)
+        engine.dispose()
+
+    for user_id, _ in users:
+        for start, _ in ranges:
+            key = (user_id, start)
+            assert same(rows[key], hot[key]), f"用户 {user_id} 从 {start} 开始的心情统计不一致"
+            assert same(without_notes(rows[key]), without_notes(cold_results[key])), (
+                f"用户 {user_id} 从 {start} 开始的心情统计在压缩后不一致"
+            )
+
+    queries = len(users) * len(ranges)
+    print(f"{len(users)} 个用户、{counts['tasks']} 个任务、{counts['completions']} 条完成记录、"
+          f"{len(ranges)} 段区间（结果一致）")
+    print(f"{'rows':<14}{rows_seconds * 1000 / queries:>10.2f} ms/次")
+    print(f"{'numpy':<14}{hot_seconds * 1000 / queries:>10.2f} ms/次{rows_seconds / hot_seconds:>8.1f}x")
+    print(f"{'numpy（压缩后）':<10}{cold_seconds * 1000 / queries:>10.2f} ms/次{rows_seconds / cold_seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
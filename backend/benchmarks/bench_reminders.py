@@ -0,0 +1,128 @@
+"""
+紧迫提醒基准
+
+生成大量用户和任务后执行一轮完整的提醒处理（选出到期提醒、写入发件箱、发送），
+检查能否在 --window 秒（默认即 REMINDER_CHECK_INTERVAL_SECONDS）内完成：
+- 选出 + 写入：queue_reminders，到期任务按 critical_urgency_on 索引查询
+- 发送：dispatch_pending，发送器为 FileSender（写到临时文件）
+- 再运行一轮：没有新的到期提醒时的开销，即调度器大多数时候的成本
+datagen 会为每个任务生成多年的完成记录，百万用户时太慢；这里直接写入用户和带转换日期的任务，
+转换日期在前后 --spread 天内均匀分布，另有一部分任务从不进入 critical。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_reminders --users 1000000 --tasks 5
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select
+
+from app.config import Settings
+from app.database import Base, create_db_engine
+from app import models  # noqa: F401
+from app.models import User, Task, Notification
+from app.services.reminders import FileSender, dispatch_pending, queue_reminders
+from benchmarks.datagen import TIMEZONES, TASK_NAMES
+
+QUIET_HOURS = ["", "22:00-08:00", "23:00-07:00", "12:00-14:00"]
+
+
+def populate(engine, users: int, tasks_per_user: int, spread: int, seed: int, today: date, batch_size: int = 50000):
+    """批量写入用户和任务（只填提醒用到的列）"""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    created_at = datetime.combine(today, datetime.min.time())
+    user_rows, task_rows = [], []
+    task_id = 1
+    with engine.begin() as conn:
+        for user_id in range(1, users + 1):
+            settings = {"timezone": rng.choice(TIMEZONES)}
+            if rng.random() < 0.3:
+                settings["quiet_hours"] = rng.choice(QUIET_HOURS)
+            if rng.random() < 0.05:
+                settings["reminders"] = False
+            user_rows.append({
+                "id": user_id,
+                "username": f"user{user_id}",
+                "email": f"user{user_id}@example.com",
+                "password_hash": "-",
+                "settings": settings,
+                "sync_epoch": "",
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+            for n in range(tasks_per_user):
+                critical = None
+                if rng.random() < 0.8:
+                    critical = today + timedelta(days=rng.randint(-spread, spread))
+                task_rows.append({
+                    "id": task_id,
+                    "user_id": user_id,
+                    "name": TASK_NAMES[n % len(TASK_NAMES)],
+                    "is_active": rng.random() > 0.1,
+                    "critical_urgency_on": critical,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+                task_id += 1
+            if len(task_rows) >= batch_size:
+                conn.execute(insert(User), user_rows)
+                conn.execute(insert(Task), task_rows)
+                user_rows.clear()
+                task_rows.clear()
+        if user_rows:
+            conn.execute(insert(User), user_rows)
+        if task_rows:
+            conn.execute(insert(Task), task_rows)
+    return task_id - 1
+
+
+def main():
+    defaults = Settings()
+    parser = argparse.ArgumentParser(description="紧迫提醒基准")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=5, help="每个用户的任务数")
+    parser.add_argument("--spread", type=int, default=15, help="转换日期分布在今天前后多少天")
+    parser.add_argument("--batch-size", type=int, default=defaults.REMINDER_BATCH_SIZE)
+    parser.add_argument("--window", type=float, default=defaults.REMINDER_CHECK_INTERVAL_SECONDS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        tasks = populate(engine, args.users, args.tasks, args.spread, args.seed, now.date())
+        print(f"生成 {args.users} 个用户、{tasks} 个任务：{time.perf_counter() - started:.1f}s")
+
+        sender = FileSender(os.path.join(tmp, "outbox.jsonl"))
+        timings = {}
+        started = time.perf_counter()
+        queued = queue_reminders(engine, defaults.REMINDER_LEAD_DAYS, defaults.REMINDER_QUIET_HOURS, args.batch_size, now)
+        timings["选出并写入发件箱"] = time.perf_counter() - started
+        started = time.perf_counter()
+        sent = dispatch_pending(engine, sender, args.batch_size, defaults.REMINDER_MAX_ATTEMPTS)
+        timings["发送"] = time.perf_counter() - started
+        started = time.perf_counter()
+        again = queue_reminders(engine, defaults.REMINDER_LEAD_DAYS, defaults.REMINDER_QUIET_HOURS, args.batch_size, now)
+        again += dispatch_pending(engine, sender, args.batch_size, defaults.REMINDER_MAX_ATTEMPTS)
+        timings["再运行一轮"] = time.perf_counter() - started
+        with engine.connect() as conn:
+            outbox = conn.execute(select(func.count(Notification.id))).scalar()
+        engine.dispose()
+
+    print(f"写入 {queued} 条提醒，发送 {sent} 条，发件箱共 {outbox} 行，第二轮处理 {again} 条")
+    for name, seconds in timings.items():
+        print(f"{name:<12}{seconds:>10.2f}s")
+    total = timings["选出并写入发件箱"] + timings["发送"]
+    verdict = "在" if total <= args.window else "超出"
+    print(f"一轮合计 {total:.2f}s，{verdict} {args.window:.0f}s 的检查间隔内")
+
+
+if __name__ == "__main__":
+    main()
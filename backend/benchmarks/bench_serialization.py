@@ -0,0 +1,116 @@
+"""
+响应序列化基准
+
+在同一份合成数据上分别用三种方式编码任务列表、365 天热力图和今日视图，比较每次编码的耗时：
+- default：FastAPI 使用自定义响应类（或较早版本）时的路径——构造模型、按 response_model 校验、
+  转成可 JSON 化的 Python 对象，再由标准库 json 编码
+- dump_json：FastAPI 新版本默认的快速路径——构造模型、校验后在 pydantic-core 中编码
+- fast：本项目的响应层——任务列表和热力图直接把行交给 orjson，今日视图用预先创建的 TypeAdapter 编码，
+  不再重复校验
+三种方式的输出内容相同（会先校验）。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_serialization --tasks 200 --repeat 200
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import timeit
+from datetime import date
+from typing import Callable, Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app.database import create_db_engine, create_session_factory
+from app.models import User, Task
+from app.routers.stats import _heatmap_data
+from app.routers.tasks import task_to_response
+from app.routers.today import TODAY_VIEW, _today_view
+from app.schemas import TaskResponse, HeatmapData, TodayResponse
+from app.services.completions import last_done_dates
+from app.utils.responses import dump_model, dump_rows
+from benchmarks.datagen import generate
+
+TASK_LIST = TypeAdapter(List[TaskResponse])
+HEATMAP = TypeAdapter(HeatmapData)
+
+
+def default_path(adapter: TypeAdapter, content) -> bytes:
+    value = adapter.validate_python(content)
+    return json.dumps(
+        adapter.dump_python(value, mode="json"), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def dump_json_path(adapter: TypeAdapter, content) -> bytes:
+    return adapter.dump_json(adapter.validate_python(content))
+
+
+def measure(cases: Dict[str, Callable[[], bytes]], repeat: int) -> Dict[str, float]:
+    """每种方式的平均耗时（毫秒），并检查输出一致"""
+    outputs = {name: json.loads(case()) for name, case in cases.items()}
+    first = next(iter(outputs.values()))
+    assert all(output == first for output in outputs.values()), "各方式的输出不一致"
+    return {name: timeit.timeit(case, number=repeat) / repeat * 1000 for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="响应序列化基准")
+    parser.add_argument("--tasks", type=int, default=200, help="任务列表中的任务数")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        generate(engine, 1, args.tasks, years=args.years, seed=args.seed)
+        with create_session_factory(engine)() as db:
+            user = db.execute(select(User)).scalars().first()
+            today = date.today()
+            tasks = db.query(Task).options(joinedload(Task.category)).filter(Task.user_id == user.id).all()
+            last_done = last_done_dates(db, user.id)
+            rows = [task_to_response(task, last_done.get(task.id)) for task in tasks]
+            heatmap = _heatmap_data(db, user.id, 365, today)
+            today_view = _today_view(db, user, today)
+        engine.dispose()
+
+    # 改动前的路由先逐个构造 TaskResponse / TodayResponse，再交给 FastAPI 校验编码
+    def build_tasks():
+        return [TaskResponse(**row) for row in rows]
+
+    def build_today():
+        return TodayResponse(**today_view.model_dump()) if isinstance(today_view, TodayResponse) else today_view
+
+    results = {
+        f"GET /api/tasks（{len(rows)} 个任务）": measure({
+            "default": lambda: default_path(TASK_LIST, build_tasks()),
+            "dump_json": lambda: dump_json_path(TASK_LIST, build_tasks()),
+            "fast": lambda: dump_rows(rows),
+        }, args.repeat),
+        "GET /api/stats/heatmap（365 天）": measure({
+            "default": lambda: default_path(HEATMAP, heatmap),
+            "dump_json": lambda: dump_json_path(HEATMAP, heatmap),
+            "fast": lambda: dump_rows(heatmap),
+        }, args.repeat),
+        "GET /api/today": measure({
+            "default": lambda: default_path(TODAY_VIEW, build_today()),
+            "dump_json": lambda: dump_json_path(TODAY_VIEW, build_today()),
+            "fast": lambda: dump_model(TODAY_VIEW, build_today()),
+        }, args.repeat),
+    }
+
+    print(f"{'接口':<36}{'default ms':>12}{'dump_json ms':>14}{'fast ms':>10}{'加速':>8}")
+    for name, timings in results.items():
+        print(
+            f"{name:<36}{timings['default']:>12.3f}{timings['dump_json']:>14.3f}"
+            f"{timings['fast']:>10.3f}{timings['default'] / timings['fast']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+完成计划模拟基准
+
+随机生成任务和未来若干天的假设完成记录，比较两种实现每次模拟的耗时：
+- scalar：逐天为每个任务调用 LentoFlowAlgorithm.calculate_urgency / calculate_health，
+  再用 select_tasks 挑选推荐任务
+- vectorized：services/simulation.py 的矩阵实现（/api/today/simulate 使用）
+两种实现的逐天紧迫度、健康度、整体健康度和推荐任务会先比对一致。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_simulation --tasks 300 --days 90
+"""
+
+import argparse
+import random
+import timeit
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from app.services.algorithm import LentoFlowAlgorithm, TaskState
+from app.services.simulation import simulate
+from benchmarks.datagen import INTERVALS
+
+
+def scalar_simulate(tasks, last_done, planned, budget, max_tasks, today, days) -> list:
+    """逐天逐任务调用原算法，返回每天的 (紧迫度, 健康度, 推荐任务 id, 整体健康度)"""
+    done = set(planned)
+    last_done = dict(last_done)
+    result = []
+    for offset in range(days):
+        day = today + timedelta(days=offset)
+        states = []
+        for task in tasks:
+            state = TaskState(
+                id=task.id,
+                name=task.name,
+                energy_cost=task.energy_cost,
+                expected_interval=task.expected_interval,
+                importance=task.importance,
+                last_done_date=last_done.get(task.id)
+            )
+            if (task.id, offset) in done:
+                state.urgency, state.health, state.is_completed_today = 0.0, 100, True
+            else:
+                state.urgency = LentoFlowAlgorithm.calculate_urgency(
+                    state.last_done_date, task.expected_interval, task.importance, day
+                )
+                state.health = LentoFlowAlgorithm.calculate_health(state.last_done_date, task.expected_interval, day)
+            states.append(state)
+        recommended, _ = LentoFlowAlgorithm.select_tasks(states, budget, max_tasks)
+        result.append((
+            [state.urgency for state in states],
+            [state.health for state in states],
+            [state.id for state in recommended],
+            LentoFlowAlgorithm.calculate_overall_health(states)["score"],
+        ))
+        for task in tasks:
+            if (task.id, offset) in done:
+                last_done[task.id] = day
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="完成计划模拟基准")
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--completions", type=int, default=3000, help="假设的完成记录数")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    today = date.today()
+    tasks = [
+        SimpleNamespace(
+            id=task_id, name=f"任务{task_id}", energy_cost=rng.randint(1, 5),
+            expected_interval=rng.choice(INTERVALS), importance=rng.randint(1, 5),
+            use_learned_interval=False, learned_interval=None, learned_samples=0
+        )
+        for task_id in range(1, args.tasks + 1)
+    ]
+    last_done = {task.id: today - timedelta(days=rng.randint(1, 30)) for task in tasks if rng.random() < 0.9}
+    planned = sorted({(rng.choice(tasks).id, rng.randrange(args.days)) for _ in range(args.completions)})
+
+    vectorized = simulate(tasks, last_done, set(), planned, 15, 5, today, args.days)
+    scalar = scalar_simulate(tasks, last_done, planned, 15, 5, today, args.days)
+    for offset, (urgency, health, recommended, overall) in enumerate(scalar):
+        assert [task["urgency"][offset] for task in vectorized["tasks"]] == urgency, f"第 {offset} 天紧迫度不一致"
+        assert [task["health"][offset] for task in vectorized["tasks"]] == health, f"第 {offset} 天健康度不一致"
+        assert vectorized["days"][offset]["recommended"] == recommended, f"第 {offset} 天推荐任务不一致"
+        assert vectorized["days"][offset]["overall_health"] == overall, f"第 {offset} 天整体健康度不一致"
+
+    scalar_ms = timeit.timeit(
+        lambda: scalar_simulate(tasks, last_done, planned, 15, 5, today, args.days), number=max(1, args.repeat // 10)
+    ) / max(1, args.repeat // 10) * 1000
+    vectorized_ms = timeit.timeit(
+        lambda: simulate(tasks, last_done, set(), planned, 15, 5, today, args.days), number=args.repeat
+    ) / args.repeat * 1000
+    print(f"{args.tasks} 个任务、{args.days} 天、{len(planned)} 条假设完成记录（结果一致）")
+    print(f"{'scalar':<12}{scalar_ms:>10.2f} ms")
+    print(f"{'vectorized':<12}{vectorized_ms:>10.2f} ms{scalar_ms / vectorized_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
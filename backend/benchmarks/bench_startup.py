@@ -0,0 +1,105 @@
+"""
+启动耗时基准
+
+每轮在全新的子进程中分别测量：导入 app.main、create_app、lifespan 启动、
+首个请求（不访问数据库）和首个访问数据库的请求，多轮取中位数。
+加 --importtime 时额外用 python -X importtime 列出累计耗时最高的模块。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_startup --runs 10 --importtime
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子进程中执行的测量代码
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main
+t1 = time.perf_counter()
+from app.main import create_app
+from app.utils.auth import create_access_token
+from fastapi.testclient import TestClient
+t2 = time.perf_counter()
+application = create_app()
+t3 = time.perf_counter()
+with TestClient(application) as client:
+    t4 = time.perf_counter()
+    client.get("/")
+    t5 = time.perf_counter()
+    token = create_access_token({"sub": "bench-startup"})
+    client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    t6 = time.perf_counter()
+print(json.dumps({
+    "import": t1 - t0,
+    "create_app": t3 - t2,
+    "startup": t4 - t3,
+    "first_request": t5 - t4,
+    "first_db_request": t6 - t5,
+}))
+"""
+
+PHASES = ["import", "create_app", "startup", "first_request", "first_db_request"]
+
+
+def run_once(database_url: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(top: int) -> list:
+    """python -X importtime 输出中累计耗时最高的模块"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LentoFlow 启动耗时基准")
+    parser.add_argument("--runs", type=int, default=5, help="测量轮数")
+    parser.add_argument("--importtime", action="store_true", help="输出导入耗时最高的模块")
+    parser.add_argument("--top", type=int, default=15, help="--importtime 输出的模块数")
+    args = parser.parse_args()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.runs):
+            # 每轮使用新的数据库文件，首轮包含建表
+            samples.append(run_once(f"sqlite:///{tmp}/startup-{i}.db"))
+
+    print(f"{'阶段':<18}{'中位数(ms)':>12}{'最大(ms)':>12}")
+    for phase in PHASES:
+        values = [s[phase] * 1000 for s in samples]
+        print(f"{phase:<18}{statistics.median(values):>12.1f}{max(values):>12.1f}")
+    total = [sum(s[p] for p in PHASES) * 1000 for s in samples]
+    print(f"{'total':<18}{statistics.median(total):>12.1f}{max(total):>12.1f}")
+
+    if args.importtime:
+        print(f"\n导入耗时最高的 {args.top} 个模块（累计 / 自身，ms）")
+        for cumulative, self_time, name in import_profile(args.top):
+            print(f"{cumulative / 1000:>9.1f} {self_time / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+合并写入基准
+
+在同一份合成数据的两个副本上分别以关闭/开启 WRITE_QUEUE_ENABLED 的方式，
+用相同的并发数先完成再撤销一批任务，比较每秒写入数和延迟。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.bench_write_queue --users 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import httpx
+from sqlalchemy import select
+
+from app.config import Settings
+from app.database import create_db_engine
+from app.main import create_app
+from app.models import User, Task
+from app.utils.auth import create_access_token
+from benchmarks.datagen import generate
+from benchmarks.loadtest import percentile
+
+
+def load_targets(database_url: str) -> List[Tuple[str, int]]:
+    """(用户名, 活跃任务 id)"""
+    engine = create_db_engine(database_url)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(User.username, Task.id).join(Task, Task.user_id == User.id).where(Task.is_active == True)
+        ).all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+
+async def drive(client, method: str, targets, tokens, concurrency: int) -> Tuple[float, List[float], int]:
+    """以固定并发把 targets 中的请求各发一次，返回 (耗时, 延迟列表, 失败数)"""
+    pending = list(targets)
+    latencies: List[float] = []
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        while pending:
+            username, task_id = pending.pop()
+            started = time.perf_counter()
+            response = await client.request(
+                method, f"/api/today/complete/{task_id}",
+                headers={"Authorization": f"Bearer {tokens[username]}"}
+            )
+            latencies.append(time.perf_counter() - started)
+            failures += response.status_code not in (200, 201)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return time.perf_counter() - started, sorted(latencies), failures
+
+
+async def run(database_url: str, enabled: bool, args) -> dict:
+    settings = Settings(
+        DATABASE_URL=database_url,
+        SNAPSHOT_ENABLED=False,
+        WRITE_QUEUE_ENABLED=enabled,
+        WRITE_QUEUE_MAX_BATCH=args.max_batch,
+        WRITE_QUEUE_MAX_DELAY_MS=args.max_delay_ms
+    )
+    targets = load_targets(database_url)
+    random.Random(args.seed).shuffle(targets)
+    targets = targets[:args.writes]
+    tokens = {
+        username: create_access_token({"sub": username}, app_settings=settings)
+        for username in {username for username, _ in targets}
+    }
+
+    app = create_app(settings)
+    result = {"mode": "queue" if enabled else "direct"}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for name, method in (("complete", "POST"), ("uncomplete", "DELETE")):
+                elapsed, latencies, failures = await drive(client, method, targets, tokens, args.concurrency)
+                result[name] = {
+                    "writes_per_second": len(latencies) / elapsed,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p95_ms": percentile(latencies, 95) * 1000,
+                    "failures": failures,
+                }
+        if app.state.write_queues:
+            queue = app.state.write_queues[0]
+            result["average_batch"] = queue.operations / max(queue.batches, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并写入（group commit）基准")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=1000, help="每种模式完成/撤销的次数")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seed_path = os.path.join(tmp, "seed.db")
+        engine = create_db_engine(f"sqlite:///{seed_path}")
+        # 完成记录只生成到前天，避免和本次写入的“今天”冲突（用户时区可能比本机早一天）
+        generate(engine, args.users, args.tasks, years=0.25, seed=args.seed, today=date.today() - timedelta(days=2))
+        engine.dispose()
+
+        results = []
+        for enabled in (False, True):
+            path = os.path.join(tmp, f"{'queue' if enabled else 'direct'}.db")
+            shutil.copy(seed_path, path)
+            results.append(asyncio.run(run(f"sqlite:///{path}", enabled, args)))
+
+    print(f"{'模式':<8}{'操作':<12}{'写入/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'失败':>6}")
+    for result in results:
+        for name in ("complete", "uncomplete"):
+            row = result[name]
+            print(
+                f"{result['mode']:<8}{name:<12}{row['writes_per_second']:>10.1f}"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['failures']:>6}"
+            )
+    if "average_batch" in results[-1]:
+        print(f"队列模式平均每批 {results[-1]['average_batch']:.1f} 个操作")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+合成数据生成器
+
+批量生成 N 个用户、每人 M 个任务、Y 年的完成记录，全部通过 Core 的批量
+INSERT 写入。完成间隔围绕任务的 expected_interval 做对数正态抖动，并随机
+插入中断期，接近真实的打卡节奏。
+
+用法（在 backend 目录下执行）：
+    python -m benchmarks.datagen --database-url sqlite:///./bench.db --users 1000 --tasks 10 --years 2
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+
+from app.database import Base, create_db_engine
+from app import models  # noqa: F401
+from app.models import User, Category, Task, Completion
+from app.services.algorithm import LentoFlowAlgorithm
+from app.services.daybits import encode_days
+from app.utils.auth import get_password_hash
+from app.utils.timezone import get_zone
+
+# 所有合成用户共用的密码
+PASSWORD = "loadtest"
+
+TIMEZONES = ["Asia/Shanghai", "Asia/Shanghai", "Asia/Shanghai", "Europe/Berlin", "America/New_York"]
+CATEGORIES = [("健康", "#22c55e"), ("学习", "#3b82f6"), ("生活", "#f59e0b")]
+TASK_NAMES = ["跑步", "读书", "冥想", "背单词", "拉伸", "写日记", "练琴", "整理房间", "喝水", "早睡", "俯卧撑", "复盘"]
+# 期望间隔的分布：多数是每天或隔天的习惯
+INTERVALS = [1, 1, 1, 2, 2, 3, 4, 7, 7, 14]
+MOODS = [1, 2, 3, 3, 4, 4, 4, 5, 5]
+
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def completion_days(rng: random.Random, start: date, end: date, interval: int):
+    """生成一个任务在 [start, end] 内的完成日期"""
+    day = start + timedelta(days=rng.randrange(max(interval, 1)))
+    while day <= end:
+        yield day
+        gap = max(1, round(interval * rng.lognormvariate(0, 0.35)))
+        # 偶尔中断一段时间
+        if rng.random() < 0.04:
+            gap += rng.randint(interval * 2, interval * 6 + 7)
+        day += timedelta(days=gap)
+
+
+def generate(
+    engine: Engine,
+    users: int = 100,
+    tasks_per_user: int = 10,
+    years: float = 1.0,
+    seed: int = 42,
+    today: Optional[date] = None,
+    batch_size: int = 5000,
+    verbose: bool = False
+) -> dict:
+    """生成合成数据，返回各表写入的行数"""
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    today = today or date.today()
+    start = today - timedelta(days=int(years * 365))
+    created_at = datetime.combine(start, dtime(8, 0))
+    password_hash = get_password_hash(PASSWORD)
+    counts = {"users": 0, "categories": 0, "tasks": 0, "completions": 0}
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        user_id = _next_id(conn, User)
+        category_id = _next_id(conn, Category)
+        task_id = _next_id(conn, Task)
+        completion_id = _next_id(conn, Completion)
+
+        user_rows, category_rows, task_rows, completion_rows = [], [], [], []
+
+        def flush(rows, model, force=False):
+            if rows and (force or len(rows) >= batch_size):
+                conn.execute(insert(model), rows)
+                rows.clear()
+
+        for _ in range(users):
+            tz_name = rng.choice(TIMEZONES)
+            tz = get_zone(tz_name)
+            user_rows.append({
+                "id": user_id,
+                "username": f"user{user_id}",
+                "email": f"user{user_id}@example.com",
+                "password_hash": password_hash,
+                "daily_energy_budget": rng.choice([10, 15, 15, 20]),
+                "max_daily_tasks": rng.choice([3, 5, 5, 7]),
+                "settings": {"timezone": tz_name},
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+
+            user_categories = []
+            for order, (name, color) in enumerate(CATEGORIES):
+                category_rows.append({
+                    "id": category_id, "user_id": user_id, "name": name, "color": color,
+                    "order": order, "is_active": True, "created_at": created_at, "updated_at": created_at,
+                })
+                user_categories.append(category_id)
+                category_id += 1
+
+            for n in range(tasks_per_user):
+                interval = rng.choice(INTERVALS)
+                task_row = {
+                    "id": task_id,
+                    "user_id": user_id,
+                    "name": f"{TASK_NAMES[n % len(TASK_NAMES)]}{n // len(TASK_NAMES) or ''}",
+                    "description": "合成数据" if rng.random() < 0.3 else None,
+                    "energy_cost": rng.randint(1, 5),
+                    "expected_interval": interval,
+                    "importance": rng.randint(1, 5),
+                    "category_id": rng.choice(user_categories + [None]),
+                    "color": "#6366f1",
+                    "icon": "star",
+                    "is_active": rng.random() > 0.1,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+                task_rows.append(task_row)
+
+                last_day = None
+                learned, samples = None, 0
+                done_days = []
+                for day in completion_days(rng, start, today, interval):
+                    done_days.append(day)
+                    if last_day is not None:
+                        learned, samples = LentoFlowAlgorithm.update_learned_interval(
+                            learned, samples, (day - last_day).days
+                        )
+                    last_day = day
+                    local = datetime.combine(day, dtime(rng.randint(6, 22), rng.randrange(60)), tzinfo=tz)
+                    completion_rows.append({
+                        "id": completion_id,
+                        "task_id": task_id,
+                        "completed_at": local.astimezone(timezone.utc).replace(tzinfo=None),
+                        "completed_on": day,
+                        "note": "合成记录" if rng.random() < 0.05 else None,
+                        "mood": rng.choice(MOODS) if rng.random() < 0.6 else None,
+                    })
+                    completion_id += 1
+                    counts["completions"] += 1
+                bits, bits_start = encode_days(done_days)
+                task_row.update(
+                    learned_interval=learned, learned_samples=samples, learned_last_on=last_day,
+                    completion_days=bits, completion_days_start=bits_start,
+                    **LentoFlowAlgorithm.transition_dates(last_day, interval, task_row["importance"], today)
+                )
+                task_id += 1
+                counts["tasks"] += 1
+
+            user_id += 1
+            counts["users"] += 1
+            counts["categories"] += len(CATEGORIES)
+
+            # 按依赖顺序写入，保证外键先于引用方
+            if len(completion_rows) >= batch_size:
+                flush(user_rows, User, force=True)
+                flush(category_rows, Category, force=True)
+                flush(task_rows, Task, force=True)
+                flush(completion_rows, Completion, force=True)
+            if verbose and counts["users"] % max(1, users // 10) == 0:
+                print(f"  {counts['users']}/{users} 用户，{counts['completions']} 条完成记录")
+
+        flush(user_rows, User, force=True)
+        flush(category_rows, Category, force=True)
+        flush(task_rows, Task, force=True)
+        flush(completion_rows, Completion, force=True)
+
+    counts["seconds"] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成 LentoFlow 合成数据")
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=10, help="每个用户的任务数")
+    parser.add_argument("--years", type=float, default=1.0, help="完成记录覆盖的年数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_db_engine(args.database_url)
+    counts = generate(
+        engine, args.users, args.tasks, args.years, args.seed,
+        batch_size=args.batch_size, verbose=True
+    )
+    rate = counts["completions"] / counts["seconds"] if counts["seconds"] else math.inf
+    print(
+        f"写入 {counts['users']} 用户、{counts['categories']} 类别、{counts['tasks']} 任务、"
+        f"{counts['completions']} 完成记录，用时 {counts['seconds']}s（{rate:,.0f} 条完成记录/s）"
+    )
+
+
+if __name__ == "__main__":
+    main()
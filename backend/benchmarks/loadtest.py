@@ -0,0 +1,230 @@
+"""
+端到端压测
+
+在进程内启动应用（httpx.ASGITransport，不经过网络），按真实流量比例
+回放今日视图轮询、打卡/撤销和各类统计请求，输出每个接口的
+p50/p95/p99 延迟与吞吐量。
+
+用法（在 backend 目录下执行）：
+    # 生成临时数据库并压测 30 秒
+    python -m benchmarks.loadtest --users 200 --tasks 10 --years 1 --duration 30 --concurrency 16
+    # 复用已有数据库（例如 benchmarks.datagen 生成的）
+    python -m benchmarks.loadtest --database-url sqlite:///./bench.db --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+from sqlalchemy import select
+
+from app.config import Settings
+from app.database import create_db_engine
+from app.main import create_app
+from app.models import User, Task
+from app.utils.auth import create_access_token
+from benchmarks.datagen import generate
+
+# (名称, 权重, 方法, 路径模板)；路径中的 {task_id} 会替换为该用户的随机任务
+TRAFFIC_MIX = [
+    ("today", 40, "GET", "/api/today"),
+    ("complete", 12, "POST", "/api/today/complete/{task_id}"),
+    ("uncomplete", 4, "DELETE", "/api/today/complete/{task_id}"),
+    ("tasks", 8, "GET", "/api/tasks"),
+    ("categories", 4, "GET", "/api/categories"),
+    ("stats_daily", 8, "GET", "/api/stats/daily?days=30"),
+    ("stats_heatmap", 8, "GET", "/api/stats/heatmap?days=365"),
+    ("stats_weekly", 5, "GET", "/api/stats/weekly"),
+    ("stats_monthly", 5, "GET", "/api/stats/monthly"),
+    ("stats_category", 3, "GET", "/api/stats/category"),
+    ("stats_task", 3, "GET", "/api/stats/task/{task_id}"),
+]
+
+# 打卡重复、撤销不存在的记录属于正常业务结果，不计为错误
+EXPECTED_STATUS = {
+    "complete": {201, 400},
+    "uncomplete": {200, 404},
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法求百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+class Recorder:
+    """按接口收集延迟与错误"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, elapsed: float, ok: bool) -> None:
+        self.latencies[name].append(elapsed)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, wall_time: float) -> List[dict]:
+        rows = []
+        for name, _, _, _ in TRAFFIC_MIX:
+            values = sorted(self.latencies.get(name, []))
+            if not values:
+                continue
+            rows.append({
+                "endpoint": name,
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": len(values) / wall_time,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000,
+            })
+        return rows
+
+
+def load_users(database_url: str, limit: int) -> Dict[str, List[int]]:
+    """读取压测用户及其活跃任务 id"""
+    engine = create_db_engine(database_url)
+    with engine.connect() as conn:
+        users = conn.execute(select(User.id, User.username).order_by(User.id).limit(limit)).all()
+        tasks = defaultdict(list)
+        for task_id, user_id in conn.execute(
+            select(Task.id, Task.user_id).where(Task.is_active == True, Task.user_id.in_([u.id for u in users]))
+        ):
+            tasks[user_id].append(task_id)
+    engine.dispose()
+    return {username: tasks[user_id] for user_id, username in users if tasks[user_id]}
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    tokens: Dict[str, str],
+    user_tasks: Dict[str, List[int]],
+    recorder: Recorder,
+    deadline: float,
+    rng: random.Random,
+    think_time: float
+) -> None:
+    usernames = list(user_tasks)
+    names = [m[0] for m in TRAFFIC_MIX]
+    weights = [m[1] for m in TRAFFIC_MIX]
+    routes = {m[0]: (m[2], m[3]) for m in TRAFFIC_MIX}
+
+    while time.perf_counter() < deadline:
+        username = rng.choice(usernames)
+        name = rng.choices(names, weights)[0]
+        method, path = routes[name]
+        path = path.format(task_id=rng.choice(user_tasks[username]))
+
+        started = time.perf_counter()
+        response = await client.request(method, path, headers={"Authorization": f"Bearer {tokens[username]}"})
+        elapsed = time.perf_counter() - started
+        recorder.record(name, elapsed, response.status_code in EXPECTED_STATUS.get(name, {200}))
+        if think_time:
+            await asyncio.sleep(rng.expovariate(1 / think_time))
+
+
+async def run(
+    database_url: str,
+    duration: float,
+    concurrency: int,
+    max_users: int,
+    seed: int,
+    think_time: float,
+    warmup: float
+) -> List[dict]:
+    settings = Settings(DATABASE_URL=database_url)
+    app = create_app(settings)
+    user_tasks = load_users(database_url, max_users)
+    if not user_tasks:
+        raise SystemExit("数据库中没有带活跃任务的用户，请先用 benchmarks.datagen 生成数据")
+    tokens = {
+        username: create_access_token({"sub": username}, app_settings=settings)
+        for username in user_tasks
+    }
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            if warmup:
+                await asyncio.gather(*[
+                    virtual_user(client, tokens, user_tasks, Recorder(), time.perf_counter() + warmup,
+                                 random.Random(seed - i - 1), think_time)
+                    for i in range(concurrency)
+                ])
+
+            recorder = Recorder()
+            started = time.perf_counter()
+            deadline = started + duration
+            await asyncio.gather(*[
+                virtual_user(client, tokens, user_tasks, recorder, deadline, random.Random(seed + i), think_time)
+                for i in range(concurrency)
+            ])
+            wall_time = time.perf_counter() - started
+
+    return recorder.report(wall_time)
+
+
+def print_report(rows: List[dict]) -> None:
+    header = f"{'接口':<16}{'请求数':>8}{'错误':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['endpoint']:<16}{row['requests']:>8}{row['errors']:>6}{row['rps']:>9.1f}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>9.1f}"
+        )
+    total = sum(row["requests"] for row in rows)
+    print("-" * len(header))
+    print(f"{'total':<16}{total:>8}{sum(r['errors'] for r in rows):>6}{sum(r['rps'] for r in rows):>9.1f}")
+    print("延迟单位为 ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LentoFlow 进程内压测")
+    parser.add_argument("--database-url", help="使用已有数据库；不指定时生成临时数据库")
+    parser.add_argument("--users", type=int, default=100, help="生成临时数据库时的用户数")
+    parser.add_argument("--tasks", type=int, default=10, help="生成临时数据库时每个用户的任务数")
+    parser.add_argument("--years", type=float, default=1.0, help="生成临时数据库时的历史年数")
+    parser.add_argument("--max-users", type=int, default=1000, help="参与压测的最大用户数")
+    parser.add_argument("--duration", type=float, default=20.0, help="压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=2.0, help="预热时长（秒），不计入结果")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发虚拟用户数")
+    parser.add_argument("--think-time", type=float, default=0.0, help="虚拟用户两次请求间的平均间隔（秒）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件，便于对比回归")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url: Optional[str] = args.database_url
+        if database_url is None:
+            database_url = f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+            engine = create_db_engine(database_url)
+            counts = generate(engine, args.users, args.tasks, args.years, args.seed)
+            engine.dispose()
+            print(f"已生成临时数据：{counts}")
+
+        rows = asyncio.run(run(
+            database_url, args.duration, args.concurrency, args.max_users,
+            args.seed, args.think_time, args.warmup
+        ))
+
+    print_report(rows)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
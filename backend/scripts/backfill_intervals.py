@@ -0,0 +1,34 @@
+"""
+学习间隔回填
+
+按完成历史重算所有任务的学习间隔（完成间隔的指数加权平均），再按新的间隔重算转换日期。
+学习间隔有变化的任务记一次同步变更，增量同步的客户端会拉取新的值。
+迁移 0008 已经回填过一次；导入历史数据或修复完成记录后执行：
+
+    python -m scripts.backfill_intervals
+"""
+
+import sys
+from datetime import date
+
+from app.config import Settings
+from app.services.intervals import backfill_learned_intervals
+from app.services.transitions import refresh_transitions
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    shards = ShardRouter(Settings())
+    try:
+        for index, engine in enumerate(shards.engines):
+            with engine.begin() as conn:
+                updated = backfill_learned_intervals(conn)
+                refresh_transitions(conn, date.today())
+            print(f"分片 {index}：{updated} 个任务的学习间隔有变化")
+        return 0
+    finally:
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
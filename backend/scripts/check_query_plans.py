@@ -0,0 +1,115 @@
+"""
+热点查询执行计划检查
+
+在内存 SQLite 上建表，对热点查询执行 EXPLAIN QUERY PLAN，
+确认它们命中预期的组合索引。任一查询退化为全表扫描时以非零状态退出。
+
+用法（在 backend 目录下执行）：
+    python -m scripts.check_query_plans
+"""
+
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app import models  # noqa: F401
+from app.models import Task, Completion, DailyLog, Notification
+from app.services.reminders import due_reminder_query
+
+
+def explain(session: Session, query) -> str:
+    """返回查询的 EXPLAIN QUERY PLAN 文本"""
+    statement = getattr(query, "statement", query).compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def hot_queries(session: Session):
+    """(名称, 查询, 期望使用的索引)"""
+    today = date.today()
+    start = today - timedelta(days=364)
+    return [
+        (
+            "今日完成记录（complete/uncomplete）",
+            session.query(Completion).filter(
+                Completion.task_id == 1,
+                Completion.completed_on == today
+            ),
+            "uq_completions_task_id_completed_on",
+        ),
+        (
+            "活跃任务",
+            session.query(Task).filter(Task.user_id == 1, Task.is_active == True),
+            "ix_tasks_user_id_is_active",
+        ),
+        (
+            "最近完成日期",
+            session.query(
+                Completion.task_id,
+                func.max(Completion.completed_on)
+            ).join(Task).filter(Task.user_id == 1).group_by(Completion.task_id),
+            "uq_completions_task_id_completed_on",
+        ),
+        (
+            "完成日位图（热力图、统计、仪表盘）",
+            session.query(Task.id, Task.completion_days, Task.completion_days_start).filter(Task.user_id == 1),
+            "ix_tasks_user_id_is_active",
+        ),
+        (
+            "每日日志",
+            session.query(DailyLog).filter(
+                DailyLog.user_id == 1,
+                DailyLog.log_date >= start,
+                DailyLog.log_date <= today
+            ),
+            "ix_daily_logs_user_id_log_date",
+        ),
+        (
+            "明天进入 critical 的任务（全体用户）",
+            session.query(Task.user_id, Task.id).filter(
+                Task.critical_urgency_on == today + timedelta(days=1),
+                Task.is_active == True
+            ),
+            "ix_tasks_critical_urgency_on",
+        ),
+        (
+            "到期的紧迫提醒（全体用户）",
+            due_reminder_query([today, today + timedelta(days=1), today + timedelta(days=2)]),
+            "ix_tasks_critical_urgency_on",
+        ),
+        (
+            "待发送的提醒",
+            session.query(Notification.id).filter(
+                Notification.sent_at.is_(None),
+                Notification.attempts < 5
+            ).order_by(Notification.id).limit(1000),
+            "ix_notification_outbox_sent_at_id",
+        ),
+    ]
+
+
+def main() -> int:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+
+    failures = 0
+    with Session(engine) as session:
+        for name, query, index_name in hot_queries(session):
+            plan = explain(session, query)
+            ok = index_name in plan
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: 期望 {index_name}")
+            for line in plan.splitlines():
+                print(f"    {line}")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+历史完成记录压缩（单次运行）
+
+把所有分片上 COMPLETION_HOT_DAYS 天（向前取整到月初）之前的完成记录压缩为按 (任务, 月) 的汇总行，
+删除原始行（每个任务保留最近的一条），统计结果不变。多 worker 部署时不要开启 COMPACTION_ENABLED，
+改为用 cron 每天执行一次：
+
+    30 3 * * * cd backend && python -m scripts.compact_completions
+    # 临时指定保留天数
+    python -m scripts.compact_completions --hot-days 180
+
+使用 sqlite 缓存后端时会同时使被压缩用户的缓存失效；使用进程内缓存时缓存的用户信息最多在
+CACHE_TTL_SECONDS 秒内不知道有冷数据，期间的区间统计可能缺少被压缩的记录，建议改为在应用内开启定时压缩。
+"""
+
+import argparse
+import sys
+
+from app.config import Settings
+from app.services.archive import compact_completions
+from app.services.cache import create_cache, invalidate_user
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    settings = Settings()
+    parser = argparse.ArgumentParser(description="压缩历史完成记录")
+    parser.add_argument("--hot-days", type=int, default=settings.COMPLETION_HOT_DAYS, help="保留原始记录的天数")
+    parser.add_argument("--batch-size", type=int, default=settings.COMPACTION_BATCH_SIZE, help="每个事务处理的用户数")
+    args = parser.parse_args()
+
+    shards = ShardRouter(settings)
+    cache = create_cache(settings) if settings.CACHE_BACKEND == "sqlite" else None
+    try:
+        for index, engine in enumerate(shards.engines):
+            compacted = compact_completions(engine, args.hot_days, args.batch_size, app_settings=settings)
+            if cache is not None:
+                for user_id in compacted:
+                    invalidate_user(cache, user_id)
+            print(f"分片 {index}：压缩了 {len(compacted)} 个用户的历史完成记录", file=sys.stderr)
+        return 0
+    finally:
+        if cache is not None:
+            cache.close()
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
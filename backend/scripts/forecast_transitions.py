@@ -0,0 +1,54 @@
+"""
+状态转换预测
+
+    # 列出明天紧迫度进入 critical 的任务（所有分片）
+    python -m scripts.forecast_transitions --state critical
+    # 指定日期和状态（high / critical / low_health）
+    python -m scripts.forecast_transitions --state low_health --date 2026-10-20
+    # 按完成记录重算所有任务的转换日期（数据修复后执行）
+    python -m scripts.forecast_transitions --refresh
+
+转换日期保存在任务表的索引列上，查询只按日期做等值查找，不对任务逐个打分。
+"""
+
+import argparse
+import sys
+from datetime import date, timedelta
+
+from app.config import Settings
+from app.services.transitions import TRANSITION_COLUMNS, refresh_transitions, tasks_reaching
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="任务状态转换预测")
+    parser.add_argument("--state", choices=sorted(TRANSITION_COLUMNS), default="critical")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today() + timedelta(days=1))
+    parser.add_argument("--refresh", action="store_true", help="重算所有任务的转换日期")
+    args = parser.parse_args()
+
+    shards = ShardRouter(Settings())
+    try:
+        if args.refresh:
+            for index, engine in enumerate(shards.engines):
+                with engine.begin() as conn:
+                    print(f"分片 {index}：重算 {refresh_transitions(conn, date.today())} 个任务")
+            return 0
+
+        total = 0
+        for index in range(len(shards.engines)):
+            with shards.session(index) as db:
+                rows = tasks_reaching(db, args.state, args.date)
+            users = {user_id for user_id, _ in rows}
+            print(f"分片 {index}：{len(users)} 个用户的 {len(rows)} 个任务在 {args.date} 进入 {args.state}")
+            for user_id, task_id in rows:
+                print(f"  用户 {user_id} 任务 {task_id}")
+            total += len(rows)
+        print(f"合计 {total} 个任务")
+        return 0
+    finally:
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
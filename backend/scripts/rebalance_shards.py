@@ -0,0 +1,216 @@
+"""
+分片维护工具
+
+    # 扫描所有分片，把已有用户登记到目录库（从单库迁移到分片时先执行）
+    python -m scripts.rebalance_shards --sync-directory
+    # 把指定用户迁移到某个分片
+    python -m scripts.rebalance_shards --move alice --to 1
+    # 按用户数自动均衡
+    python -m scripts.rebalance_shards --auto [--dry-run]
+
+迁移时按外键依赖顺序复制该用户拥有的行（users 按 id，带 user_id 列的表按 user_id，
+带 task_id 列的表按该用户的任务），目标分片上重新分配自增 id 并改写外键，
+写入目标分片并更新目录后再删除源分片上的数据。用户 id 不变，令牌继续有效；
+任务、类别等的 id 会变化，客户端需要重新拉取：同步变更日志不复制，用户的同步纪元重新生成，
+客户端下次 /api/sync 时收到全量数据。派生数据（推荐快照）不复制，由后台重新计算。
+迁移期间被迁移的用户不应有写入，建议在维护窗口内执行。使用 sqlite 缓存后端时会同时使缓存失效；
+使用进程内缓存时需要在迁移后重启服务。
+"""
+
+import argparse
+import math
+import sys
+from typing import Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.config import Settings
+from app.database import Base
+from app.models import User, Task, UserDirectory
+from app.models.user import new_sync_epoch
+from app.services.cache import create_cache, invalidate_user
+from app.shards import ShardRouter, shard_cache_key
+
+# 由后台重新计算的派生表、同步变更日志和提醒发件箱（其中的任务 id 迁移后会变），迁移时只删除不复制
+DERIVED_TABLES = {"recommendation_snapshots", "sync_changes", "notification_outbox"}
+
+
+def _owned_rows(conn: Connection, table, user_id: int, task_ids: List[int]):
+    """某个用户在该表中拥有的行；无法判断归属的表返回 None"""
+    if table.name == "users":
+        condition = table.c.id == user_id
+    elif "user_id" in table.c:
+        condition = table.c.user_id == user_id
+    elif "task_id" in table.c:
+        if not task_ids:
+            return []
+        condition = table.c.task_id.in_(task_ids)
+    else:
+        return None
+    return conn.execute(select(table).where(condition)).mappings().all()
+
+
+def _delete_owned(conn: Connection, table, user_id: int, task_ids: List[int]) -> None:
+    if table.name == "users":
+        conn.execute(table.delete().where(table.c.id == user_id))
+    elif "user_id" in table.c:
+        conn.execute(table.delete().where(table.c.user_id == user_id))
+    elif "task_id" in table.c and task_ids:
+        conn.execute(table.delete().where(table.c.task_id.in_(task_ids)))
+
+
+def move_user(shards: ShardRouter, user_id: int, source: int, target: int) -> Dict[str, int]:
+    """把一个用户的数据从 source 分片迁移到 target 分片，返回各表复制的行数"""
+    tables = Base.metadata.sorted_tables
+    counts = {}
+    with shards.engines[source].connect() as src:
+        task_ids = list(src.execute(select(Task.id).where(Task.user_id == user_id)).scalars())
+        with shards.engines[target].begin() as dst:
+            if dst.execute(select(User.id).where(User.id == user_id)).first():
+                raise RuntimeError(f"目标分片 {target} 上已存在用户 {user_id}，可能是上次迁移中断，请先清理")
+
+            id_maps: Dict[str, Dict[int, int]] = {}
+            for table in tables:
+                if table.name in DERIVED_TABLES:
+                    continue
+                rows = _owned_rows(src, table, user_id, task_ids)
+                if rows is None:
+                    print(f"  跳过无法判断归属的表 {table.name}")
+                    continue
+                if not rows:
+                    continue
+
+                # 改写指向已迁移表的外键
+                rows = [dict(row) for row in rows]
+                if table.name == "users":
+                    # id 变化后旧的同步游标不再可用
+                    for row in rows:
+                        row["sync_epoch"] = new_sync_epoch()
+                for column in table.columns:
+                    for foreign_key in column.foreign_keys:
+                        mapping = id_maps.get(foreign_key.column.table.name)
+                        if mapping is None:
+                            continue
+                        for row in rows:
+                            if row[column.name] is not None:
+                                row[column.name] = mapping[row[column.name]]
+
+                # 用户 id 全局唯一保持不变，其余自增主键在目标分片上重新分配
+                primary_key = list(table.primary_key.columns)
+                if table.name != "users" and len(primary_key) == 1 and primary_key[0].name == "id":
+                    next_id = (dst.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+                    mapping = id_maps[table.name] = {}
+                    for offset, row in enumerate(rows):
+                        mapping[row["id"]] = next_id + offset
+                        row["id"] = next_id + offset
+
+                dst.execute(table.insert(), rows)
+                counts[table.name] = len(rows)
+
+    # 先切换目录再删除源数据：中途失败时数据只会多一份，不会丢失
+    with shards.directory_session() as directory:
+        directory.query(UserDirectory).filter(UserDirectory.id == user_id).update({"shard": target})
+        directory.commit()
+    with shards.engines[source].begin() as src:
+        for table in reversed(tables):
+            _delete_owned(src, table, user_id, task_ids)
+    return counts
+
+
+def sync_directory(shards: ShardRouter) -> int:
+    """把各分片上的用户登记到目录库，返回新登记的用户数"""
+    added = 0
+    with shards.directory_session() as directory:
+        known = {user_id for user_id, in directory.query(UserDirectory.id)}
+        for index, engine in enumerate(shards.engines):
+            with engine.connect() as conn:
+                for user_id, username, email in conn.execute(select(User.id, User.username, User.email)):
+                    if user_id in known:
+                        continue
+                    directory.add(UserDirectory(id=user_id, username=username, email=email, shard=index))
+                    known.add(user_id)
+                    added += 1
+        directory.commit()
+    return added
+
+
+def plan_auto(shards: ShardRouter) -> List[tuple]:
+    """按用户数均衡：从超出平均值的分片迁出到不足的分片，返回 [(用户 id, 用户名, 源, 目标)]"""
+    counts = shards.user_counts()
+    limit = math.ceil(sum(counts) / len(counts))
+    moves = []
+    with shards.directory_session() as directory:
+        for source, count in enumerate(counts):
+            if count <= limit:
+                continue
+            candidates = directory.query(UserDirectory.id, UserDirectory.username).filter(
+                UserDirectory.shard == source
+            ).order_by(UserDirectory.id.desc()).limit(count - limit).all()
+            for user_id, username in candidates:
+                target = min(range(len(counts)), key=lambda index: counts[index])
+                if counts[target] >= limit:
+                    break
+                moves.append((user_id, username, source, target))
+                counts[source] -= 1
+                counts[target] += 1
+    return moves
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LentoFlow 分片维护")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--sync-directory", action="store_true", help="把各分片上的用户登记到目录库")
+    group.add_argument("--move", metavar="USERNAME", help="迁移指定用户")
+    group.add_argument("--auto", action="store_true", help="按用户数自动均衡")
+    parser.add_argument("--to", type=int, help="--move 的目标分片序号")
+    parser.add_argument("--dry-run", action="store_true", help="只打印迁移计划")
+    args = parser.parse_args()
+
+    settings = Settings()
+    if not settings.SHARD_DATABASE_URLS:
+        print("未配置 SHARD_DATABASE_URLS")
+        return 1
+    # 只有多进程共享的缓存能从这里失效
+    cache = create_cache(settings) if settings.CACHE_BACKEND == "sqlite" else None
+    shards = ShardRouter(settings, cache)
+    shards.ensure_schema()
+
+    try:
+        if args.sync_directory:
+            print(f"新登记 {sync_directory(shards)} 个用户，各分片用户数：{shards.user_counts()}")
+            return 0
+
+        if args.move:
+            if args.to is None or not 0 <= args.to < len(shards.engines):
+                print("--to 需要指定有效的分片序号")
+                return 1
+            with shards.directory_session() as directory:
+                entry = directory.query(UserDirectory).filter(UserDirectory.username == args.move).first()
+            if entry is None:
+                print(f"目录中没有用户 {args.move}，先执行 --sync-directory")
+                return 1
+            if entry.shard == args.to:
+                print(f"{args.move} 已在分片 {args.to}")
+                return 0
+            moves = [(entry.id, entry.username, entry.shard, args.to)]
+        else:
+            moves = plan_auto(shards)
+
+        for user_id, username, source, target in moves:
+            print(f"{username}（id={user_id}）：分片 {source} -> {target}")
+            if not args.dry_run:
+                print(f"  已复制 {move_user(shards, user_id, source, target)}")
+                if cache is not None:
+                    cache.delete(shard_cache_key(username))
+                    invalidate_user(cache, user_id)
+        print(f"各分片用户数：{shards.user_counts()}")
+        return 0
+    finally:
+        shards.dispose()
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+完成日位图重建
+
+按 completions 和 completion_archives 重建所有任务的完成日位图（tasks.completion_days）。
+迁移 0010 已经回填过一次，完成和撤销完成时会随任务行一起维护；直接修改了完成记录的数据修复之后执行：
+
+    python -m scripts.rebuild_completion_days
+"""
+
+import sys
+
+from app.config import Settings
+from app.services.daybits import rebuild_completion_days
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    shards = ShardRouter(Settings())
+    try:
+        for index, engine in enumerate(shards.engines):
+            with engine.begin() as conn:
+                updated = rebuild_completion_days(conn)
+            print(f"分片 {index}：重建 {updated} 个任务")
+        return 0
+    finally:
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""
+今日推荐快照（单次运行）
+
+对所有分片执行一轮：为本地时间已过零点 SNAPSHOT_DELAY_MINUTES 分钟、还没有当天快照的用户预计算快照。
+多 worker 部署时不要在每个进程里开启 SNAPSHOT_ENABLED（每个进程都会重复计算同一批快照），
+改为关闭后用 cron 定期执行本脚本：
+
+    */10 * * * * cd backend && python -m scripts.refresh_snapshots
+"""
+
+import sys
+
+from app.config import Settings
+from app.services.snapshots import due_user_ids, refresh_snapshots
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    settings = Settings()
+    shards = ShardRouter(settings)
+    try:
+        for index, engine in enumerate(shards.engines):
+            user_ids = due_user_ids(engine, settings.SNAPSHOT_DELAY_MINUTES, app_settings=settings)
+            written = sum(
+                refresh_snapshots(engine, user_ids[offset:offset + settings.SNAPSHOT_CHUNK_SIZE], app_settings=settings)
+                for offset in range(0, len(user_ids), settings.SNAPSHOT_CHUNK_SIZE)
+            )
+            print(f"分片 {index}：写入 {written} 个用户的快照", file=sys.stderr)
+        return 0
+    finally:
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+紧迫提醒（单次运行）
+
+对所有分片执行一轮：选出到期提醒写入发件箱，再交给 REMINDER_SENDER 发送。
+多 worker 部署时不要在每个进程里开启 REMINDERS_ENABLED（同一条提醒可能被两个进程同时发送），
+改为关闭后用 cron 定期执行本脚本：
+
+    */5 * * * * cd backend && python -m scripts.send_reminders
+    # 只写入发件箱，不发送
+    python -m scripts.send_reminders --queue-only
+"""
+
+import argparse
+import sys
+
+from app.config import Settings
+from app.services.reminders import create_sender, dispatch_pending, queue_reminders
+from app.shards import ShardRouter
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="执行一轮紧迫提醒")
+    parser.add_argument("--queue-only", action="store_true", help="只写入发件箱，不发送")
+    args = parser.parse_args()
+
+    settings = Settings()
+    shards = ShardRouter(settings)
+    sender = None if args.queue_only else create_sender(settings)
+    try:
+        for index, engine in enumerate(shards.engines):
+            queued = queue_reminders(
+                engine, settings.REMINDER_LEAD_DAYS, settings.REMINDER_QUIET_HOURS, settings.REMINDER_BATCH_SIZE,
+                app_settings=settings
+            )
+            sent = 0
+            if sender is not None:
+                sent = dispatch_pending(engine, sender, settings.REMINDER_BATCH_SIZE, settings.REMINDER_MAX_ATTEMPTS)
+            print(f"分片 {index}：写入 {queued} 条提醒，发送 {sent} 条", file=sys.stderr)
+        return 0
+    finally:
+        if sender is not None:
+            sender.close()
+        shards.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
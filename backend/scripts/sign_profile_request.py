@@ -0,0 +1,26 @@
+"""
+生成按需采样分析的请求头
+
+用法（在 backend 目录下执行）：
+    python -m scripts.sign_profile_request /api/stats/monthly --ttl 300
+    curl -H "X-LentoFlow-Profile: <输出>" -H "Authorization: Bearer ..." http://localhost:8000/api/stats/monthly
+
+结果写入 PROFILER_OUTPUT_DIR，文件名见响应头 X-LentoFlow-Profile-Id。
+"""
+
+import argparse
+
+from app.config import settings
+from app.utils.profiling import sign_profile_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成 X-LentoFlow-Profile 请求头")
+    parser.add_argument("path", help="要分析的请求路径（不含查询参数）")
+    parser.add_argument("--ttl", type=int, default=300, help="有效期（秒）")
+    args = parser.parse_args()
+    print(sign_profile_request(settings.PROFILER_SECRET or settings.SECRET_KEY, args.path, args.ttl))
+
+
+if __name__ == "__main__":
+    main()
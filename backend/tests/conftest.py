@@ -0,0 +1,36 @@
+"""测试共用的夹具：在临时 SQLite 文件上创建应用"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.main import create_app
+
+
+@pytest.fixture
+def make_client(tmp_path):
+    """按给定配置创建应用并启动，返回 TestClient；测试结束时关闭"""
+    clients = []
+
+    def make(**overrides) -> TestClient:
+        database_url = f"sqlite:///{tmp_path / f'app{len(clients)}.db'}"
+        settings = Settings(**{"DATABASE_URL": database_url, **overrides})
+        client = TestClient(create_app(settings))
+        client.__enter__()
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
+
+
+def register(client: TestClient, username: str = "tester", password: str = "secret123") -> dict:
+    """注册并登录，返回带令牌的请求头"""
+    response = client.post(
+        "/api/auth/register", json={"username": username, "email": f"{username}@example.com", "password": password}
+    )
+    assert response.status_code == 201, response.text
+    response = client.post("/api/auth/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
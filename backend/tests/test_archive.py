@@ -0,0 +1,37 @@
+"""历史完成记录压缩按用户本地日期计算 cutoff"""
+
+from datetime import date, datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import Settings
+from app.models import User, Completion
+from app.services.archive import compact_completions
+from app.services.completions import record_completion
+from tests.conftest import register
+from tests.test_timezone import EAST, WEST
+
+
+def test_cutoff_follows_user_local_date(make_client):
+    client = make_client()
+    engine = client.app.state.engine
+    for username in ("east", "west"):
+        headers = register(client, username)
+        client.post("/api/tasks", json={"name": "阅读"}, headers=headers)
+    with Session(engine) as db:
+        # west 未设置时区，使用应用配置的默认时区
+        db.get(User, 1).settings = {"timezone": EAST}
+        for user_id in (1, 2):
+            for day in (date(2026, 2, 10), date(2026, 2, 11)):
+                record_completion(db, user_id, user_id, day)
+        db.commit()
+
+    # UTC 3 月 1 日 00:30：东边本地已是 3 月 1 日，cutoff 为 3 月 1 日；西边还是 2 月 28 日，cutoff 为 2 月 1 日
+    now = datetime(2026, 3, 1, 0, 30, tzinfo=timezone.utc)
+    assert compact_completions(engine, 0, 500, now=now, app_settings=Settings(DEFAULT_TIMEZONE=WEST)) == [1]
+    with Session(engine) as db:
+        assert db.get(User, 1).completions_archived_before == date(2026, 3, 1)
+        assert db.get(User, 2).completions_archived_before is None
+        remaining = db.execute(select(Completion.task_id, Completion.completed_on).order_by(Completion.id)).all()
+    assert remaining == [(1, date(2026, 2, 11)), (2, date(2026, 2, 10)), (2, date(2026, 2, 11))]
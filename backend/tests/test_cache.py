@@ -0,0 +1,32 @@
+"""可插拔缓存"""
+
+import pytest
+
+from app.services.cache import Cache, MemoryCache, SQLiteCache
+
+
+def test_incomplete_backend_fails_on_instantiation():
+    class Partial(Cache):
+        def _get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial(60.0)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_versioned_keys_invalidate_on_bump(tmp_path, backend):
+    cache = MemoryCache(60.0) if backend == "memory" else SQLiteCache(str(tmp_path / "cache.db"), 60.0)
+    try:
+        key = cache.versioned_key("user:1", "today")
+        cache.set(key, {"tasks": [1, 2]})
+        assert cache.get(key) == {"tasks": [1, 2]}
+
+        cache.bump("user:1")
+        assert cache.version("user:1") == 1
+        assert cache.get(cache.versioned_key("user:1", "today")) is None
+
+        cache.delete(key)
+        assert cache.get(key) is None
+    finally:
+        cache.close()
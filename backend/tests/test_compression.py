@@ -0,0 +1,28 @@
+"""响应压缩"""
+
+import gzip
+
+import pytest
+
+from app.utils.compression import Compressor, GzipCompressor, negotiate
+
+
+def test_incomplete_compressor_fails_on_instantiation():
+    class Partial(Compressor):
+        def compress(self, data: bytes) -> bytes:
+            return data
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_gzip_stream_round_trip():
+    compressor = GzipCompressor()
+    chunks = [b'{"tasks": [', b"1, 2, 3" * 100, b"]}"]
+    body = b"".join(compressor.compress(chunk) + compressor.flush() for chunk in chunks) + compressor.finish()
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+def test_negotiate_prefers_highest_quality():
+    assert negotiate("gzip;q=0.5, br", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("identity", ["zstd", "br", "gzip"]) is None
@@ -0,0 +1,42 @@
+"""多日规划：未开启缓存时也保存规划状态和结果"""
+
+from app.services import planner
+from app.services.cache import MemoryCache
+from tests.conftest import register
+
+
+def test_plan_reused_without_cache_backend(make_client, monkeypatch):
+    monkeypatch.setattr(planner, "_local_states", MemoryCache(planner.PLAN_STATE_TTL))
+    calls = []
+    plan_day = planner._plan_day
+    monkeypatch.setattr(planner, "_plan_day", lambda *args: calls.append(args[2]) or plan_day(*args))
+
+    client = make_client()
+    assert client.app.state.cache is None
+    headers = register(client)
+    ids = [
+        client.post("/api/tasks", json={"name": f"任务{index}", "expected_interval": 1}, headers=headers).json()["id"]
+        for index in range(3)
+    ]
+
+    first = client.get("/api/today/plan", params={"days": 7}, headers=headers).json()
+    assert len(calls) == 7
+
+    # 输入没有变化：直接返回保存的结果，不再逐天推进
+    calls.clear()
+    assert client.get("/api/today/plan", params={"days": 7}, headers=headers).json() == first
+    assert calls == []
+
+    # 今天完成一个任务：从第一天重新推进，结果中第一天包含该任务
+    assert client.post(f"/api/today/complete/{ids[0]}", headers=headers).status_code == 201
+    plan = client.get("/api/today/plan", params={"days": 7}, headers=headers).json()
+    assert calls and calls[0] == 0
+    assert plan["days"][0]["completed"] == [ids[0]]
+
+    # 任务改名会改变输入摘要，结果中出现新名称
+    calls.clear()
+    assert client.put(f"/api/tasks/{ids[1]}", json={"name": "改名"}, headers=headers).status_code == 200
+    plan = client.get("/api/today/plan", params={"days": 7}, headers=headers).json()
+    assert len(calls) == 7
+    names = {task["name"] for day in plan["days"] for task in day["tasks"]}
+    assert "改名" in names and "任务1" not in names
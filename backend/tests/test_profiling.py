@@ -0,0 +1,61 @@
+"""按需采样分析器"""
+
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.utils import profiling
+
+
+def _busy(seconds: float) -> int:
+    """纯 Python 计算，不释放 GIL 也不执行 SQL"""
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(i * i for i in range(200))
+    return total
+
+
+def _busy_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/busy")
+    def busy():
+        return {"total": _busy(0.1)}
+
+    profiling.instrument_routes(app)
+    return app
+
+
+def test_cpu_bound_endpoint_is_sampled(tmp_path):
+    settings = Settings(PROFILER_ENABLED=True, PROFILER_INTERVAL_MS=1, PROFILER_OUTPUT_DIR=str(tmp_path))
+    client = TestClient(profiling.ProfilerMiddleware(_busy_app(), settings))
+    header = profiling.sign_profile_request(settings.PROFILER_SECRET or settings.SECRET_KEY, "/busy")
+    response = client.get("/busy", headers={profiling.PROFILE_HEADER: header})
+    assert response.status_code == 200
+
+    profile_id = response.headers[profiling.PROFILE_ID_HEADER]
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text(encoding="utf-8"))
+    stacks = {}
+    for line in (tmp_path / f"{profile_id}.collapsed").read_text(encoding="utf-8").splitlines():
+        stack, _, count = line.rpartition(" ")
+        stacks[stack] = int(count)
+
+    # 100ms 的计算按 1ms 间隔采样，大部分样本应落在计算函数中，而不是只在 SQL 期间被采到
+    busy = sum(count for stack, count in stacks.items() if "_busy" in stack and not stack.endswith(profiling.DB_FRAME))
+    assert summary["statements"] == 0
+    assert busy >= 30, stacks
+
+
+def test_frame_name_falls_back_to_co_name():
+    class Code:
+        co_name = "handler"
+
+    class Frame:
+        f_code = Code()
+        f_globals = {"__name__": "app.routers.today"}
+
+    assert profiling._frame_name(Frame()) == "app.routers.today:handler"
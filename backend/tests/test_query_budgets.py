@@ -0,0 +1,170 @@
+"""
+接口 SQL 语句数与执行计划
+
+用 benchmarks.datagen 在临时 SQLite 文件中生成数据，按 ENDPOINTS 的顺序调用每个接口，检查：
+- 单次请求执行的 SQL 语句数不超过登记的上限（防止 N+1）
+- 每条语句的 EXPLAIN QUERY PLAN 中不出现对 completions 的全表扫描
+新增接口必须在 ENDPOINTS 中登记语句数上限，否则 test_every_route_has_budget 失败。
+"""
+
+import re
+import sqlite3
+import threading
+from typing import List, Tuple
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+
+from app.config import Settings
+from app.database import create_db_engine
+from app.main import create_app
+from app.models import User, Task, Category
+from app.utils.auth import create_access_token
+from app.utils.metrics import current_request_stats
+from benchmarks.datagen import PASSWORD, generate
+
+# 对 completions（包括 joinedload 产生的别名）的全表扫描或全索引扫描
+COMPLETIONS_SCAN = re.compile(r"\bSCAN (completions|completions_\d+)\b")
+
+# (方法, 路由模板, 语句数上限, 请求参数)；按顺序执行，写操作排在相关读操作之后
+ENDPOINTS = [
+    ("GET", "/", 0, {}),
+    ("GET", "/metrics", 0, {}),
+    ("POST", "/api/auth/register", 3, {"json": {"username": "audit_user", "email": "audit@example.com", "password": "audit123"}}),
+    ("POST", "/api/auth/login", 1, {"data": {"username": "{username}", "password": PASSWORD}}),
+    ("GET", "/api/auth/me", 1, {}),
+    ("PUT", "/api/auth/settings", 3, {"json": {"daily_energy_budget": 15}}),
+    ("GET", "/api/categories", 2, {}),
+    ("GET", "/api/categories/{category_id}", 2, {}),
+    ("POST", "/api/categories", 5, {"json": {"name": "审计类别", "color": "#123456"}}),
+    ("PUT", "/api/categories/{category_id}", 6, {"json": {"color": "#654321"}}),
+    ("GET", "/api/tasks", 3, {}),
+    ("GET", "/api/tasks/{task_id}", 3, {}),
+    ("POST", "/api/tasks", 6, {"json": {"name": "审计任务", "category_id": "{category_id}"}}),
+    ("PUT", "/api/tasks/{task_id}", 7, {"json": {"importance": 4}}),
+    ("GET", "/api/today", 3, {}),
+    ("GET", "/api/today/plan", 2, {"params": {"days": 14}}),
+    ("POST", "/api/today/simulate", 2, {"json": {"days": 90, "completions": [{"task_id": "{task_id}", "day": 3}]}}),
+    ("POST", "/api/today/complete/{task_id}", 6, {"json": {"mood": 4}}),
+    ("DELETE", "/api/today/complete/{task_id}", 6, {}),
+    ("GET", "/api/stats/daily", 2, {"params": {"days": 30}}),
+    ("GET", "/api/stats/weekly", 3, {"params": {"weeks": 12}}),
+    ("GET", "/api/stats/monthly", 3, {"params": {"months": 12}}),
+    ("GET", "/api/stats/heatmap", 2, {"params": {"days": 365}}),
+    ("GET", "/api/stats/category", 3, {}),
+    ("GET", "/api/stats/task/{task_id}", 2, {}),
+    ("GET", "/api/stats/mood", 4, {"params": {"start": "2022-01-01", "end": "2026-06-30"}}),
+    ("GET", "/api/dashboard", 5, {}),
+    ("GET", "/api/sync", 6, {}),
+    ("DELETE", "/api/tasks/{task_id}", 7, {}),
+    ("DELETE", "/api/categories/{category_id}", 7, {}),
+]
+
+
+class StatementRecorder:
+    """记录请求期间引擎上执行的语句及参数"""
+
+    def __init__(self, engine):
+        self.statements: List[Tuple[str, object, bool]] = []
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        # 只统计请求内的语句，跳过快照调度器等后台任务
+        if current_request_stats() is None:
+            return
+        with self._lock:
+            self.statements.append((statement, parameters, executemany))
+
+    def take(self) -> List[Tuple[str, object, bool]]:
+        with self._lock:
+            statements, self.statements = self.statements, []
+        return statements
+
+
+def explain(conn: sqlite3.Connection, statement: str, parameters) -> str:
+    """用独立连接获取语句的执行计划，避免被计入语句数"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    return "\n".join(row[-1] for row in rows)
+
+
+def fill(value, ids: dict):
+    """把请求参数中的 {task_id} 等占位符替换为实际值"""
+    if isinstance(value, dict):
+        return {key: fill(item, ids) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, ids) for item in value]
+    if isinstance(value, str) and value.startswith("{") and value.endswith("}"):
+        return ids[value[1:-1]]
+    return value
+
+
+@pytest.fixture(scope="module")
+def audit(tmp_path_factory):
+    """依次调用 ENDPOINTS 中的接口，返回 ({(方法, 路由): (状态码, 响应, 语句, 全表扫描)}, 应用的全部路由)"""
+    database_path = str(tmp_path_factory.mktemp("audit") / "audit.db")
+    database_url = f"sqlite:///{database_path}"
+    engine = create_db_engine(database_url)
+    generate(engine, users=10, tasks_per_user=10, years=1.0)
+    with engine.connect() as conn:
+        user_id, username = conn.execute(select(User.id, User.username).order_by(User.id)).first()
+        task_id = conn.execute(
+            select(Task.id).where(Task.user_id == user_id, Task.is_active == True).order_by(Task.id)
+        ).scalar()
+        category_id = conn.execute(
+            select(Category.id).where(Category.user_id == user_id).order_by(Category.id)
+        ).scalar()
+    engine.dispose()
+
+    settings = Settings(DATABASE_URL=database_url, METRICS_ENABLED=True, PROFILER_ENABLED=False)
+    app = create_app(settings)
+    routes = {
+        (method, route.path)
+        for route in app.routes if isinstance(route, APIRoute)
+        for method in route.methods
+    }
+    ids = {"task_id": task_id, "category_id": category_id, "username": username}
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': username}, app_settings=settings)}"}
+    results = {}
+    plans = sqlite3.connect(database_path)
+    with TestClient(app) as client:
+        recorder = StatementRecorder(app.state.engine)
+        for method, path, _, kwargs in ENDPOINTS:
+            kwargs = {key: fill(value, ids) for key, value in kwargs.items()}
+            recorder.take()
+            response = client.request(method, path.format(**ids), headers=headers, **kwargs)
+            statements = recorder.take()
+            scans = []
+            for statement, parameters, executemany in statements:
+                if executemany or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                plan = explain(plans, statement, parameters)
+                if COMPLETIONS_SCAN.search(plan):
+                    scans.append(f"{' '.join(statement.split())}\n  -> {plan}")
+            results[(method, path)] = (response.status_code, response.text[:200], statements, scans)
+
+            # 新建的任务和类别用于后续的更新/删除，避免删掉种子数据影响其他接口
+            if method == "POST" and path == "/api/categories" and response.status_code == 201:
+                ids["category_id"] = response.json()["id"]
+            elif method == "POST" and path == "/api/tasks" and response.status_code == 201:
+                ids["task_id"] = response.json()["id"]
+    plans.close()
+    return results, routes
+
+
+@pytest.mark.parametrize(
+    "method, path, budget", [(method, path, budget) for method, path, budget, _ in ENDPOINTS],
+    ids=[f"{method} {path}" for method, path, _, _ in ENDPOINTS]
+)
+def test_statement_budget(audit, method, path, budget):
+    status, text, statements, scans = audit[0][(method, path)]
+    assert status < 400, text
+    assert len(statements) <= budget, "\n".join(" ".join(statement.split()) for statement, _, _ in statements)
+    assert not scans, "completions 全表扫描：\n" + "\n".join(scans)
+
+
+def test_every_route_has_budget(audit):
+    registered = {(method, path) for method, path, _, _ in ENDPOINTS}
+    assert sorted(audit[1] - registered) == []
@@ -0,0 +1,72 @@
+"""紧迫提醒：发件箱去重与发送器接口"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app import models  # noqa: F401
+from app.models import User, Task, Notification
+from app.services.reminders import Sender, dispatch_pending, queue_reminders
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+class ListSender(Sender):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, notifications):
+        self.sent.extend(notifications)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, username="r", email="r@example.com", password_hash="x", settings={"timezone": "UTC"}))
+        db.add(Task(id=1, user_id=1, name="浇花", critical_urgency_on=date(2026, 3, 2)))
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+def _outbox(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Notification.due_on, Notification.task_ids).order_by(Notification.id)).all()
+
+
+def test_incomplete_sender_fails_on_instantiation():
+    class Partial(Sender):
+        pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_one_critical_reminder_per_user_and_day(engine):
+    assert queue_reminders(engine, now=NOW) == 1
+    # 调度器重复运行不会重复写入
+    assert queue_reminders(engine, now=NOW + timedelta(minutes=5)) == 0
+
+    # 写入之后同一天才到期的任务不再补发（每个用户每天最多一条）
+    with Session(engine) as db:
+        db.add(Task(id=2, user_id=1, name="喂猫", critical_urgency_on=date(2026, 3, 2)))
+        db.commit()
+    assert queue_reminders(engine, now=NOW + timedelta(minutes=10)) == 0
+
+    # 新的到期日（例如完成后转换日期后移）会再提醒
+    with Session(engine) as db:
+        db.get(Task, 1).critical_urgency_on = date(2026, 3, 5)
+        db.commit()
+    assert queue_reminders(engine, now=NOW + timedelta(days=3)) == 1
+    assert _outbox(engine) == [(date(2026, 3, 2), [1]), (date(2026, 3, 5), [1])]
+
+    sender = ListSender()
+    assert dispatch_pending(engine, sender, now=NOW) == 2
+    assert [notification["due_on"] for notification in sender.sent] == [date(2026, 3, 2), date(2026, 3, 5)]
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).where(Notification.sent_at.is_(None))).scalar() == 0
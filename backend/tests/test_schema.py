@@ -0,0 +1,79 @@
+"""表结构：组合索引、每日完成唯一约束和 Alembic 迁移"""
+
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app import models  # noqa: F401
+from app.models import User, Task, Completion
+from scripts.check_query_plans import explain, hot_queries
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+# 只用于取出查询名称，构造查询不需要连接
+HOT_QUERY_NAMES = [name for name, _, _ in hot_queries(Session())]
+
+
+@pytest.mark.parametrize("name", HOT_QUERY_NAMES)
+def test_hot_query_uses_index(session, name):
+    query, index_name = next((query, index) for label, query, index in hot_queries(session) if label == name)
+    plan = explain(session, query)
+    assert index_name in plan, plan
+
+
+def test_duplicate_completion_on_same_day_rejected(session):
+    user = User(username="dup", email="dup@example.com", password_hash="x")
+    task = Task(user=user, name="跑步")
+    session.add_all([user, task])
+    session.flush()
+    session.add(Completion(task_id=task.id, completed_on=date(2026, 1, 1)))
+    session.flush()
+
+    session.add(Completion(task_id=task.id, completed_on=date(2026, 1, 1)))
+    with pytest.raises(IntegrityError):
+        session.flush()
+    session.rollback()
+
+    # 不同日期不受影响
+    session.add(Completion(task_id=task.id, completed_on=date(2026, 1, 2)))
+    session.flush()
+
+
+def _alembic(url: str, *args: str) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "-x", f"url={url}", *args],
+        cwd=BACKEND, check=True, capture_output=True
+    )
+
+
+def test_migrations_upgrade_and_downgrade(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrate.db'}"
+    engine = create_engine(url)
+
+    _alembic(url, "upgrade", "head")
+    inspector = inspect(engine)
+    assert set(inspector.get_table_names()) == set(Base.metadata.tables) | {"alembic_version"}
+    indexes = {index["name"] for index in inspector.get_indexes("completions")}
+    assert "uq_completions_task_id_completed_on" in indexes
+    assert "ix_tasks_user_id_is_active" in {index["name"] for index in inspector.get_indexes("tasks")}
+
+    _alembic(url, "downgrade", "base")
+    assert inspect(engine).get_table_names() == ["alembic_version"]
+    engine.dispose()
@@ -0,0 +1,36 @@
+"""增量同步：被压缩的完成记录不作为删除发给客户端"""
+
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.services.archive import compact_completions
+from app.services.completions import record_completion, remove_completion
+from tests.conftest import register
+
+
+def test_compacted_completions_are_not_tombstones(make_client):
+    client = make_client()
+    headers = register(client)
+    task = client.post("/api/tasks", json={"name": "阅读"}, headers=headers).json()
+    cursor = client.get("/api/sync", headers=headers).json()["cursor"]
+
+    today = date.today()
+    days = [today - timedelta(days=offset) for offset in (120, 119, 118)]
+    with Session(client.app.state.engine) as db:
+        ids = [record_completion(db, 1, task["id"], day)["completion_id"] for day in days]
+        db.commit()
+    compact_completions(client.app.state.engine, 30, 500, today)
+
+    changes = client.get("/api/sync", params={"since": cursor}, headers=headers).json()
+    # 前两条被压缩，只剩最近的一条
+    assert [completion["id"] for completion in changes["completions"]] == ids[2:]
+    assert changes["deleted"]["completions"] == []
+
+    # 撤销仍然记墓碑
+    cursor = changes["cursor"]
+    with Session(client.app.state.engine) as db:
+        remove_completion(db, 1, task["id"], days[2])
+        db.commit()
+    changes = client.get("/api/sync", params={"since": cursor}, headers=headers).json()
+    assert changes["deleted"]["completions"] == ids[2:]
@@ -0,0 +1,29 @@
+"""任务列表"""
+
+from sqlalchemy import event
+
+from tests.conftest import register
+
+
+def test_task_page_only_loads_its_last_done_dates(make_client):
+    client = make_client()
+    headers = register(client)
+    ids = [client.post("/api/tasks", json={"name": f"任务{index}"}, headers=headers).json()["id"] for index in range(4)]
+    for task_id in (ids[0], ids[2]):
+        assert client.post(f"/api/today/complete/{task_id}", headers=headers).status_code == 201
+
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters))
+    event.listen(client.app.state.engine, "before_cursor_execute", listener)
+    try:
+        page = client.get("/api/tasks", params={"skip": 1, "limit": 2}, headers=headers).json()
+    finally:
+        event.remove(client.app.state.engine, "before_cursor_execute", listener)
+
+    assert [task["id"] for task in page] == ids[1:3]
+    assert page[0]["last_done_date"] is None
+    assert page[1]["last_done_date"] is not None
+    # 最近完成日期只查询本页的任务（第一个参数是用户 id，其余是 IN 列表）
+    grouped = [parameters for statement, parameters in statements if "max(completions.completed_on)" in statement]
+    assert len(grouped) == 1
+    assert sorted(grouped[0][1:]) == ids[1:3]
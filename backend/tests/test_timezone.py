@@ -0,0 +1,47 @@
+"""未设置时区的用户使用应用配置中的默认时区"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from app.config import Settings
+from app.services.snapshots import due_user_ids
+from app.utils.timezone import user_today
+from tests.conftest import register
+
+# 两个时区相差 26 小时，任意时刻的本地日期都不同
+EAST = "Pacific/Kiritimati"
+WEST = "Etc/GMT+12"
+
+
+def test_user_today_uses_given_settings():
+    user = SimpleNamespace(settings={})
+    now = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+    assert user_today(user, now, Settings(DEFAULT_TIMEZONE=EAST)).isoformat() == "2026-03-02"
+    assert user_today(user, now, Settings(DEFAULT_TIMEZONE=WEST)).isoformat() == "2026-03-01"
+    # 用户自己的时区优先
+    user = SimpleNamespace(settings={"timezone": "UTC"})
+    assert user_today(user, now, Settings(DEFAULT_TIMEZONE=EAST)).isoformat() == "2026-03-01"
+
+
+def test_completion_date_follows_app_default_timezone(make_client):
+    for zone in (EAST, WEST):
+        client = make_client(DEFAULT_TIMEZONE=zone)
+        headers = register(client)
+        task = client.post("/api/tasks", json={"name": "阅读"}, headers=headers).json()
+        expected = datetime.now(ZoneInfo(zone)).date().isoformat()
+        assert client.post(f"/api/today/complete/{task['id']}", headers=headers).status_code == 201
+        assert client.get(f"/api/tasks/{task['id']}", headers=headers).json()["last_done_date"] == expected
+
+
+def test_due_users_use_app_default_timezone(make_client):
+    client = make_client()
+    register(client)
+    engine = client.app.state.engine
+    # UTC 00:30：东边已过零点 14.5 小时，西边还是前一天，延迟 60 分钟时两边都已到点
+    now = datetime(2026, 3, 1, 0, 30, tzinfo=timezone.utc)
+    assert due_user_ids(engine, 60, now, Settings(DEFAULT_TIMEZONE=EAST)) == [1]
+    # UTC 12:10：西边本地时间 00:10，还没到 60 分钟
+    now = datetime(2026, 3, 1, 12, 10, tzinfo=timezone.utc)
+    assert due_user_ids(engine, 60, now, Settings(DEFAULT_TIMEZONE=WEST)) == []
+    assert due_user_ids(engine, 60, now, Settings(DEFAULT_TIMEZONE=EAST)) == [1]
@@ -44,35 +44,25 @@ export const StatsView: React.FC = () => {
   const fetchStats = async () => {
     setIsLoading(true);
     try {
-      // 获取每日统计
-      const dailyResponse = await fetch('/api/stats/daily', {
+      // 一次请求获取每日统计、今日概览和分类统计
+      const response = await fetch('/api/dashboard?sections=today,daily,category', {
         headers: {
           'Authorization': `Bearer ${localStorage.getItem('token')}`
         }
       });
       
-      if (dailyResponse.ok) {
-        const dailyData = await dailyResponse.json();
+      if (response.ok) {
+        const data = await response.json();
+        
         // 转换后端数据格式以适配前端组件
-        const formattedDailyStats = dailyData.map((day: any) => ({
+        const formattedDailyStats = data.daily.map((day: any) => ({
           date: day.date,
           tasks: day.tasks_completed,
           energy: day.energy_spent
         }));
         setDailyStats(formattedDailyStats);
-      } else {
-        console.error('获取每日统计失败');
-      }
-      
-      // 获取今日概览（从今日视图API获取，因为统计API没有专门的今日概览端点）
-      const todayResponse = await fetch('/api/today', {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-      
-      if (todayResponse.ok) {
-        const todayData = await todayResponse.json();
+        
+        const todayData = data.today;
         setTodayOverview({
           completed_tasks: todayData.recommended_tasks.filter((task: any) => task.is_completed_today).length + 
                          (todayData.other_tasks?.filter((task: any) => task.is_completed_today).length || 0),
@@ -82,22 +72,10 @@ export const StatsView: React.FC = () => {
           task_health: todayData.overall_health.score,
           daily_score: todayData.daily_score?.total_score || 0
         });
+        
+        setCategoryStats(data.category);
       } else {
-        console.error('获取今日概览失败');
-      }
-      
-      // 获取分类统计
-      const categoryResponse = await fetch('/api/stats/category', {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        }
-      });
-      
-      if (categoryResponse.ok) {
-        const categoryData = await categoryResponse.json();
-        setCategoryStats(categoryData);
-      } else {
-        console.error('获取分类统计失败');
+        console.error('获取统计数据失败');
         // 如果获取失败，生成空的分类数据
         setCategoryStats([]);
       }